@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+EduFace AI - Recognition pipeline benchmark
+Measures detection, embedding, recognition, attendance processing and training
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+# Add the project root to Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+import cv2 # type: ignore
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+def percentile(values, q):
+    """Percentile of a list of latencies"""
+    if not values:
+        return None
+    return float(np.percentile(np.array(values), q))
+
+def summarize(name, latencies, items=None, extra=None):
+    """Build the result entry for one benchmark stage"""
+    total_time = sum(latencies)
+    result = {
+        'stage': name,
+        'runs': len(latencies),
+        'p50_ms': percentile(latencies, 50) * 1000 if latencies else None,
+        'p95_ms': percentile(latencies, 95) * 1000 if latencies else None,
+        'mean_ms': total_time / len(latencies) * 1000 if latencies else None,
+        'peak_rss_mb': peak_rss_mb()
+    }
+    if items is not None:
+        result['faces'] = items
+        result['faces_per_sec'] = items / total_time if total_time > 0 else None
+    if extra:
+        result.update(extra)
+    return result
+
+def parse_resolution(value):
+    """Parse a WIDTHxHEIGHT string"""
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+def positive_int(value):
+    """Parse an integer argument that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+def load_face_crops(faces_dir, limit=200):
+    """Load face images to paste into synthetic scenes"""
+    crops = []
+    if not faces_dir or not os.path.isdir(faces_dir):
+        return crops
+    for root, _, files in os.walk(faces_dir):
+        for filename in sorted(files):
+            if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
+                image = cv2.imread(os.path.join(root, filename))
+                if image is not None:
+                    crops.append(image)
+                if len(crops) >= limit:
+                    return crops
+    return crops
+
+def draw_synthetic_face(size, rng):
+    """Draw a simple face-like pattern when no real face crops are available"""
+    face = np.full((size, size, 3), 40, dtype=np.uint8)
+    skin = tuple(int(c) for c in rng.integers(120, 230, size=3))
+    center = (size // 2, size // 2)
+    cv2.ellipse(face, center, (size * 2 // 5, size // 2 - 2), 0, 0, 360, skin, -1)
+    eye_y = size * 2 // 5
+    for eye_x in (size // 3, size * 2 // 3):
+        cv2.circle(face, (eye_x, eye_y), max(2, size // 14), (30, 30, 30), -1)
+    cv2.ellipse(face, (size // 2, size * 2 // 3), (size // 6, size // 14), 0, 0, 180, (40, 40, 120), -1)
+    return face
+
+def make_scene(resolution, headcount, crops, rng):
+    """Compose a synthetic classroom image with `headcount` faces on a grid"""
+    width, height = resolution
+    scene = rng.integers(60, 200, size=(height, width, 3), dtype=np.uint8)
+    scene = cv2.GaussianBlur(scene, (31, 31), 0)
+    
+    columns = int(np.ceil(np.sqrt(headcount * width / height)))
+    rows = int(np.ceil(headcount / columns))
+    cell_w, cell_h = width // columns, height // rows
+    face_size = max(24, int(min(cell_w, cell_h) * 0.7))
+    
+    for i in range(headcount):
+        row, column = divmod(i, columns)
+        if crops:
+            face = cv2.resize(crops[rng.integers(len(crops))], (face_size, face_size))
+        else:
+            face = draw_synthetic_face(face_size, rng)
+        x = column * cell_w + (cell_w - face_size) // 2
+        y = row * cell_h + (cell_h - face_size) // 2
+        scene[y:y+face_size, x:x+face_size] = face
+    return scene
+
+def make_training_set(path, students, images_per_student, crops, rng):
+    """Write a synthetic training_data folder"""
+    for s in range(students):
+        student_folder = os.path.join(path, f"BENCH{s:04d}")
+        os.makedirs(student_folder, exist_ok=True)
+        for i in range(images_per_student):
+            image = make_scene((640, 480), 1, [crops[s % len(crops)]] if crops else [], rng)
+            cv2.imwrite(os.path.join(student_folder, f"BENCH{s:04d}_{i+1}.jpg"), image)
+
+def git_revision():
+    """Current git revision of the project, if available"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+def run_benchmarks(args):
+    """Run every benchmark stage and return the results document"""
+    from face_recognition.face_detector import FaceRecognitionSystem
+    from training.training_manager import TrainingManager
+    
+    rng = np.random.default_rng(args.seed)
+    crops = load_face_crops(args.faces)
+    resolutions = [parse_resolution(r) for r in args.resolutions.split(',')]
+    headcounts = [int(h) for h in args.headcounts.split(',')]
+    
+    results = []
+    startup_start = time.perf_counter()
+    face_recognition = FaceRecognitionSystem()
+    results.append(summarize('startup', [time.perf_counter() - startup_start]))
+    
+    # Detection over every resolution/headcount combination
+    all_faces = []
+    scenes = []
+    for resolution in resolutions:
+        for headcount in headcounts:
+            scene = make_scene(resolution, headcount, crops, rng)
+            scenes.append((resolution, headcount, scene))
+            for _ in range(args.warmup):
+                face_recognition.detect_faces(scene)
+            latencies = []
+            detected = 0
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                faces = face_recognition.detect_faces(scene)
+                latencies.append(time.perf_counter() - start)
+                detected += len(faces)
+            all_faces.extend(face['face'] for face in faces)
+            results.append(summarize('detect_faces', latencies, detected, {
+                'resolution': f"{resolution[0]}x{resolution[1]}",
+                'headcount': headcount,
+                'detected_per_run': detected / args.repeats
+            }))
+    
+    if not all_faces:
+        # Detector found nothing in the synthetic scenes; embed the crops directly
+        all_faces = [cv2.cvtColor(face, cv2.COLOR_BGR2RGB) for face in
+                     (crops or [draw_synthetic_face(160, rng) for _ in range(10)])]
+    
+    # Embedding per face crop
+    for face in all_faces[:args.warmup]:
+        face_recognition.extract_face_encoding(face)
+    latencies = []
+    encodings = []
+    for face in all_faces[:args.max_faces]:
+        start = time.perf_counter()
+        encoding = face_recognition.extract_face_encoding(face)
+        latencies.append(time.perf_counter() - start)
+        if encoding is not None:
+            encodings.append(encoding)
+    results.append(summarize('extract_face_encoding', latencies, len(latencies)))
+    
+    # Training on a synthetic gallery (also provides a classifier for recognition)
+    training_path = os.path.abspath('training_data')
+    make_training_set(training_path, args.train_students, args.train_images, crops, rng)
+    training_manager = TrainingManager(training_data_path=training_path, face_recognition=face_recognition)
+    start = time.perf_counter()
+    success, message = training_manager.train_system()
+    results.append(summarize('train_system', [time.perf_counter() - start], extra={
+        'students': args.train_students,
+        'images_per_student': args.train_images,
+        'success': success,
+        'message': message
+    }))
+    
+    # The encodings above and training came from this same system, so recognition uses the
+    # classifier just trained on embeddings from the same encoder
+    if face_recognition.classifier is not None and encodings:
+        latencies = []
+        for i in range(args.repeats):
+            for encoding in encodings:
+                start = time.perf_counter()
+                face_recognition.recognize_face(encoding)
+                latencies.append(time.perf_counter() - start)
+        results.append(summarize('recognize_face', latencies, len(latencies)))
+    else:
+        results.append({'stage': 'recognize_face', 'skipped': 'no trained classifier or encodings'})
+    
+    # End-to-end attendance processing from an image file
+    for resolution, headcount, scene in scenes:
+        image_path = os.path.abspath(f"scene_{resolution[0]}x{resolution[1]}_{headcount}.jpg")
+        cv2.imwrite(image_path, scene)
+        latencies = []
+        recognized = 0
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            recognized_faces = face_recognition.process_image_for_attendance(image_path)
+            latencies.append(time.perf_counter() - start)
+            recognized += len(recognized_faces)
+        results.append(summarize('process_image_for_attendance', latencies, headcount * args.repeats, {
+            'resolution': f"{resolution[0]}x{resolution[1]}",
+            'headcount': headcount,
+            'recognized_per_run': recognized / args.repeats
+        }))
+    
+    return {
+        'benchmark': 'eduface-pipeline',
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'label': args.label,
+        'platform': {
+            'python': platform.python_version(),
+            'system': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count()
+        },
+        'config': {
+            'resolutions': args.resolutions,
+            'headcounts': args.headcounts,
+            'repeats': args.repeats,
+            'warmup': args.warmup,
+            'seed': args.seed,
+            'face_source': args.faces or 'synthetic'
+        },
+        'results': results
+    }
+
+def result_key(result):
+    """Key identifying comparable results across runs"""
+    return (result['stage'], result.get('resolution'), result.get('headcount'))
+
+def compare_results(current, baseline, threshold):
+    """Print p50/p95 changes against a baseline and return True on regression"""
+    baseline_results = {result_key(r): r for r in baseline['results']}
+    regressed = False
+    
+    print(f"\nComparison with {baseline.get('label') or baseline.get('revision') or 'baseline'}:")
+    for result in current['results']:
+        base = baseline_results.get(result_key(result))
+        if not base or result.get('p50_ms') is None or base.get('p50_ms') is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            if not base[metric]:
+                continue
+            change = (result[metric] - base[metric]) / base[metric]
+            flag = ''
+            if change > threshold:
+                flag = '  <-- REGRESSION'
+                regressed = True
+            print(f"  {result['stage']:<30} {str(result.get('resolution') or ''):<10} "
+                  f"{str(result.get('headcount') or ''):<4} {metric}: "
+                  f"{base[metric]:9.2f} -> {result[metric]:9.2f} ({change:+.1%}){flag}")
+    return regressed
+
+def print_results(document):
+    """Print a human readable summary of the results"""
+    print(f"\n{'Stage':<30} {'Res':<10} {'N':<4} {'p50 ms':>9} {'p95 ms':>9} {'faces/s':>9} {'RSS MB':>8}")
+    for result in document['results']:
+        if 'skipped' in result:
+            print(f"{result['stage']:<30} skipped: {result['skipped']}")
+            continue
+        
+        def fmt(value, width):
+            return f"{value:>{width}.2f}" if value is not None else f"{'-':>{width}}"
+        
+        print(f"{result['stage']:<30} {str(result.get('resolution') or ''):<10} "
+              f"{str(result.get('headcount') or ''):<4} {fmt(result['p50_ms'], 9)} "
+              f"{fmt(result['p95_ms'], 9)} {fmt(result.get('faces_per_sec'), 9)} "
+              f"{fmt(result['peak_rss_mb'], 8)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the EduFace recognition pipeline")
+    parser.add_argument('--faces', help="Folder of face images to compose scenes from "
+                                        "(defaults to drawn synthetic faces)")
+    parser.add_argument('--resolutions', default='640x480,1280x720,1920x1080')
+    parser.add_argument('--headcounts', default='1,5,10')
+    parser.add_argument('--repeats', type=positive_int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--max-faces', type=int, default=100)
+    parser.add_argument('--train-students', type=int, default=5)
+    parser.add_argument('--train-images', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--label', help="Name for this run, e.g. a version number")
+    parser.add_argument('--output', help="Write results JSON to this file")
+    parser.add_argument('--compare', help="Baseline results JSON to compare against")
+    parser.add_argument('--fail-threshold', type=float, default=0.10,
+                        help="Relative slowdown counted as a regression (default 0.10)")
+    args = parser.parse_args()
+    
+    if args.faces:
+        args.faces = os.path.abspath(args.faces)
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    
+    # Models and training data use relative paths; keep them away from the real ones
+    work_dir = tempfile.mkdtemp(prefix='eduface_bench_')
+    original_dir = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        document = run_benchmarks(args)
+    finally:
+        os.chdir(original_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    print_results(document)
+    
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+        print(f"\nResults written to {output}")
+    
+    if baseline_path:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare_results(document, baseline, args.fail_threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
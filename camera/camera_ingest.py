@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+EduFace AI - Multi-camera attendance ingestion
+Reads several classroom cameras concurrently into one batched recognizer
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import wait
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2 # type: ignore
+
+from database.attendance_session import AttendanceSession
+from face_recognition.motion_gate import MotionGate
+from face_recognition.recognition_cache import RecognitionCache
+from monitoring.performance_metrics import metrics
+
+def parse_camera_source(value):
+    """Turn '0' into a device index; URLs and file paths are returned unchanged"""
+    if isinstance(value, int):
+        return value
+    value = str(value).strip()
+    return int(value) if value.isdigit() else value
+
+class CameraSource:
+    """One video source bound to a course and room"""
+    
+    def __init__(self, name, source, course_name, room=None, frame_interval=1.0, loop=False,
+                 motion_gate=True, start_time=None, end_time=None, late_after_minutes=None):
+        self.name = name
+        self.source = parse_camera_source(source)
+        self.course_name = course_name
+        self.room = room
+        self.frame_interval = frame_interval
+        self.loop = loop
+        self.motion_gate = MotionGate() if motion_gate else None
+        self.pending = None
+        self.last_boxes = []
+        self.frames_read = 0
+        self.frames_static = 0
+        self.frames_submitted = 0
+        self.recognition_cache = RecognitionCache()
+        # Daily class window as "HH:MM"; without one the session spans the whole day
+        self.start_time = start_time or "00:00"
+        self.end_time = end_time or "23:59:59"
+        self.late_after_minutes = late_after_minutes
+        self.attendance_session = None
+    
+    def session_window(self, now):
+        """Start and end of today's class window"""
+        def at(value):
+            parts = [int(part) for part in value.split(':')] + [0, 0]
+            return now.replace(hour=parts[0], minute=parts[1], second=parts[2], microsecond=0)
+        return at(self.start_time), at(self.end_time)
+    
+    @property
+    def is_file(self):
+        """Video files stand in for cameras and are sampled by their own timestamps"""
+        return isinstance(self.source, str) and os.path.isfile(self.source)
+    
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            name=config.get('name') or str(config['source']),
+            source=config['source'],
+            course_name=config['course'],
+            room=config.get('room'),
+            frame_interval=float(config.get('interval', 1.0)),
+            loop=bool(config.get('loop', False)),
+            motion_gate=bool(config.get('motion_gate', True)),
+            start_time=config.get('start'),
+            end_time=config.get('end'),
+            late_after_minutes=config.get('late_after')
+        )
+
+class MultiCameraIngest:
+    """Reads N sources on their own threads and feeds one shared BatchRecognizer"""
+    
+    def __init__(self, sources, batcher, db_manager, on_result=None, reconnect_delay=5.0, journal=None):
+        self.sources = sources
+        self.batcher = batcher
+        self.db_manager = db_manager
+        # Sessions append marks to the journal so handling a result rarely waits on SQLite
+        self.journal = journal
+        self.on_result = on_result
+        self.reconnect_delay = reconnect_delay
+        self._stop_event = threading.Event()
+        self._threads = []
+        # Recognized frames are handled here rather than in the future callbacks, which run on
+        # the recognizer thread every camera shares; session and roster queries happen here
+        self._results = queue.Queue()
+        self._result_thread = None
+    
+    def start(self):
+        """Start one reader thread per source and the result handler"""
+        self._stop_event.clear()
+        self._result_thread = threading.Thread(target=self.result_loop, daemon=True, name="camera-results")
+        self._result_thread.start()
+        for source in self.sources:
+            thread = threading.Thread(target=self.read_loop, args=(source,), daemon=True,
+                                      name=f"camera-{source.name}")
+            thread.start()
+            self._threads.append(thread)
+    
+    def stop(self):
+        """Stop all readers and write out buffered attendance"""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+        
+        # Frames still being recognized are handled before the handler stops
+        wait([source.pending for source in self.sources if source.pending is not None], timeout=5)
+        if self._result_thread is not None:
+            self._results.put(None)
+            self._result_thread.join()
+            self._result_thread = None
+        
+        # Sessions stay open: stopping the ingester does not make the remaining students absent
+        for source in self.sources:
+            if source.attendance_session is not None:
+                source.attendance_session.flush()
+    
+    def wait(self):
+        """Block until every reader has finished (file sources end on their own)"""
+        for thread in self._threads:
+            while thread.is_alive() and not self._stop_event.is_set():
+                thread.join(timeout=0.5)
+    
+    def read_loop(self, source):
+        """Read frames from one source, reconnecting live streams when they drop"""
+        while not self._stop_event.is_set():
+            cap = cv2.VideoCapture(source.source)
+            if not cap.isOpened():
+                print(f"[{source.name}] Could not open {source.source}, retrying in {self.reconnect_delay}s")
+                self._stop_event.wait(self.reconnect_delay)
+                continue
+            
+            try:
+                finished = self.read_frames(source, cap)
+            finally:
+                cap.release()
+            
+            if finished and not source.loop:
+                break
+    
+    def read_frames(self, source, cap):
+        """Sample frames at the source's interval; returns True when a file ends"""
+        next_sample = 0.0
+        while not self._stop_event.is_set():
+            # grab() without retrieve() skips frames without decoding them
+            if not cap.grab():
+                return source.is_file
+            source.frames_read += 1
+            
+            if source.is_file:
+                position = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            else:
+                position = time.monotonic()
+            if position < next_sample:
+                continue
+            
+            # Skip this sample if the previous frame is still being recognized
+            if source.pending is not None and not source.pending.done():
+                continue
+            
+            ret, frame = cap.retrieve()
+            if not ret:
+                continue
+            next_sample = position + source.frame_interval
+            
+            regions = None
+            if source.motion_gate is not None:
+                with metrics.time('camera.motion_gate'):
+                    changed, regions = source.motion_gate.check(frame, position)
+                if not changed:
+                    source.frames_static += 1
+                    continue
+                if regions == [(0, 0, frame.shape[1], frame.shape[0])]:
+                    regions = None
+                else:
+                    # Faces seen last time may have moved only slightly
+                    regions = regions + source.last_boxes
+            self.submit_frame(source, frame, regions)
+        return False
+    
+    def submit_frame(self, source, frame, regions=None):
+        """Send a frame to the shared recognizer, limited to regions when given"""
+        source.frames_submitted += 1
+        session = source.attendance_session
+        roster = session.roster_ids if session is not None else None
+        future = self.batcher.submit(frame, regions, source.recognition_cache, roster)
+        source.pending = future
+        future.add_done_callback(lambda done: self._results.put((source, done)))
+    
+    def result_loop(self):
+        """Handle recognized frames from every source in the order they finish"""
+        while True:
+            item = self._results.get()
+            if item is None:
+                break
+            source, future = item
+            try:
+                self.handle_result(source, future)
+            except Exception as e:
+                print(f"[{source.name}] Error handling recognition result: {e}")
+    
+    def handle_result(self, source, future):
+        """Record attendance for recognized students"""
+        try:
+            recognized_faces = future.result()
+        except Exception as e:
+            print(f"[{source.name}] Recognition failed: {e}")
+            return
+        
+        source.last_boxes = [tuple(face_data['box']) for face_data in recognized_faces]
+        
+        now = datetime.now()
+        session = self.current_session(source, now)
+        
+        newly_marked = []
+        for face_data in recognized_faces if session is not None else []:
+            student_id = face_data['student_id']
+            # Answered from the session's roster bitmap, without touching the database
+            if session.is_marked(student_id):
+                continue
+            # Roster students are known to exist; only visitors are looked up
+            if student_id not in session.roster_index and self.db_manager.get_student(student_id) is None:
+                continue
+            with metrics.time('camera.record_attendance'):
+                status = session.mark(student_id, now)
+            if status:
+                newly_marked.append(student_id)
+        if session is not None:
+            session.flush_if_due()
+        
+        if self.on_result:
+            self.on_result(source, recognized_faces, newly_marked)
+    
+    def current_session(self, source, now):
+        """The source's session for this moment, closing a finished one and opening today's"""
+        session = source.attendance_session
+        if session is not None and (now > session.end or now.strftime("%Y-%m-%d") != session.date):
+            summary = session.close(now)
+            source.attendance_session = None
+            print(f"[{source.name}] {source.course_name} session closed: {summary['present']} present, "
+                  f"{summary['late']} late, {len(summary['absent'])} absent")
+        
+        start, end = source.session_window(now)
+        if source.attendance_session is None and start <= now <= end:
+            # A new session starts with an empty recognition cache
+            source.recognition_cache.clear()
+            source.attendance_session = AttendanceSession(
+                self.db_manager, source.course_name, self.db_manager.get_course_roster(source.course_name),
+                room=source.room, start=start, end=end, late_after_minutes=source.late_after_minutes,
+                journal=self.journal)
+        return source.attendance_session
+
+def load_sources(config_path):
+    """Load camera sources from a JSON config file"""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    return [CameraSource.from_config(entry) for entry in config['sources']]
+
+def main():
+    parser = argparse.ArgumentParser(description="Take attendance from several cameras at once")
+    parser.add_argument('--config', required=True,
+                        help='JSON file: {"sources": [{"name": "room-101", "source": '
+                             '"rtsp://...", "course": "CS101", "room": "101", "interval": 1.0}]}')
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=50)
+    parser.add_argument('--journal', default='database/attendance_journal.jsonl',
+                        help='Attendance journal written to the database in the background')
+    parser.add_argument('--no-journal', action='store_true',
+                        help='Write attendance straight to the database instead')
+    args = parser.parse_args()
+    
+    from database.database_manager import DatabaseManager
+    from database.attendance_journal import AttendanceJournal
+    from face_recognition.runtime_config import configure_runtime
+    configure_runtime('server')
+    from face_recognition.face_detector import FaceRecognitionSystem
+    from face_recognition.batch_recognizer import BatchRecognizer
+    
+    sources = load_sources(args.config)
+    print(f"Loading recognition models for {len(sources)} sources...")
+    batcher = BatchRecognizer(FaceRecognitionSystem(), args.max_batch_size, args.max_wait_ms)
+    batcher.start()
+    
+    def report(source, recognized_faces, newly_marked):
+        if newly_marked:
+            print(f"[{source.name}] {source.course_name}: marked {', '.join(newly_marked)}")
+    
+    db_manager = DatabaseManager()
+    journal = None
+    if not args.no_journal:
+        # Records left by a crashed run are written before new ones
+        journal = AttendanceJournal(db_manager, args.journal)
+        journal.start()
+    
+    ingest = MultiCameraIngest(sources, batcher, db_manager, on_result=report, journal=journal)
+    ingest.start()
+    try:
+        ingest.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ingest.stop()
+        batcher.stop()
+        if journal is not None:
+            journal.close()
+        for source in sources:
+            print(f"[{source.name}] read {source.frames_read} frames, "
+                  f"skipped {source.frames_static} static, recognized {source.frames_submitted}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import sqlite3
+
+class AttendanceAnalytics:
+    """Attendance reports computed from the precomputed summary tables"""
+    
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+    
+    def connect(self):
+        """Open a connection to the attendance database"""
+        return sqlite3.connect(self.db_manager.db_path)
+    
+    def get_course_overview(self):
+        """Get days held, distinct students and average attendance per course"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT d.course_name, d.days_held, d.total_present, d.last_date,
+                   (SELECT COUNT(DISTINCT w.student_id) FROM student_week_summary w
+                    WHERE w.course_name = d.course_name) AS students
+            FROM (
+                SELECT course_name, COUNT(*) AS days_held,
+                       SUM(present_count) AS total_present, MAX(date) AS last_date
+                FROM course_day_summary
+                GROUP BY course_name
+            ) d
+            ORDER BY d.course_name
+        ''')
+        results = cursor.fetchall()
+        conn.close()
+        
+        courses = []
+        for course_name, days_held, total_present, last_date, students in results:
+            possible = days_held * students
+            courses.append({
+                'course_name': course_name,
+                'days_held': days_held,
+                'students': students,
+                'last_date': last_date,
+                'average_rate': total_present / possible if possible else 0.0
+            })
+        return courses
+    
+    def get_student_attendance_rates(self, course_name):
+        """Get each student's attendance rate for a course, lowest first"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT COUNT(*) FROM course_day_summary WHERE course_name = ?',
+                       (course_name,))
+        days_held = cursor.fetchone()[0]
+        
+        cursor.execute('''
+            SELECT w.student_id, COALESCE(s.name, ''), SUM(w.days_present), MAX(w.last_date)
+            FROM student_week_summary w
+            LEFT JOIN students s ON s.student_id = w.student_id
+            WHERE w.course_name = ?
+            GROUP BY w.student_id
+        ''', (course_name,))
+        results = cursor.fetchall()
+        conn.close()
+        
+        rates = []
+        for student_id, name, days_present, last_date in results:
+            rates.append({
+                'student_id': student_id,
+                'name': name,
+                'days_present': days_present,
+                'days_held': days_held,
+                'rate': days_present / days_held if days_held else 0.0,
+                'last_date': last_date
+            })
+        rates.sort(key=lambda rate: (rate['rate'], rate['student_id']))
+        return rates
+    
+    def get_weekly_trend(self, course_name):
+        """Get days held and average attendance per week for a course"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT week, COUNT(*), SUM(present_count)
+            FROM course_day_summary
+            WHERE course_name = ?
+            GROUP BY week
+            ORDER BY week
+        ''', (course_name,))
+        results = cursor.fetchall()
+        conn.close()
+        
+        return [{
+            'week': week,
+            'days_held': days_held,
+            'average_present': total_present / days_held if days_held else 0.0
+        } for week, days_held, total_present in results]
+    
+    def get_course_week_matrix(self, course_name):
+        """Get a student x week matrix of days present for a course"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT week, COUNT(*) FROM course_day_summary
+            WHERE course_name = ?
+            GROUP BY week
+            ORDER BY week
+        ''', (course_name,))
+        days_per_week = cursor.fetchall()
+        
+        cursor.execute('''
+            SELECT w.student_id, COALESCE(s.name, ''), w.week, w.days_present
+            FROM student_week_summary w
+            LEFT JOIN students s ON s.student_id = w.student_id
+            WHERE w.course_name = ?
+            ORDER BY w.student_id
+        ''', (course_name,))
+        results = cursor.fetchall()
+        conn.close()
+        
+        weeks = [week for week, _ in days_per_week]
+        week_index = {week: i for i, week in enumerate(weeks)}
+        
+        rows = {}
+        for student_id, name, week, days_present in results:
+            if student_id not in rows:
+                rows[student_id] = {'student_id': student_id, 'name': name, 'days': [0] * len(weeks)}
+            if week in week_index:
+                rows[student_id]['days'][week_index[week]] = days_present
+        
+        return {
+            'weeks': weeks,
+            'days_held': [days for _, days in days_per_week],
+            'rows': list(rows.values())
+        }
+    
+    def get_absentees(self, course_name, date):
+        """Get students who attend a course but were not present on a date"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT DISTINCT w.student_id, COALESCE(s.name, '')
+            FROM student_week_summary w
+            LEFT JOIN students s ON s.student_id = w.student_id
+            WHERE w.course_name = ?
+              AND w.student_id NOT IN (
+                  SELECT student_id FROM attendance_presence
+                  WHERE course_name = ? AND date = ?
+              )
+            ORDER BY w.student_id
+        ''', (course_name, course_name, date))
+        results = cursor.fetchall()
+        conn.close()
+        
+        return [{'student_id': student_id, 'name': name} for student_id, name in results]
@@ -0,0 +1,117 @@
+import os
+import csv
+import threading
+
+EXPORT_COLUMNS = ['Student ID', 'Student Name', 'Course', 'Date', 'Time', 'Status']
+EXPORT_FORMATS = {
+    'csv': '.csv',
+    'xlsx': '.xlsx',
+    'parquet': '.parquet'
+}
+
+class ExportCancelled(Exception):
+    """Raised inside a writer when the export is cancelled"""
+
+class AttendanceExporter:
+    """Stream attendance rows from SQLite to CSV, XLSX or Parquet in chunks"""
+    
+    def __init__(self, db_manager, chunk_size=5000):
+        self.db_manager = db_manager
+        self.chunk_size = chunk_size
+    
+    def detect_format(self, file_path):
+        """Pick the export format from a file extension"""
+        extension = os.path.splitext(file_path)[1].lower()
+        for fmt, fmt_extension in EXPORT_FORMATS.items():
+            if extension == fmt_extension:
+                return fmt
+        return 'csv'
+    
+    def export(self, file_path, fmt=None, course_names=None, start_date=None, end_date=None,
+               progress_callback=None, cancel_event=None):
+        """Export attendance for the given courses and date range to a file"""
+        fmt = fmt or self.detect_format(file_path)
+        writer = {
+            'csv': self.write_csv,
+            'xlsx': self.write_xlsx,
+            'parquet': self.write_parquet
+        }.get(fmt)
+        if writer is None:
+            return False, f"Unsupported export format: {fmt}"
+        
+        total_rows = self.db_manager.count_attendance(course_names, start_date, end_date)
+        if total_rows == 0:
+            return False, "No attendance records found for the selected courses and dates."
+        
+        exported = [0]
+        
+        def chunks():
+            for rows in self.db_manager.iter_attendance(course_names, start_date, end_date,
+                                                        self.chunk_size):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ExportCancelled()
+                yield rows
+                exported[0] += len(rows)
+                if progress_callback:
+                    progress_callback(exported[0], total_rows)
+        
+        # Write to a temporary file so a failed export never leaves a partial file
+        temp_path = file_path + '.part'
+        try:
+            writer(temp_path, chunks())
+            os.replace(temp_path, file_path)
+            return True, f"Exported {exported[0]} attendance records to {file_path}"
+        except ExportCancelled:
+            return False, "Export cancelled"
+        except ImportError as e:
+            return False, f"{fmt.upper()} export requires a package that is not installed: {e}"
+        except Exception as e:
+            return False, f"Export failed: {str(e)}"
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    def export_async(self, file_path, completion_callback, **kwargs):
+        """Run an export in a background thread and report the result to completion_callback"""
+        def export_thread():
+            success, message = self.export(file_path, **kwargs)
+            completion_callback(success, message)
+        
+        thread = threading.Thread(target=export_thread, daemon=True)
+        thread.start()
+        return thread
+    
+    def write_csv(self, file_path, chunks):
+        """Write chunks to a CSV file"""
+        with open(file_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+            for rows in chunks:
+                writer.writerows(rows)
+    
+    def write_xlsx(self, file_path, chunks):
+        """Write chunks to an XLSX file using openpyxl's write-only mode"""
+        from openpyxl import Workbook
+        
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Attendance')
+        sheet.append(EXPORT_COLUMNS)
+        for rows in chunks:
+            for row in rows:
+                sheet.append(row)
+        workbook.save(file_path)
+    
+    def write_parquet(self, file_path, chunks):
+        """Write each chunk as a Parquet row group (requires pyarrow)"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        schema = pa.schema([(column, pa.string()) for column in EXPORT_COLUMNS])
+        with pq.ParquetWriter(file_path, schema) as writer:
+            for rows in chunks:
+                columns = list(zip(*rows))
+                table = pa.Table.from_arrays(
+                    [pa.array([None if value is None else str(value) for value in column])
+                     for column in columns],
+                    schema=schema)
+                writer.write_table(table)
@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+from monitoring.performance_metrics import metrics
+
+def is_transient_error(error):
+    """Whether a database error is about the database (busy, locked, unavailable) rather than a record"""
+    # Any OperationalError stops the drain instead of discarding records: a record that is bad
+    # on its own raises IntegrityError, ValueError or similar
+    return isinstance(error, sqlite3.OperationalError)
+
+def lock_file(f):
+    """Take an exclusive lock on an open file without waiting; returns False if another process holds it"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+class AttendanceJournal:
+    """Append-only JSON-lines log of attendance records, written to the database in the background"""
+    
+    def __init__(self, db_manager, path="database/attendance_journal.jsonl", sync_interval=0.05,
+                 drain_interval=0.5, max_batch=1000):
+        self.db_manager = db_manager
+        self.path = path
+        # Records the database rejects are moved here so they cannot block the ones behind them
+        self.failed_path = os.path.splitext(path)[0] + '.failed.jsonl'
+        self.sync_interval = sync_interval
+        self.drain_interval = drain_interval
+        self.max_batch = max_batch
+        
+        # (seq, record) entries appended but not yet committed to the database, oldest first
+        self._pending = []
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # One handle for reading, appending and truncating; the lock keeps a second process
+        # from appending entries with clashing sequence numbers
+        self._file = open(path, 'a+b')
+        if not lock_file(self._file):
+            self._file.close()
+            raise RuntimeError(f"Attendance journal {path} is in use by another process")
+        self.replay()
+    
+    def read_header(self):
+        """The journal id from the file's first line and that line's length, or (None, 0)"""
+        self._file.seek(0)
+        line = self._file.readline()
+        try:
+            header = json.loads(line) if line.endswith(b'\n') else None
+        except ValueError:
+            header = None
+        if isinstance(header, dict) and 'journal' in header:
+            return header['journal'], len(line)
+        return None, 0
+    
+    def write_header(self):
+        """Start the file over with a new journal id; only called with nothing pending"""
+        self.key = uuid.uuid4().hex
+        line = (json.dumps({'journal': self.key}) + '\n').encode('utf-8')
+        self._file.truncate(0)
+        self._file.write(line)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._header_bytes = len(line)
+    
+    def replay(self):
+        """Queue entries a previous run appended but never wrote to the database"""
+        # Applied state is keyed by the id in the file's header, so it follows the file
+        # when the install moves or is reached through another path
+        self.key, self._header_bytes = self.read_header()
+        if self.key is None:
+            # Files written before the header existed keep the state stored under their path
+            # until they are drained and started over with a header
+            self.key = os.path.abspath(self.path)
+            if not self.db_manager.get_journal_applied_seq(self.key):
+                self.key = os.path.basename(self.path)
+        
+        # The database stores the last applied sequence number in the same transaction as the rows
+        self.applied_seq = self.db_manager.get_journal_applied_seq(self.key)
+        self.next_seq = self.applied_seq + 1
+        
+        valid_bytes = self._header_bytes
+        self._file.seek(valid_bytes)
+        for line in self._file:
+            # A crash can leave the last line half written; everything before it is intact
+            if not line.endswith(b'\n'):
+                break
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            valid_bytes += len(line)
+            if entry['seq'] > self.applied_seq:
+                self._pending.append((entry['seq'], tuple(entry['record'])))
+            self.next_seq = max(self.next_seq, entry['seq'] + 1)
+        
+        if valid_bytes < os.fstat(self._file.fileno()).st_size:
+            self._file.truncate(valid_bytes)
+        if self._pending:
+            print(f"Replaying {len(self._pending)} attendance records from {self.path}")
+        else:
+            self.compact()
+    
+    def start(self):
+        """Start the background writer"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, daemon=True, name="attendance-journal")
+        self._thread.start()
+    
+    def close(self):
+        """Stop the writer, write every pending record to the database and close the file"""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        self.sync()
+        self.drain()
+        self._file.close()
+    
+    @property
+    def pending_count(self):
+        return len(self._pending)
+    
+    def append(self, records):
+        """Log (student_id, course_name, date, time, status, session_id) records and return at once"""
+        with self._lock:
+            lines = []
+            for record in records:
+                self._pending.append((self.next_seq, tuple(record)))
+                lines.append(json.dumps({'seq': self.next_seq, 'record': list(record)}) + '\n')
+                self.next_seq += 1
+            # Once flushed the OS holds the lines, so they survive the process dying; the
+            # writer thread's fsync makes them survive a power loss as well
+            self._file.write(''.join(lines).encode('utf-8'))
+            self._file.flush()
+            self._dirty = True
+    
+    def run(self):
+        """fsync appended records in groups and drain them into the database"""
+        last_drain = 0.0
+        while not self._stop_event.wait(self.sync_interval):
+            self.sync()
+            if self._pending and (len(self._pending) >= self.max_batch or
+                                  time.monotonic() - last_drain >= self.drain_interval):
+                self.drain()
+                last_drain = time.monotonic()
+    
+    def sync(self):
+        """fsync everything appended since the last sync with one call"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            fd = self._file.fileno()
+        # Appenders are not blocked while the disk catches up
+        with metrics.time('journal.fsync'):
+            os.fsync(fd)
+    
+    def drain(self):
+        """Write pending records to the database in large transactions; returns how many"""
+        written = 0
+        while True:
+            with self._lock:
+                batch = self._pending[:self.max_batch]
+            if not batch:
+                break
+            try:
+                with metrics.time('journal.drain'):
+                    self.db_manager.record_attendance_batch([record for _, record in batch],
+                                                            journal=self.key, journal_seq=batch[-1][0])
+            except Exception as e:
+                if is_transient_error(e):
+                    # The records stay queued for the next attempt
+                    print(f"Error writing attendance journal to the database: {e}")
+                    break
+                # One bad record fails the whole transaction; write the batch record by record
+                # so only the bad ones are set aside
+                handled = self.drain_individually(batch)
+                written += handled
+                if handled < len(batch):
+                    break
+                continue
+            self.mark_applied(len(batch), batch[-1][0])
+            written += len(batch)
+        
+        self.compact()
+        return written
+    
+    def drain_individually(self, batch):
+        """Write entries one transaction each, setting failing records aside; returns how many were handled"""
+        for handled, (seq, record) in enumerate(batch):
+            try:
+                self.db_manager.record_attendance_batch([record], journal=self.key, journal_seq=seq)
+            except Exception as e:
+                if is_transient_error(e):
+                    print(f"Error writing attendance journal to the database: {e}")
+                    return handled
+                print(f"Attendance record {seq} rejected, moved to {self.failed_path}: {e}")
+                try:
+                    self.write_failed(seq, record, e)
+                    # Advances applied_seq past the record without inserting it
+                    self.db_manager.record_attendance_batch([], journal=self.key, journal_seq=seq)
+                except Exception as error:
+                    print(f"Error setting aside attendance record {seq}: {error}")
+                    return handled
+            self.mark_applied(1, seq)
+        return len(batch)
+    
+    def write_failed(self, seq, record, error):
+        """Append a rejected record to the dead-letter file"""
+        with open(self.failed_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'seq': seq,
+                'record': list(record),
+                'error': str(error),
+                'failed_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            }, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def mark_applied(self, count, seq):
+        """Drop the oldest pending entries once the database has them"""
+        with self._lock:
+            del self._pending[:count]
+            self.applied_seq = seq
+    
+    def compact(self):
+        """Empty the journal file, keeping its header, once every record in it is in the database"""
+        with self._lock:
+            if self._pending:
+                return
+            if not self._header_bytes:
+                self.write_header()
+            elif os.fstat(self._file.fileno()).st_size > self._header_bytes:
+                # Sequence numbers continue from the database's applied_seq after a restart
+                self._file.truncate(self._header_bytes)
+            self._dirty = False
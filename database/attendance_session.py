@@ -0,0 +1,136 @@
+import time
+import threading
+from datetime import datetime, timedelta
+
+class AttendanceSession:
+    """One class meeting: a roster bitmap of who is marked, buffered writes and absences at close"""
+    
+    def __init__(self, db_manager, course_name, roster, room=None, start=None, end=None,
+                 late_after_minutes=None, flush_size=20, flush_interval=5.0, journal=None):
+        self.db_manager = db_manager
+        # With an AttendanceJournal every mark is appended at once instead of being buffered here
+        self.journal = journal
+        self.course_name = course_name
+        self.room = room
+        self.start = start or datetime.now()
+        self.end = end or self.start.replace(hour=23, minute=59, second=59)
+        self.late_after = (self.start + timedelta(minutes=late_after_minutes)
+                           if late_after_minutes is not None else None)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        
+        # Roster index -> bit; "already marked?" is one dict lookup and one bit test
+        self.roster = list(dict.fromkeys(roster))
+        self.roster_index = {student_id: i for i, student_id in enumerate(self.roster)}
+        # Handed to recognition so the roster's sub-gallery is searched first; a course without
+        # enrollments has no roster, so recognition searches everyone and nobody is marked absent
+        self.roster_ids = frozenset(self.roster) or None
+        self.present_bits = bytearray((len(self.roster) + 7) // 8)
+        # Recognized students who are not on the roster
+        self.visitors = set()
+        self.late = set()
+        
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self.closed = False
+        # Set once by close(); a retried close does not queue the absences again
+        self.absent = None
+        self.summary = None
+        
+        self.date = self.start.strftime("%Y-%m-%d")
+        self.session_id = db_manager.create_attendance_session(
+            course_name, room, self.date, self.start.strftime("%H:%M:%S"), self.end.strftime("%H:%M:%S"),
+            self.late_after.strftime("%H:%M:%S") if self.late_after else None)
+    
+    def in_window(self, when=None):
+        """Whether a time falls inside the session's start/end window"""
+        when = when or datetime.now()
+        return self.start <= when <= self.end
+    
+    def is_marked(self, student_id):
+        index = self.roster_index.get(student_id)
+        if index is None:
+            return student_id in self.visitors
+        return bool(self.present_bits[index >> 3] & (1 << (index & 7)))
+    
+    def mark(self, student_id, when=None):
+        """Mark a student present (or late); returns the status, or None if not recorded"""
+        when = when or datetime.now()
+        with self._lock:
+            if self.closed or not self.in_window(when) or self.is_marked(student_id):
+                return None
+            
+            index = self.roster_index.get(student_id)
+            if index is None:
+                self.visitors.add(student_id)
+            else:
+                self.present_bits[index >> 3] |= 1 << (index & 7)
+            
+            status = 'late' if self.late_after is not None and when > self.late_after else 'present'
+            if status == 'late':
+                self.late.add(student_id)
+            self._pending.append((student_id, self.course_name, self.date, when.strftime("%H:%M:%S"),
+                                  status, self.session_id))
+            
+            if (self.journal is not None or len(self._pending) >= self.flush_size or
+                    time.monotonic() - self._last_flush >= self.flush_interval):
+                self.flush_locked()
+            return status
+    
+    def flush(self):
+        """Write buffered attendance records in one transaction"""
+        with self._lock:
+            self.flush_locked()
+    
+    def flush_if_due(self):
+        """Flush when records have waited longer than flush_interval"""
+        with self._lock:
+            if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush_locked()
+    
+    def flush_locked(self):
+        if self._pending:
+            records, self._pending = self._pending, []
+            try:
+                if self.journal is not None:
+                    self.journal.append(records)
+                else:
+                    self.db_manager.record_attendance_batch(records)
+            except Exception:
+                # Keep the records for the next flush rather than losing them
+                self._pending = records + self._pending
+                raise
+        self._last_flush = time.monotonic()
+    
+    def present_ids(self):
+        """Roster students marked present or late"""
+        return {student_id for student_id, index in self.roster_index.items()
+                if self.present_bits[index >> 3] & (1 << (index & 7))}
+    
+    def close(self, when=None):
+        """Flush, record every unmarked roster student as absent and return the counts"""
+        # If a write fails the exception propagates and close() can simply be called again
+        when = when or datetime.now()
+        with self._lock:
+            if self.absent is None:
+                self.closed = True
+                self.absent = sorted(set(self.roster) - self.present_ids())
+                close_time = min(when, self.end).strftime("%H:%M:%S")
+                self._pending.extend((student_id, self.course_name, self.date, close_time, 'absent',
+                                      self.session_id) for student_id in self.absent)
+            self.flush_locked()
+            
+            if self.summary is None:
+                marked = len(self.present_ids()) + len(self.visitors)
+                self.summary = {
+                    'session_id': self.session_id,
+                    'present': marked - len(self.late),
+                    'late': len(self.late),
+                    'absent': self.absent
+                }
+        
+        self.db_manager.close_attendance_session(self.session_id, when.strftime("%Y-%m-%d %H:%M:%S"),
+                                                 self.summary['present'], self.summary['late'],
+                                                 len(self.absent))
+        return self.summary
@@ -1,12 +1,21 @@
 import sqlite3
 import os
+import re
 from datetime import datetime
+from monitoring.performance_metrics import metrics
+
+# Week bucket used by the attendance summary tables (falls back to the raw date)
+WEEK_EXPRESSION = "COALESCE(strftime('%Y-W%W', {date}), {date})"
 
 class DatabaseManager:
     def __init__(self, db_path="database/students.db"):
         self.db_path = db_path
+        self.search_backend = 'like'
+        self.search_indexes = set()
         self.ensure_database_exists()
         self.create_tables()
+        self.create_search_index()
+        self.create_attendance_summaries()
     
     def ensure_database_exists(self):
         """Ensure the database directory exists"""
@@ -45,9 +54,253 @@ class DatabaseManager:
             )
         ''')
         
+        # Index backing the keyset-paginated student list
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_students_name_id ON students (name, id)
+        ''')
+        
+        # Class meetings with a time window; attendance rows point at the session they came from
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS attendance_sessions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                course_name TEXT NOT NULL,
+                room TEXT,
+                date TEXT NOT NULL,
+                start_time TEXT NOT NULL,
+                end_time TEXT NOT NULL,
+                late_time TEXT,
+                closed_at TEXT,
+                present_count INTEGER,
+                late_count INTEGER,
+                absent_count INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Courses and their enrolled students; a roster limits which faces recognition expects
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS courses (
+                course_name TEXT PRIMARY KEY,
+                room TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS enrollments (
+                course_name TEXT NOT NULL,
+                student_id TEXT NOT NULL,
+                enrolled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (course_name, student_id),
+                FOREIGN KEY (course_name) REFERENCES courses (course_name),
+                FOREIGN KEY (student_id) REFERENCES students (student_id)
+            )
+        ''')
+        
+        # Last attendance journal entry written to this database, per journal file
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS attendance_journal_state (
+                journal TEXT PRIMARY KEY,
+                applied_seq INTEGER NOT NULL
+            )
+        ''')
+        
+        # Bumped by every update so the students data version changes even when count and ids do not
+        cursor.execute("PRAGMA table_info(students)")
+        if 'revision' not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE students ADD COLUMN revision INTEGER NOT NULL DEFAULT 0')
+        
+        cursor.execute("PRAGMA table_info(attendance)")
+        if 'session_id' not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE attendance ADD COLUMN session_id INTEGER REFERENCES attendance_sessions (id)')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_attendance_session ON attendance (session_id)
+        ''')
+        
+        conn.commit()
+        conn.close()
+    
+    def create_search_index(self):
+        """Create FTS5 word and trigram indexes over students, falling back to LIKE"""
+        # Word index with prefix support for incremental search; trigram index for
+        # typo-tolerant matching (SQLite 3.34+). Each is created or skipped on its own
+        if self.create_fts_index('students_fts', "prefix='2 3'"):
+            self.search_indexes.add('students_fts')
+            self.search_backend = 'fts5'
+        else:
+            print("FTS5 search unavailable, using LIKE search")
+            return
+        if self.create_fts_index('students_trigram', "tokenize='trigram'"):
+            self.search_indexes.add('students_trigram')
+        else:
+            print("Trigram index unavailable, search is not typo-tolerant")
+    
+    def create_fts_index(self, table, options):
+        """Create an external-content FTS5 index, its triggers and its contents in one transaction"""
+        # Without isolation_level=None the sqlite3 module commits each CREATE on its own, and a
+        # failure could leave an index without the triggers that keep it current
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        cursor = conn.cursor()
+        triggers = [f'{table}_ai', f'{table}_ad', f'{table}_au']
+        
+        try:
+            cursor.execute('BEGIN')
+            cursor.execute('SELECT name FROM sqlite_master WHERE name IN (?, ?, ?, ?)', [table] + triggers)
+            # An index missing any trigger (left by an older version) may be stale, so it is rebuilt
+            needs_rebuild = len(cursor.fetchall()) < 1 + len(triggers)
+            
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(
+                    student_id, name, email,
+                    content='students', content_rowid='id', {options}
+                )
+            ''')
+            
+            # Keep the external-content index in sync with the students table
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON students BEGIN
+                    INSERT INTO {table} (rowid, student_id, name, email)
+                    VALUES (new.id, new.student_id, new.name, new.email);
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON students BEGIN
+                    INSERT INTO {table} ({table}, rowid, student_id, name, email)
+                    VALUES ('delete', old.id, old.student_id, old.name, old.email);
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE ON students BEGIN
+                    INSERT INTO {table} ({table}, rowid, student_id, name, email)
+                    VALUES ('delete', old.id, old.student_id, old.name, old.email);
+                    INSERT INTO {table} (rowid, student_id, name, email)
+                    VALUES (new.id, new.student_id, new.name, new.email);
+                END
+            ''')
+            
+            # Index students that existed before the search index was added
+            if needs_rebuild:
+                cursor.execute(f"INSERT INTO {table} ({table}) VALUES ('rebuild')")
+            
+            cursor.execute('COMMIT')
+            return True
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                cursor.execute('ROLLBACK')
+            print(f"Error creating search index {table}: {e}")
+            return False
+        finally:
+            conn.close()
+    
+    def create_attendance_summaries(self):
+        """Create the incrementally maintained attendance summary tables"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT name FROM sqlite_master WHERE name = 'attendance_presence'")
+        needs_backfill = cursor.fetchone() is None
+        
+        # One row per student, course and day, however many photos matched
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS attendance_presence (
+                student_id TEXT NOT NULL,
+                course_name TEXT NOT NULL,
+                date TEXT NOT NULL,
+                week TEXT NOT NULL,
+                first_time TEXT NOT NULL,
+                PRIMARY KEY (student_id, course_name, date)
+            )
+        ''')
+        
+        # Days a course was held and how many students were present
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS course_day_summary (
+                course_name TEXT NOT NULL,
+                date TEXT NOT NULL,
+                week TEXT NOT NULL,
+                present_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (course_name, date)
+            )
+        ''')
+        
+        # Per-student, per-course, per-week day counts
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS student_week_summary (
+                student_id TEXT NOT NULL,
+                course_name TEXT NOT NULL,
+                week TEXT NOT NULL,
+                days_present INTEGER NOT NULL DEFAULT 0,
+                last_date TEXT NOT NULL,
+                PRIMARY KEY (course_name, student_id, week)
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_attendance_course_date ON attendance (course_name, date)
+        ''')
+        
+        if needs_backfill:
+            self.rebuild_attendance_summaries(cursor)
+        
         conn.commit()
         conn.close()
     
+    def rebuild_attendance_summaries(self, cursor):
+        """Recompute all attendance summary tables from the raw attendance rows"""
+        week = WEEK_EXPRESSION.format(date='date')
+        
+        cursor.execute('DELETE FROM attendance_presence')
+        cursor.execute('DELETE FROM course_day_summary')
+        cursor.execute('DELETE FROM student_week_summary')
+        
+        # Absence rows written when a session closes are not presence
+        cursor.execute(f'''
+            INSERT INTO attendance_presence (student_id, course_name, date, week, first_time)
+            SELECT student_id, course_name, date, {week}, MIN(time)
+            FROM attendance
+            WHERE COALESCE(status, 'present') != 'absent'
+            GROUP BY student_id, course_name, date
+        ''')
+        cursor.execute('''
+            INSERT INTO course_day_summary (course_name, date, week, present_count)
+            SELECT course_name, date, week, COUNT(*)
+            FROM attendance_presence
+            GROUP BY course_name, date
+        ''')
+        cursor.execute('''
+            INSERT INTO student_week_summary (student_id, course_name, week, days_present, last_date)
+            SELECT student_id, course_name, week, COUNT(*), MAX(date)
+            FROM attendance_presence
+            GROUP BY student_id, course_name, week
+        ''')
+    
+    def update_attendance_summaries(self, cursor, student_id, course_name, date, time, status='present'):
+        """Fold one attendance record into the summary tables"""
+        if status == 'absent':
+            return
+        week = WEEK_EXPRESSION.format(date='?')
+        
+        cursor.execute(f'''
+            INSERT OR IGNORE INTO attendance_presence (student_id, course_name, date, week, first_time)
+            VALUES (?, ?, ?, {week}, ?)
+        ''', (student_id, course_name, date, date, date, time))
+        
+        # Repeat sightings on the same day do not change any aggregate
+        if cursor.rowcount == 0:
+            return
+        
+        cursor.execute(f'''
+            INSERT INTO course_day_summary (course_name, date, week, present_count)
+            VALUES (?, ?, {week}, 1)
+            ON CONFLICT (course_name, date) DO UPDATE SET present_count = present_count + 1
+        ''', (course_name, date, date, date))
+        cursor.execute(f'''
+            INSERT INTO student_week_summary (student_id, course_name, week, days_present, last_date)
+            VALUES (?, ?, {week}, 1, ?)
+            ON CONFLICT (course_name, student_id, week) DO UPDATE SET
+                days_present = days_present + 1,
+                last_date = MAX(last_date, excluded.last_date)
+        ''', (student_id, course_name, date, date, date))
+    
     def add_student(self, student_id, name, email, cgpa, advisor, address):
         """Add a new student to the database"""
         conn = sqlite3.connect(self.db_path)
@@ -65,6 +318,24 @@ class DatabaseManager:
         finally:
             conn.close()
     
+    def update_student(self, student_id, name=None, email=None, cgpa=None, advisor=None, address=None):
+        """Update the given fields of a student; returns False if there is no such student"""
+        fields = [(column, value) for column, value in (('name', name), ('email', email), ('cgpa', cgpa),
+                                                        ('advisor', advisor), ('address', address))
+                  if value is not None]
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        try:
+            assignments = ''.join(f"{column} = ?, " for column, _ in fields)
+            cursor.execute(f'UPDATE students SET {assignments}revision = revision + 1 WHERE student_id = ?',
+                           [value for _, value in fields] + [student_id])
+            conn.commit()
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+    
+    @metrics.timed('db.get_student')
     def get_student(self, student_id):
         """Get student information by ID"""
         conn = sqlite3.connect(self.db_path)
@@ -87,6 +358,23 @@ class DatabaseManager:
             }
         return None
     
+    def get_student_names(self, student_ids, chunk_size=500):
+        """Map student ids to names with one query per chunk"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        names = {}
+        student_ids = list(student_ids)
+        # Chunks stay below SQLite's limit on bound parameters
+        for start in range(0, len(student_ids), chunk_size):
+            chunk = student_ids[start:start + chunk_size]
+            cursor.execute(f"SELECT student_id, name FROM students WHERE student_id IN ({','.join('?' * len(chunk))})",
+                           chunk)
+            names.update(cursor.fetchall())
+        conn.close()
+        
+        return names
+    
     def get_all_students(self):
         """Get all students from the database"""
         conn = sqlite3.connect(self.db_path)
@@ -110,26 +398,324 @@ class DatabaseManager:
             })
         return students
     
-    def record_attendance(self, student_id, course_name, date, time):
+    @metrics.timed('db.count_students')
+    def count_students(self):
+        """Get the number of registered students"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT COUNT(*) FROM students')
+        count = cursor.fetchone()[0]
+        conn.close()
+        
+        return count
+    
+    @metrics.timed('db.get_students_page')
+    def get_students_page(self, after=None, limit=100):
+        """Get one page of students ordered by name, starting after a (name, id) key"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        if after is None:
+            cursor.execute('SELECT * FROM students ORDER BY name, id LIMIT ?', (limit,))
+        else:
+            cursor.execute('''
+                SELECT * FROM students
+                WHERE (name, id) > (?, ?)
+                ORDER BY name, id
+                LIMIT ?
+            ''', (after[0], after[1], limit))
+        results = cursor.fetchall()
+        conn.close()
+        
+        students = []
+        for result in results:
+            students.append({
+                'id': result[0],
+                'student_id': result[1],
+                'name': result[2],
+                'email': result[3],
+                'cgpa': result[4],
+                'advisor': result[5],
+                'address': result[6],
+                'created_at': result[7]
+            })
+        
+        # Key to pass as `after` for the next page, None when exhausted
+        next_key = None
+        if len(students) == limit:
+            next_key = (students[-1]['name'], students[-1]['id'])
+        
+        return students, next_key
+    
+    @metrics.timed('db.search_students')
+    def search_students(self, query, limit=20):
+        """Search students by ID, name or email with prefix and fuzzy matching"""
+        query = query.strip()
+        if not query:
+            return []
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        try:
+            if self.search_backend != 'fts5':
+                pattern = f"%{query}%"
+                cursor.execute('''
+                    SELECT * FROM students
+                    WHERE student_id LIKE ? OR name LIKE ? OR email LIKE ?
+                    ORDER BY name, id
+                    LIMIT ?
+                ''', (pattern, pattern, pattern, limit))
+                return [self.row_to_student(row) for row in cursor.fetchall()]
+            
+            results = []
+            seen_ids = set()
+            
+            # Exact student ID match always comes first
+            cursor.execute('SELECT * FROM students WHERE student_id = ?', (query,))
+            for row in cursor.fetchall():
+                results.append(self.row_to_student(row))
+                seen_ids.add(row[0])
+            
+            # Prefix match on every word of the query
+            words = re.findall(r'\w+', query.lower())
+            if words and len(results) < limit:
+                match = ' '.join(f'"{word}"*' for word in words)
+                cursor.execute('''
+                    SELECT s.* FROM students_fts f
+                    JOIN students s ON s.id = f.rowid
+                    WHERE students_fts MATCH ?
+                    ORDER BY f.rank
+                    LIMIT ?
+                ''', (match, limit))
+                for row in cursor.fetchall():
+                    if row[0] not in seen_ids and len(results) < limit:
+                        results.append(self.row_to_student(row))
+                        seen_ids.add(row[0])
+            
+            # Trigram fallback for typos: rank candidates by shared trigrams
+            trigrams = self.query_trigrams(query) if 'students_trigram' in self.search_indexes else []
+            if trigrams and len(results) < limit:
+                match = ' OR '.join('"' + trigram.replace('"', '""') + '"' for trigram in trigrams)
+                cursor.execute('''
+                    SELECT s.* FROM students_trigram t
+                    JOIN students s ON s.id = t.rowid
+                    WHERE students_trigram MATCH ?
+                    ORDER BY t.rank
+                    LIMIT ?
+                ''', (match, limit * 5))
+                
+                candidates = []
+                for row in cursor.fetchall():
+                    if row[0] in seen_ids:
+                        continue
+                    text = ' '.join(str(value).lower() for value in row[1:4])
+                    shared = sum(1 for trigram in trigrams if trigram in text)
+                    similarity = shared / len(trigrams)
+                    if similarity >= 0.3:
+                        candidates.append((similarity, row))
+                
+                candidates.sort(key=lambda candidate: -candidate[0])
+                for similarity, row in candidates[:limit - len(results)]:
+                    results.append(self.row_to_student(row))
+            
+            return results
+        except sqlite3.OperationalError as e:
+            print(f"Error searching students: {e}")
+            return []
+        finally:
+            conn.close()
+    
+    def query_trigrams(self, query):
+        """Split a search query into the distinct trigrams of its words"""
+        trigrams = []
+        for word in re.findall(r'\w+', query.lower()):
+            for i in range(len(word) - 2):
+                trigram = word[i:i+3]
+                if trigram not in trigrams:
+                    trigrams.append(trigram)
+        return trigrams
+    
+    def row_to_student(self, result):
+        """Convert a students row into a student dictionary"""
+        return {
+            'id': result[0],
+            'student_id': result[1],
+            'name': result[2],
+            'email': result[3],
+            'cgpa': result[4],
+            'advisor': result[5],
+            'address': result[6],
+            'created_at': result[7]
+        }
+    
+    @metrics.timed('db.record_attendance')
+    def record_attendance(self, student_id, course_name, date, time, status='present', session_id=None):
         """Record attendance for a student"""
+        self.record_attendance_batch([(student_id, course_name, date, time, status, session_id)])
+    
+    @metrics.timed('db.record_attendance_batch')
+    def record_attendance_batch(self, records, journal=None, journal_seq=None):
+        """Record many (student_id, course_name, date, time, status, session_id) rows in one transaction"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        try:
+            for student_id, course_name, date, time, status, session_id in records:
+                cursor.execute('''
+                    INSERT INTO attendance (student_id, course_name, date, time, status, session_id)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (student_id, course_name, date, time, status, session_id))
+                self.update_attendance_summaries(cursor, student_id, course_name, date, time, status)
+            if journal is not None:
+                # Committed with the rows, so a replayed journal never inserts them twice
+                cursor.execute('''
+                    INSERT INTO attendance_journal_state (journal, applied_seq) VALUES (?, ?)
+                    ON CONFLICT (journal) DO UPDATE SET applied_seq = excluded.applied_seq
+                ''', (journal, journal_seq))
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def create_attendance_session(self, course_name, room, date, start_time, end_time, late_time=None):
+        """Create an attendance session and return its id"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute('''
-            INSERT INTO attendance (student_id, course_name, date, time)
-            VALUES (?, ?, ?, ?)
-        ''', (student_id, course_name, date, time))
+            INSERT INTO attendance_sessions (course_name, room, date, start_time, end_time, late_time)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (course_name, room, date, start_time, end_time, late_time))
+        session_id = cursor.lastrowid
         
         conn.commit()
         conn.close()
+        return session_id
+    
+    def close_attendance_session(self, session_id, closed_at, present_count, late_count, absent_count):
+        """Store the final counts of a session"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            UPDATE attendance_sessions
+            SET closed_at = ?, present_count = ?, late_count = ?, absent_count = ?
+            WHERE id = ?
+        ''', (closed_at, present_count, late_count, absent_count, session_id))
+        
+        conn.commit()
+        conn.close()
+    
+    def get_journal_applied_seq(self, journal):
+        """Sequence number of the last journal entry written to the database, or 0"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT applied_seq FROM attendance_journal_state WHERE journal = ?', (journal,))
+        result = cursor.fetchone()
+        conn.close()
+        
+        return result[0] if result else 0
+    
+    def get_student_ids(self):
+        """Get the ids of all registered students"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT student_id FROM students ORDER BY student_id')
+        student_ids = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        
+        return student_ids
+    
+    def add_course(self, course_name, room=None):
+        """Add a course, or update the room of an existing one"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                INSERT INTO courses (course_name, room) VALUES (?, ?)
+                ON CONFLICT (course_name) DO UPDATE SET room = COALESCE(excluded.room, room)
+            ''', (course_name, room))
+            
+            conn.commit()
+            conn.close()
+            return True, "Course saved successfully"
+        except Exception as e:
+            return False, f"Error saving course: {str(e)}"
+    
+    def get_courses(self):
+        """Get all courses with their number of enrolled students"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT c.course_name, c.room, COUNT(e.student_id)
+            FROM courses c
+            LEFT JOIN enrollments e ON e.course_name = c.course_name
+            GROUP BY c.course_name
+            ORDER BY c.course_name
+        ''')
+        courses = [{'course_name': row[0], 'room': row[1], 'enrolled': row[2]} for row in cursor.fetchall()]
+        conn.close()
+        
+        return courses
     
+    def enroll_students(self, course_name, student_ids):
+        """Enroll students in a course, creating the course if needed"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            cursor.execute('INSERT OR IGNORE INTO courses (course_name) VALUES (?)', (course_name,))
+            cursor.executemany('INSERT OR IGNORE INTO enrollments (course_name, student_id) VALUES (?, ?)',
+                               [(course_name, student_id) for student_id in student_ids])
+            enrolled = cursor.rowcount
+            
+            conn.commit()
+            conn.close()
+            return True, f"Enrolled {enrolled} students in {course_name}"
+        except Exception as e:
+            return False, f"Error enrolling students: {str(e)}"
+    
+    def unenroll_students(self, course_name, student_ids):
+        """Remove students from a course"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            cursor.executemany('DELETE FROM enrollments WHERE course_name = ? AND student_id = ?',
+                               [(course_name, student_id) for student_id in student_ids])
+            removed = cursor.rowcount
+            
+            conn.commit()
+            conn.close()
+            return True, f"Removed {removed} students from {course_name}"
+        except Exception as e:
+            return False, f"Error removing students: {str(e)}"
+    
+    def get_course_roster(self, course_name):
+        """Get the ids of the students enrolled in a course"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT student_id FROM enrollments WHERE course_name = ? ORDER BY student_id',
+                       (course_name,))
+        student_ids = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        
+        return student_ids
+    
+    @metrics.timed('db.get_attendance')
     def get_attendance(self, course_name, date):
         """Get attendance records for a specific course and date"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute('''
-            SELECT a.*, s.name 
+            SELECT a.id, a.student_id, a.course_name, a.date, a.time, a.status, s.name
             FROM attendance a
             JOIN students s ON a.student_id = s.student_id
             WHERE a.course_name = ? AND a.date = ?
@@ -148,6 +734,117 @@ class DatabaseManager:
                 'date': result[3],
                 'time': result[4],
                 'status': result[5],
-                'student_name': result[7]
+                'student_name': result[6]
+            })
+        return attendance_records
+    
+    def build_attendance_filter(self, course_names=None, start_date=None, end_date=None):
+        """Build the WHERE clause shared by the attendance range queries"""
+        conditions = []
+        params = []
+        
+        if course_names:
+            conditions.append(f"a.course_name IN ({', '.join('?' for _ in course_names)})")
+            params.extend(course_names)
+        if start_date:
+            conditions.append('a.date >= ?')
+            params.append(start_date)
+        if end_date:
+            conditions.append('a.date <= ?')
+            params.append(end_date)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return where, params
+    
+    @metrics.timed('db.count_attendance')
+    def count_attendance(self, course_names=None, start_date=None, end_date=None):
+        """Count attendance records for a set of courses and a date range"""
+        where, params = self.build_attendance_filter(course_names, start_date, end_date)
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute(f'SELECT COUNT(*) FROM attendance a {where}', params)
+        count = cursor.fetchone()[0]
+        conn.close()
+        
+        return count
+    
+    @metrics.timed('db.get_attendance_page')
+    def get_attendance_page(self, after_id=0, limit=100, course_names=None, start_date=None, end_date=None):
+        """Get attendance records with an id above after_id, oldest first"""
+        where, params = self.build_attendance_filter(course_names, start_date, end_date)
+        where = f"{where} AND a.id > ?" if where else "WHERE a.id > ?"
+        params.append(after_id or 0)
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute(f'''
+            SELECT a.id, a.student_id, a.course_name, a.date, a.time, a.status, COALESCE(s.name, '')
+            FROM attendance a
+            LEFT JOIN students s ON a.student_id = s.student_id
+            {where}
+            ORDER BY a.id
+            LIMIT ?
+        ''', params + [limit])
+        results = cursor.fetchall()
+        conn.close()
+        
+        attendance_records = []
+        for result in results:
+            attendance_records.append({
+                'id': result[0],
+                'student_id': result[1],
+                'course_name': result[2],
+                'date': result[3],
+                'time': result[4],
+                'status': result[5],
+                'student_name': result[6]
             })
-        return attendance_records
\ No newline at end of file
+        
+        # Id to pass as after_id for the next page, None when exhausted
+        next_after = attendance_records[-1]['id'] if len(attendance_records) == limit else None
+        return attendance_records, next_after
+    
+    def get_data_version(self):
+        """Cheap change markers for the students and attendance tables"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT COUNT(*), COALESCE(MAX(id), 0), COALESCE(SUM(revision), 0) FROM students')
+        students = cursor.fetchone()
+        # Attendance is append-only, so the highest id is enough and avoids a full count
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM attendance')
+        attendance = cursor.fetchone()[0]
+        conn.close()
+        
+        return {
+            'students': f"{students[0]}-{students[1]}-{students[2]}",
+            'attendance': str(attendance),
+            'latest_attendance_id': attendance
+        }
+    
+    def iter_attendance(self, course_names=None, start_date=None, end_date=None, chunk_size=1000):
+        """Yield attendance rows in chunks straight from the cursor"""
+        where, params = self.build_attendance_filter(course_names, start_date, end_date)
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(f'''
+                SELECT a.student_id, COALESCE(s.name, ''), a.course_name, a.date, a.time, a.status
+                FROM attendance a
+                LEFT JOIN students s ON a.student_id = s.student_id
+                {where}
+                ORDER BY a.course_name, a.date, a.time
+            ''', params)
+            
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
@@ -0,0 +1,93 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+from monitoring.performance_metrics import metrics
+
+class BatchRecognizer:
+    """Collects images from many callers and recognizes them in micro-batches"""
+    
+    def __init__(self, face_recognition, max_batch_size=8, max_wait_ms=20):
+        self.face_recognition = face_recognition
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._running = False
+    
+    def start(self):
+        """Start the batching worker thread"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self.worker, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the worker after the queued images are processed"""
+        if not self._running:
+            return
+        self._running = False
+        self._queue.put(None)
+        self._thread.join()
+    
+    def submit(self, image, regions=None, cache=None, roster=None):
+        """Queue a BGR image, optionally limited to (x, y, w, h) regions; returns a Future"""
+        future = Future()
+        self._queue.put((image, regions, cache, roster, future, time.perf_counter()))
+        return future
+    
+    def recognize(self, image, timeout=None, regions=None, cache=None, roster=None):
+        """Recognize faces in an image, blocking until its batch is processed"""
+        return self.submit(image, regions, cache, roster).result(timeout)
+    
+    def collect_batch(self, first_item):
+        """Gather more queued images until the batch is full or the wait expires"""
+        batch = [first_item]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the stop marker back so the worker exits after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+    
+    def worker(self):
+        """Process batches until stopped"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            
+            batch = self.collect_batch(item)
+            images = [item[0] for item in batch]
+            options = {}
+            regions = [item[1] for item in batch]
+            if any(image_regions is not None for image_regions in regions):
+                options['regions'] = regions
+            caches = [item[2] for item in batch]
+            if any(cache is not None for cache in caches):
+                options['caches'] = caches
+            rosters = [item[3] for item in batch]
+            if any(roster is not None for roster in rosters):
+                options['rosters'] = rosters
+            
+            try:
+                with metrics.time('batch.process'):
+                    results = self.face_recognition.process_images(images, **options)
+                now = time.perf_counter()
+                for (_, _, _, _, future, queued_at), result in zip(batch, results):
+                    metrics.record('batch.queue_to_result', now - queued_at)
+                    future.set_result(result)
+            except Exception as e:
+                for _, _, _, _, future, _ in batch:
+                    future.set_exception(e)
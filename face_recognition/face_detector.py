@@ -4,17 +4,87 @@ from mtcnn import MTCNN # type: ignore
 import tensorflow as tf # type: ignore
 from tensorflow.keras.models import load_model # type: ignore
 import os
+import json
 import pickle
-from sklearn.preprocessing import LabelEncoder
-from sklearn.svm import SVC
-import joblib
+import hashlib
+import time
+import threading
+from face_recognition.open_set import UnknownFaceClusterer
+from face_recognition.recognizer_format import LinearRecognizer
+from face_recognition.model_store import ModelStore, ModelState, ENCODER_WEIGHTS_PATH
+from face_recognition.file_lock import FileLock
+from face_recognition.image_decoder import decode_image, ATTENDANCE_FACE_FRACTION, ATTENDANCE_FACE_SIZE
+from monitoring.performance_metrics import metrics
+
+THRESHOLDS_PATH = 'models/thresholds.json'
+
+def expand_region(region, margin, min_size, width, height):
+    """Grow an (x, y, w, h) region by a margin and clip it to the frame"""
+    x, y, w, h = region
+    pad_x = max(int(w * margin), (min_size - w) // 2, 0)
+    pad_y = max(int(h * margin), (min_size - h) // 2, 0)
+    x1, y1 = max(0, x - pad_x), max(0, y - pad_y)
+    x2, y2 = min(width, x + w + pad_x), min(height, y + h + pad_y)
+    return (x1, y1, x2 - x1, y2 - y1)
+
+def merge_regions(regions):
+    """Merge overlapping (x, y, w, h) regions until none overlap"""
+    merged = [list(region) for region in regions if region[2] > 0 and region[3] > 0]
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(i + 1, len(merged)):
+                ax, ay, aw, ah = merged[i]
+                bx, by, bw, bh = merged[j]
+                if ax <= bx + bw and bx <= ax + aw and ay <= by + bh and by <= ay + ah:
+                    x1, y1 = min(ax, bx), min(ay, by)
+                    x2, y2 = max(ax + aw, bx + bw), max(ay + ah, by + bh)
+                    merged[i] = [x1, y1, x2 - x1, y2 - y1]
+                    del merged[j]
+                    changed = True
+                    break
+            if changed:
+                break
+    return [tuple(region) for region in merged]
+
+def box_iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes"""
+    ix = max(0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+    intersection = ix * iy
+    union = a[2] * a[3] + b[2] * b[3] - intersection
+    return intersection / union if union > 0 else 0.0
+
+def ensure_encoder_weights(encoder):
+    """Save an encoder's weights as the shared initial weights unless they already exist"""
+    if os.path.exists(ENCODER_WEIGHTS_PATH):
+        return
+    # Processes starting together (pool workers) would otherwise each save their own random
+    # weights to the same file; the first one to get the lock writes it whole
+    with FileLock(ENCODER_WEIGHTS_PATH + '.lock'):
+        if os.path.exists(ENCODER_WEIGHTS_PATH):
+            return
+        temp_path = f"{os.path.splitext(ENCODER_WEIGHTS_PATH)[0]}.{os.getpid()}.tmp.h5"
+        encoder.save_weights(temp_path)
+        os.replace(temp_path, ENCODER_WEIGHTS_PATH)
 
 class FaceRecognitionSystem:
-    def __init__(self):
+    def __init__(self, collect_unknowns=True):
         self.detector = MTCNN()
         self.face_encoder = None
-        self.classifier = None
-        self.label_encoder = None
+        # The recognizer (classifier and open-set layer) is swapped as one ModelState
+        self.model_store = ModelStore()
+        self.models = ModelState()
+        self.reload_interval = 1.0
+        self._pointer_stamp = None
+        self._next_reload_check = 0.0
+        self._reload_lock = threading.Lock()
+        # Pool workers leave the shared cluster index to the parent process
+        self.unknown_faces = UnknownFaceClusterer() if collect_unknowns else None
+        # Defaults; tuned values from training/threshold_tuner.py are loaded below
+        self.detection_threshold = 0.9
+        self.recognition_threshold = 0.7
         self.load_models()
         
     def load_models(self):
@@ -24,14 +94,90 @@ class FaceRecognitionSystem:
             # In a real implementation, you would load the actual FaceNet model
             self.face_encoder = self.create_simple_encoder()
             
-            # Load classifier if exists
-            if os.path.exists('models/face_classifier.pkl'):
-                self.classifier = joblib.load('models/face_classifier.pkl')
-                self.label_encoder = joblib.load('models/label_encoder.pkl')
+            # The encoder starts from random weights, so keep the first ones; embeddings
+            # from different processes and runs are only comparable when they share the same
+            # weights, so every process loads them from disk
+            ensure_encoder_weights(self.face_encoder)
+            self.face_encoder.load_weights(ENCODER_WEIGHTS_PATH)
+            
+            # Load the published classifier, or one saved before the model store existed
+            self._pointer_stamp = self.model_store.pointer_stamp()
+            self.models = self.model_store.load() or self.model_store.load_legacy() or ModelState()
+            self.check_encoder_fingerprint(self.models)
+            
+            if os.path.exists(THRESHOLDS_PATH):
+                with open(THRESHOLDS_PATH, 'r', encoding='utf-8') as f:
+                    thresholds = json.load(f)
+                self.detection_threshold = thresholds.get('detection_threshold', self.detection_threshold)
+                self.recognition_threshold = thresholds.get('recognition_threshold', self.recognition_threshold)
         except Exception as e:
             print(f"Error loading models: {e}")
     
-    def create_simple_encoder(self):
+    @property
+    def classifier(self):
+        return self.models.recognizer
+    
+    @property
+    def open_set(self):
+        return self.models.recognizer.open_set if self.models.recognizer is not None else None
+    
+    @property
+    def model_version(self):
+        return self.models.version
+    
+    def maybe_reload(self):
+        """Switch to a newly published model version; called between requests"""
+        now = time.monotonic()
+        if now < self._next_reload_check:
+            return False
+        self._next_reload_check = now + self.reload_interval
+        
+        stamp = self.model_store.pointer_stamp()
+        if stamp is None or stamp == self._pointer_stamp:
+            return False
+        with self._reload_lock:
+            if stamp == self._pointer_stamp:
+                return False
+            try:
+                models = self.model_store.load()
+            except Exception as e:
+                print(f"Error reloading models: {e}")
+                return False
+            self._pointer_stamp = stamp
+            if models is None or models.version == self.models.version:
+                return False
+            # In-flight requests keep the state they started with; session caches drop
+            # results of the old version on their next lookup
+            self.check_encoder_fingerprint(models)
+            self.models = models
+            return True
+    
+    def rollback_models(self, version=None):
+        """Make an earlier published model version current and switch to it"""
+        success, message = self.model_store.rollback(version)
+        if success:
+            self._next_reload_check = 0.0
+            self.maybe_reload()
+        return success, message
+    
+    def check_encoder_fingerprint(self, models):
+        """Warn when a recognizer was trained on embeddings from different encoder weights"""
+        fingerprint = getattr(models.recognizer, 'encoder_fingerprint', None)
+        if fingerprint and fingerprint != self.encoder_fingerprint():
+            print(f"Warning: model version {models.version} was trained with different encoder weights; retrain the system")
+    
+    def encoder_fingerprint(self):
+        """Hash of the encoder weights; cached embeddings are only valid for the same weights"""
+        digest = hashlib.sha1()
+        if self.face_encoder is not None:
+            for weights in self.face_encoder.get_weights():
+                digest.update(weights.tobytes())
+        else:
+            digest.update(b'simple_feature_extraction')
+        return digest.hexdigest()
+    
+    @staticmethod
+    def create_simple_encoder():
         """Create a simple face encoder (placeholder for FaceNet)"""
         # This is a simplified version - in reality, you'd use pre-trained FaceNet
         model = tf.keras.Sequential([
@@ -58,11 +204,12 @@ class FaceRecognitionSystem:
                 rgb_image = image
             
             # Detect faces
-            results = self.detector.detect_faces(rgb_image)
+            with metrics.time('detection.mtcnn'):
+                results = self.detector.detect_faces(rgb_image)
             
             faces = []
             for result in results:
-                if result['confidence'] > 0.9:  # High confidence threshold
+                if result['confidence'] > self.detection_threshold:
                     x, y, w, h = result['box']
                     # Ensure coordinates are within image bounds
                     x = max(0, x)
@@ -82,6 +229,36 @@ class FaceRecognitionSystem:
             print(f"Error detecting faces: {e}")
             return []
     
+    def detect_faces_in_regions(self, image, regions, margin=0.25, min_size=96,
+                                max_area_fraction=0.6):
+        """Detect faces only inside the given (x, y, w, h) regions, in full-frame coordinates"""
+        if not regions:
+            return []
+        
+        height, width = image.shape[:2]
+        rois = merge_regions([expand_region(region, margin, min_size, width, height)
+                              for region in regions])
+        
+        # Once most of the frame is active, one full pass is cheaper than many crops
+        if sum(w * h for _, _, w, h in rois) >= max_area_fraction * width * height:
+            return self.detect_faces(image)
+        
+        faces = []
+        with metrics.time('detection.regions'):
+            for x, y, w, h in rois:
+                for face_data in self.detect_faces(image[y:y+h, x:x+w]):
+                    fx, fy, fw, fh = face_data['box']
+                    face_data['box'] = (fx + x, fy + y, fw, fh)
+                    faces.append(face_data)
+        
+        # Faces cut by a region border can be found twice; keep the most confident
+        faces.sort(key=lambda face_data: face_data['confidence'], reverse=True)
+        unique_faces = []
+        for face_data in faces:
+            if all(box_iou(face_data['box'], kept['box']) < 0.5 for kept in unique_faces):
+                unique_faces.append(face_data)
+        return unique_faces
+    
     def preprocess_face(self, face):
         """Preprocess face for recognition"""
         try:
@@ -97,7 +274,8 @@ class FaceRecognitionSystem:
     def extract_face_encoding(self, face):
         """Extract face encoding using the encoder model"""
         try:
-            preprocessed_face = self.preprocess_face(face)
+            with metrics.time('embedding.preprocess'):
+                preprocessed_face = self.preprocess_face(face)
             if preprocessed_face is None:
                 return None
             
@@ -106,7 +284,8 @@ class FaceRecognitionSystem:
             
             # Get encoding
             if self.face_encoder:
-                encoding = self.face_encoder.predict(face_batch, verbose=0)
+                with metrics.time('embedding.encoder_predict'):
+                    encoding = self.face_encoder.predict(face_batch, verbose=0)
                 return encoding[0]
             else:
                 # Fallback: use simple feature extraction
@@ -115,6 +294,29 @@ class FaceRecognitionSystem:
             print(f"Error extracting face encoding: {e}")
             return None
     
+    def extract_face_encodings(self, faces):
+        """Extract encodings for many faces with a single encoder call"""
+        encodings = [None] * len(faces)
+        try:
+            with metrics.time('embedding.preprocess'):
+                preprocessed = [self.preprocess_face(face) for face in faces]
+            valid = [i for i, face in enumerate(preprocessed) if face is not None]
+            if not valid:
+                return encodings
+            
+            if self.face_encoder:
+                face_batch = np.stack([preprocessed[i] for i in valid])
+                with metrics.time('embedding.encoder_predict_batch'):
+                    batch_encodings = self.face_encoder.predict(face_batch, verbose=0)
+                for i, encoding in zip(valid, batch_encodings):
+                    encodings[i] = encoding
+            else:
+                for i in valid:
+                    encodings[i] = self.simple_feature_extraction(preprocessed[i])
+        except Exception as e:
+            print(f"Error extracting face encodings: {e}")
+        return encodings
+    
     def simple_feature_extraction(self, face):
         """Simple feature extraction as fallback"""
         # Convert to grayscale and extract basic features
@@ -141,73 +343,227 @@ class FaceRecognitionSystem:
         try:
             os.makedirs('models', exist_ok=True)
             
-            # Encode labels
-            self.label_encoder = LabelEncoder()
-            encoded_labels = self.label_encoder.fit_transform(labels)
-            
-            # Train SVM classifier
-            self.classifier = SVC(kernel='linear', probability=True)
-            self.classifier.fit(encodings, encoded_labels)
+            # Linear SVM per student plus the unknown-face rejection calibrated on the same
+            # embeddings; confidences come from the open-set layer, so no Platt scaling
+            recognizer = LinearRecognizer.fit(encodings, labels, self.encoder_fingerprint())
             
-            # Save models
-            joblib.dump(self.classifier, 'models/face_classifier.pkl')
-            joblib.dump(self.label_encoder, 'models/label_encoder.pkl')
+            # Publish as a new version; running recognizers pick it up on their next request,
+            # and cached results of the previous version are no longer used
+            version = self.model_store.publish(recognizer, {
+                'students': len(recognizer.labels),
+                'encodings': len(encodings)
+            })
+            self._pointer_stamp = self.model_store.pointer_stamp()
+            self.models = ModelState(recognizer, version)
             
             return True
         except Exception as e:
             print(f"Error training classifier: {e}")
             return False
     
-    def recognize_face(self, face_encoding):
-        """Recognize a face using the trained classifier"""
+    def classify(self, encoding_matrix, roster=None):
+        """Label each embedding row, with None for faces of no enrolled student"""
+        # One reference for the whole call so a concurrent swap cannot mix versions
+        recognizer = self.models.recognizer
+        if roster is not None and isinstance(recognizer, LinearRecognizer):
+            return self.classify_roster(recognizer, encoding_matrix, roster)
+        
+        with metrics.time('recognition.svc_predict'):
+            labels = recognizer.predict(encoding_matrix)
+        
+        if recognizer.open_set is None:
+            # Models trained before open-set calibration only have SVC probabilities
+            with metrics.time('recognition.svc_predict_proba'):
+                probabilities = recognizer.max_probability(encoding_matrix)
+            return list(zip(labels, probabilities))
+        
+        return self.verify(recognizer, encoding_matrix, labels)
+    
+    def verify(self, recognizer, encoding_matrix, labels):
+        """Keep proposed labels whose embeddings fall within the student's open-set threshold"""
+        # Distance to the predicted student's centroid; beyond the threshold is a stranger
+        with metrics.time('recognition.open_set'):
+            confidences = recognizer.open_set.verify(encoding_matrix, labels)
+        return [(label if confidence >= self.recognition_threshold else None, confidence)
+                for label, confidence in zip(labels, confidences)]
+    
+    def classify_roster(self, recognizer, encoding_matrix, roster):
+        """Classify against the roster's students first and the full gallery only for the rest"""
+        # A lecture's few dozen students are scored instead of every enrolled student, and a
+        # face can only be mistaken for someone outside the roster if no roster student fits it
+        with metrics.time('recognition.roster_predict'):
+            labels = recognizer.predict(encoding_matrix, roster)
+        results = self.verify(recognizer, encoding_matrix, labels)
+        
+        misses = [i for i, (label, _) in enumerate(results) if label is None]
+        if misses:
+            # Visitors from other courses are still recognized
+            with metrics.time('recognition.svc_predict'):
+                fallback_labels = recognizer.predict(encoding_matrix[misses])
+            for i, result in zip(misses, self.verify(recognizer, encoding_matrix[misses], fallback_labels)):
+                results[i] = result
+        return results
+    
+    def recognize_face(self, face_encoding, cache=None, roster=None):
+        """Recognize a face using the trained classifier, preferring roster students if given"""
         try:
-            if self.classifier is None or self.label_encoder is None:
+            self.maybe_reload()
+            if not self.models.is_trained:
                 return None, 0.0
             
+            # Cached results from another model version count as misses
+            version = self.model_version
+            if cache is not None:
+                cached = cache.lookup(face_encoding, version)
+                if cached is not None:
+                    return cached
+            
             # Reshape encoding for prediction
             encoding_reshaped = face_encoding.reshape(1, -1)
+            predicted_label, confidence = self.classify(encoding_reshaped, roster)[0]
             
-            # Get prediction and probability
-            prediction = self.classifier.predict(encoding_reshaped)
-            probabilities = self.classifier.predict_proba(encoding_reshaped)
-            
-            # Get the predicted label and confidence
-            predicted_label = self.label_encoder.inverse_transform(prediction)[0]
-            confidence = np.max(probabilities)
-            
+            if cache is not None:
+                cache.add(face_encoding, predicted_label, confidence, version)
             return predicted_label, confidence
         except Exception as e:
             print(f"Error recognizing face: {e}")
             return None, 0.0
     
-    def process_image_for_attendance(self, image_path):
+    def recognize_faces(self, face_encodings, roster=None):
+        """Recognize many encodings with a single classifier call"""
+        if not face_encodings:
+            return []
+        try:
+            self.maybe_reload()
+            if not self.models.is_trained:
+                return [(None, 0.0)] * len(face_encodings)
+            
+            encoding_matrix = np.vstack([encoding.reshape(1, -1) for encoding in face_encodings])
+            return self.classify(encoding_matrix, roster)
+        except Exception as e:
+            print(f"Error recognizing faces: {e}")
+            return [(None, 0.0)] * len(face_encodings)
+    
+    def process_images(self, images, regions=None, caches=None, rosters=None):
+        """Recognize faces in several images, optionally limited to per-image regions"""
+        # regions[i] is a list of (x, y, w, h) areas for image i, or None for the whole frame;
+        # caches[i] is the RecognitionCache of the session image i belongs to, or None;
+        # rosters[i] is the set of student ids expected in image i, or None for everyone
+        return self.recognize_detections(images, self.detect_in_images(images, regions), caches, rosters)
+    
+    def detect_in_images(self, images, regions=None):
+        """(image_index, face_data) for every face detected in the images"""
+        # MTCNN has no batch API, so detection stays per image
+        detections = []
+        for image_index, image in enumerate(images):
+            if image is None:
+                continue
+            image_regions = regions[image_index] if regions else None
+            if image_regions is None:
+                image_faces = self.detect_faces(image)
+            else:
+                image_faces = self.detect_faces_in_regions(image, image_regions)
+            for face_data in image_faces:
+                detections.append((image_index, face_data))
+        return detections
+    
+    def recognize_detections(self, images, detections, caches=None, rosters=None):
+        """Embed and classify detected faces; returns the recognized students per image"""
+        self.maybe_reload()
+        version = self.model_version
+        results = [[] for _ in images]
+        if not detections:
+            return results
+        
+        encodings = self.extract_face_encodings([face_data['face'] for _, face_data in detections])
+        valid = [i for i, encoding in enumerate(encodings) if encoding is not None]
+        
+        # Faces close to one recently recognized in the same session by the same model version
+        # skip the classifier
+        predictions = {}
+        misses = []
+        for i in valid:
+            cache = caches[detections[i][0]] if caches else None
+            cached = cache.lookup(encodings[i], version) if cache is not None else None
+            if cached is None:
+                misses.append(i)
+            else:
+                predictions[i] = cached
+        
+        # Faces are classified together per roster; most batches share one
+        groups = {}
+        for i in misses:
+            roster = rosters[detections[i][0]] if rosters else None
+            groups.setdefault(frozenset(roster) if roster is not None else None, []).append(i)
+        recognized = []
+        for roster, group in groups.items():
+            recognized.extend(zip(group, self.recognize_faces([encodings[i] for i in group], roster)))
+        
+        for i, prediction in recognized:
+            predictions[i] = prediction
+            cache = caches[detections[i][0]] if caches else None
+            if cache is not None:
+                cache.add(encodings[i], *prediction, version)
+            
+            # Rejected faces are grouped so an admin can enroll repeat visitors later
+            if prediction[0] is None and self.open_set is not None and self.unknown_faces is not None:
+                image_index, face_data = detections[i]
+                self.collect_unknown_face(images[image_index], face_data['box'], encodings[i])
+        
+        for i in valid:
+            student_id, confidence = predictions[i]
+            image_index, face_data = detections[i]
+            if student_id and confidence >= self.recognition_threshold:
+                results[image_index].append({
+                    'student_id': student_id,
+                    'confidence': confidence,
+                    'box': face_data['box']
+                })
+        
+        return results
+    
+    def collect_unknown_face(self, image, box, encoding, margin=0.4):
+        """Store a rejected face, with some surrounding context, in the unknown-face clusters"""
+        try:
+            x, y, w, h = box
+            pad_x, pad_y = int(w * margin), int(h * margin)
+            crop = image[max(0, y - pad_y):y + h + pad_y, max(0, x - pad_x):x + w + pad_x]
+            if crop.size:
+                self.unknown_faces.add(crop, encoding)
+        except Exception as e:
+            print(f"Error collecting unknown face: {e}")
+    
+    @metrics.timed('attendance.process_image')
+    def process_image_for_attendance(self, image_path, cache=None, roster=None):
         """Process an image and return recognized faces"""
         try:
-            # Load image
-            image = cv2.imread(image_path)
+            # Large JPEGs are decoded at 1/2, 1/4 or 1/8 scale when the faces stay detectable
+            with metrics.time('attendance.decode_image'):
+                image, scale = decode_image(image_path, ATTENDANCE_FACE_FRACTION, ATTENDANCE_FACE_SIZE)
             if image is None:
                 return []
             
-            # Detect faces
-            faces = self.detect_faces(image)
-            
-            recognized_faces = []
-            for face_data in faces:
-                face = face_data['face']
-                
-                # Extract encoding
-                encoding = self.extract_face_encoding(face)
-                if encoding is not None:
-                    # Recognize face
-                    student_id, confidence = self.recognize_face(encoding)
-                    
-                    if student_id and confidence > 0.7:  # Confidence threshold
-                        recognized_faces.append({
-                            'student_id': student_id,
-                            'confidence': confidence,
-                            'box': face_data['box']
-                        })
+            detections = self.detect_in_images([image])
+            
+            # No faces, or faces near the size limit, suggest smaller ones were missed; only the
+            # detector runs twice, recognition runs once on the image that is kept
+            if scale > 1 and (not detections or
+                              min(face_data['box'][2] for _, face_data in detections) < 2 * ATTENDANCE_FACE_SIZE):
+                with metrics.time('attendance.decode_image_full'):
+                    full_image, _ = decode_image(image_path)
+                if full_image is not None:
+                    image, scale = full_image, 1
+                    detections = self.detect_in_images([image])
+            
+            # All faces in the image are embedded and classified together
+            recognized_faces = self.recognize_detections(
+                [image], detections,
+                caches=[cache] if cache is not None else None,
+                rosters=[roster] if roster is not None else None)[0]
             
+            # Boxes are reported in full-resolution coordinates
+            for face_data in recognized_faces:
+                face_data['box'] = tuple(int(v * scale) for v in face_data['box'])
             return recognized_faces
         except Exception as e:
             print(f"Error processing image: {e}")
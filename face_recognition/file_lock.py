@@ -0,0 +1,33 @@
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+class FileLock:
+    """Exclusive lock shared by every process on the machine, held for the length of a with block"""
+    
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+    
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._file = open(self.path, 'a+b')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            # Locks the first byte; LK_LOCK retries for about ten seconds before raising
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if fcntl is None:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        # Closing the file releases the flock
+        self._file.close()
+        self._file = None
@@ -0,0 +1,48 @@
+import cv2 # type: ignore
+from PIL import Image
+
+# libjpeg can scale by 1/2, 1/4 or 1/8 while decoding, skipping most of the IDCT work
+REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                 (2, cv2.IMREAD_REDUCED_COLOR_2))
+JPEG_EXTENSIONS = ('.jpg', '.jpeg')
+
+# Enrollment photos: the face covers at least a fifth of the short side and must keep encoder resolution
+TRAINING_FACE_FRACTION = 0.2
+TRAINING_FACE_SIZE = 160
+# Class photos: faces are small, so only keep them comfortably above MTCNN's minimum
+ATTENDANCE_FACE_FRACTION = 0.04
+ATTENDANCE_FACE_SIZE = 40
+
+def image_size(path):
+    """Width and height read from the image header, without decoding pixels"""
+    try:
+        with Image.open(path) as image:
+            return image.size
+    except Exception:
+        return None
+
+def choose_scale(width, height, min_face_fraction, target_face_size):
+    """Largest reduction (8, 4, 2 or 1) that keeps the smallest expected face at the target size"""
+    smallest_face = min(width, height) * min_face_fraction
+    for scale, _ in REDUCED_FLAGS:
+        if smallest_face / scale >= target_face_size:
+            return scale
+    return 1
+
+def decode_image(path, min_face_fraction=None, target_face_size=TRAINING_FACE_SIZE):
+    """Read an image as BGR, at reduced size when expected faces stay large enough; returns (image, scale)"""
+    # Boxes found in the returned image are multiplied by scale to get full-resolution coordinates
+    scale = 1
+    if min_face_fraction is not None and path.lower().endswith(JPEG_EXTENSIONS):
+        size = image_size(path)
+        if size is not None:
+            scale = choose_scale(size[0], size[1], min_face_fraction, target_face_size)
+    
+    if scale > 1:
+        flag = dict(REDUCED_FLAGS)[scale]
+        image = cv2.imread(path, flag)
+        if image is not None:
+            return image, scale
+    
+    # Small images, PNGs and files the reduced decoder rejects are read in full
+    return cv2.imread(path), 1
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+EduFace AI - Versioned Model Store
+Publishes trained models atomically and rolls back to earlier versions
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+from datetime import datetime
+
+# Add the project root to the Python path when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from face_recognition.recognizer_format import LinearRecognizer, PickledRecognizer, RECOGNIZER_FILE
+
+MODEL_STORE_PATH = 'models/store'
+ENCODER_WEIGHTS_PATH = 'models/face_encoder.h5'
+LEGACY_CLASSIFIER_PATH = 'models/face_classifier.pkl'
+LEGACY_LABEL_ENCODER_PATH = 'models/label_encoder.pkl'
+LEGACY_OPEN_SET_PATH = 'models/open_set.npz'
+
+def fsync_path(path):
+    """Flush a file or directory entry to disk"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        # Directories cannot be opened on Windows; their entries are durable there anyway
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class ModelState:
+    """One consistent trained recognizer and its version; replaced as a whole, never modified"""
+    
+    def __init__(self, recognizer=None, version=None):
+        self.recognizer = recognizer
+        self.version = version
+    
+    @property
+    def is_trained(self):
+        return self.recognizer is not None
+
+class ModelStore:
+    """Versioned model directories with an atomically swapped CURRENT pointer"""
+    
+    def __init__(self, root=MODEL_STORE_PATH, keep_versions=5):
+        self.root = root
+        self.keep_versions = keep_versions
+        self.current_path = os.path.join(root, 'CURRENT')
+    
+    def list_versions(self):
+        """Published versions, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if name.startswith('v') and os.path.isdir(os.path.join(self.root, name)))
+    
+    def current_version(self):
+        """Version the CURRENT pointer names, or None before the first publish"""
+        try:
+            with open(self.current_path, 'r', encoding='utf-8') as f:
+                version = f.read().strip()
+        except OSError:
+            return None
+        return version or None
+    
+    def pointer_stamp(self):
+        """Cheap change marker for the CURRENT pointer (no file read)"""
+        try:
+            stat = os.stat(self.current_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    
+    def publish(self, recognizer, metadata=None):
+        """Write a complete new version, then make it current"""
+        os.makedirs(self.root, exist_ok=True)
+        version = datetime.now().strftime('v%Y%m%d_%H%M%S_%f')
+        staging = os.path.join(self.root, f".staging_{version}")
+        os.makedirs(staging)
+        
+        try:
+            recognizer.save(staging)
+            with open(os.path.join(staging, 'metadata.json'), 'w', encoding='utf-8') as f:
+                json.dump(dict(metadata or {}, version=version,
+                               created_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S")), f, indent=2)
+            
+            # Everything must be on disk before the directory becomes visible under its version name
+            for name in os.listdir(staging):
+                fsync_path(os.path.join(staging, name))
+            fsync_path(staging)
+            os.rename(staging, os.path.join(self.root, version))
+            fsync_path(self.root)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        
+        self.set_current(version)
+        self.prune()
+        return version
+    
+    def set_current(self, version):
+        """Atomically point CURRENT at an existing version"""
+        if not os.path.isdir(os.path.join(self.root, version)):
+            raise ValueError(f"Unknown model version {version}")
+        temp_path = self.current_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.current_path)
+        fsync_path(self.root)
+    
+    def rollback(self, version=None):
+        """Make an earlier version current (by default the one before the current one)"""
+        if version is None:
+            versions = self.list_versions()
+            current = self.current_version()
+            older = [v for v in versions if current is None or v < current]
+            if not older:
+                return False, "No earlier model version to roll back to"
+            version = older[-1]
+        try:
+            self.set_current(version)
+        except ValueError as e:
+            return False, str(e)
+        return True, f"Rolled back to model version {version}"
+    
+    def prune(self):
+        """Delete old versions beyond keep_versions, never the current one"""
+        versions = self.list_versions()
+        current = self.current_version()
+        for version in versions[:max(0, len(versions) - self.keep_versions)]:
+            if version != current:
+                shutil.rmtree(os.path.join(self.root, version), ignore_errors=True)
+    
+    def load(self, version=None):
+        """Load a version (default: current) as a ModelState, or None if there is none"""
+        version = version or self.current_version()
+        if version is None:
+            return None
+        folder = os.path.join(self.root, version)
+        if os.path.exists(os.path.join(folder, RECOGNIZER_FILE)):
+            return ModelState(LinearRecognizer.load(folder), version)
+        # Versions published before the flat format hold pickles
+        return ModelState(PickledRecognizer.load(os.path.join(folder, 'classifier.pkl'),
+                                                 os.path.join(folder, 'label_encoder.pkl'),
+                                                 os.path.join(folder, 'open_set.npz')), version)
+    
+    def load_legacy(self):
+        """Load models saved directly under models/ before the store existed"""
+        if not os.path.exists(LEGACY_CLASSIFIER_PATH) or not os.path.exists(LEGACY_LABEL_ENCODER_PATH):
+            return None
+        return ModelState(PickledRecognizer.load(LEGACY_CLASSIFIER_PATH, LEGACY_LABEL_ENCODER_PATH,
+                                                 LEGACY_OPEN_SET_PATH), 'legacy')
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or roll back published recognition models')
+    parser.add_argument('--store', default=MODEL_STORE_PATH, help='Model store directory')
+    parser.add_argument('--rollback', nargs='?', const='', metavar='VERSION',
+                        help='Make VERSION (default: the previous version) current')
+    args = parser.parse_args()
+    
+    store = ModelStore(args.store)
+    if args.rollback is not None:
+        success, message = store.rollback(args.rollback or None)
+        print(message)
+        sys.exit(0 if success else 1)
+    
+    # Without --rollback, list the versions and mark the current one
+    current = store.current_version()
+    for version in store.list_versions():
+        print(f"{'*' if version == current else ' '} {version}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import time
+
+import cv2 # type: ignore
+import numpy as np
+
+class MotionGate:
+    """Cheap scene-change check that decides whether a frame needs face detection"""
+    
+    def __init__(self, width=160, pixel_threshold=25, min_changed_fraction=0.002,
+                 full_change_fraction=0.5, refresh_interval=60.0, min_region_area=16):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_fraction = min_changed_fraction
+        self.full_change_fraction = full_change_fraction
+        self.refresh_interval = refresh_interval
+        self.min_region_area = min_region_area
+        self.reference = None
+        self.last_examined = 0.0
+        self.kernel = np.ones((3, 3), np.uint8)
+    
+    def reset(self):
+        """Forget the reference frame so the next frame is examined in full"""
+        self.reference = None
+    
+    def downsample(self, frame):
+        """Small blurred grayscale copy of a frame used for differencing"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        height = max(1, int(gray.shape[0] * self.width / gray.shape[1]))
+        small = cv2.resize(gray, (self.width, height), interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+    
+    def check(self, frame, now=None):
+        """Return (changed, regions) with regions as full-frame (x, y, w, h) boxes"""
+        now = time.monotonic() if now is None else now
+        frame_height, frame_width = frame.shape[:2]
+        full_frame = [(0, 0, frame_width, frame_height)]
+        small = self.downsample(frame)
+        
+        # First frame, a resolution change or a periodic refresh: examine everything
+        if (self.reference is None or self.reference.shape != small.shape or
+                now - self.last_examined >= self.refresh_interval):
+            self.reference = small
+            self.last_examined = now
+            return True, full_frame
+        
+        diff = cv2.absdiff(small, self.reference)
+        _, mask = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+        changed_fraction = cv2.countNonZero(mask) / mask.size
+        if changed_fraction < self.min_changed_fraction:
+            # Keep the old reference so slow drift still adds up to a change
+            return False, []
+        
+        self.reference = small
+        self.last_examined = now
+        if changed_fraction >= self.full_change_fraction:
+            # Lights switched or the camera moved
+            return True, full_frame
+        
+        mask = cv2.dilate(mask, self.kernel, iterations=2)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        scale_x = frame_width / small.shape[1]
+        scale_y = frame_height / small.shape[0]
+        regions = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if w * h < self.min_region_area:
+                continue
+            regions.append((int(x * scale_x), int(y * scale_y),
+                            int(np.ceil(w * scale_x)), int(np.ceil(h * scale_y))))
+        
+        if not regions:
+            return False, []
+        return True, regions
@@ -0,0 +1,371 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import threading
+from datetime import datetime
+
+import cv2 # type: ignore
+import numpy as np
+
+from face_recognition.file_lock import FileLock
+
+def normalize_rows(encodings):
+    """L2-normalize embeddings so distances are cosine distances"""
+    encodings = np.atleast_2d(np.asarray(encodings, dtype=np.float32))
+    return encodings / (np.linalg.norm(encodings, axis=1, keepdims=True) + 1e-10)
+
+class OpenSetClassifier:
+    """Distance-to-centroid check that rejects faces belonging to no enrolled class"""
+    
+    def __init__(self, labels=None, centroids=None, thresholds=None):
+        self.labels = list(labels) if labels is not None else []
+        self.centroids = centroids
+        self.thresholds = thresholds
+        self.label_index = {label: i for i, label in enumerate(self.labels)}
+    
+    @property
+    def is_fitted(self):
+        return self.centroids is not None and len(self.labels) > 0
+    
+    def fit(self, encodings, labels, quantile=0.95, margin=1.1, min_threshold=0.05, max_threshold=0.6):
+        """Compute per-class centroids and calibrate each class's rejection distance"""
+        units = normalize_rows(encodings)
+        labels = np.asarray(labels)
+        self.labels = sorted(set(labels.tolist()))
+        self.label_index = {label: i for i, label in enumerate(self.labels)}
+        
+        centroids = np.stack([units[labels == label].mean(axis=0) for label in self.labels])
+        self.centroids = normalize_rows(centroids)
+        
+        # Nearest other centroid limits how far a class may reach
+        centroid_distances = 1.0 - self.centroids @ self.centroids.T
+        np.fill_diagonal(centroid_distances, np.inf)
+        
+        thresholds = []
+        for i, label in enumerate(self.labels):
+            member_distances = 1.0 - units[labels == label] @ self.centroids[i]
+            threshold = float(np.quantile(member_distances, quantile)) * margin
+            if len(self.labels) > 1:
+                threshold = min(threshold, float(centroid_distances[i].min()) / 2)
+            thresholds.append(min(max(threshold, min_threshold), max_threshold))
+        self.thresholds = np.asarray(thresholds, dtype=np.float32)
+        return self
+    
+    def distances(self, encodings):
+        """Cosine distance from every embedding to every class centroid"""
+        return 1.0 - normalize_rows(encodings) @ self.centroids.T
+    
+    def confidence(self, distances, thresholds):
+        """Map distances to confidences so that exactly the class threshold gives 0.7"""
+        return np.clip(1.0 - 0.3 * distances / thresholds, 0.0, 1.0)
+    
+    def verify(self, encodings, labels):
+        """Confidence that each embedding belongs to its proposed label; None labels score 0"""
+        distances = self.distances(encodings)
+        confidences = np.zeros(len(labels), dtype=np.float32)
+        for row, label in enumerate(labels):
+            index = self.label_index.get(label)
+            if index is not None:
+                confidences[row] = self.confidence(distances[row, index], self.thresholds[index])
+        return confidences
+    
+    def predict(self, encodings):
+        """Nearest-centroid labels with None for embeddings outside every class threshold"""
+        distances = self.distances(encodings)
+        nearest = np.argmin(distances, axis=1)
+        rows = np.arange(len(nearest))
+        confidences = self.confidence(distances[rows, nearest], self.thresholds[nearest])
+        labels = [self.labels[index] if distances[row, index] <= self.thresholds[index] else None
+                  for row, index in zip(rows, nearest)]
+        return list(zip(labels, confidences))
+    
+    def save(self, file_path):
+        """Save centroids and thresholds to an .npz file"""
+        np.savez(file_path, labels=np.asarray(self.labels), centroids=self.centroids,
+                 thresholds=self.thresholds)
+    
+    @classmethod
+    def load(cls, file_path):
+        """Load a classifier saved with save()"""
+        data = np.load(file_path, allow_pickle=False)
+        return cls(data['labels'].tolist(), data['centroids'], data['thresholds'])
+
+class UnknownFaceClusterer:
+    """Groups rejected faces online so repeat visitors collect into one cluster"""
+    
+    def __init__(self, storage_path="unknown_faces", radius=0.2, max_crops_per_cluster=30,
+                 max_clusters=200, min_face_size=40, flush_interval=2.0):
+        self.storage_path = storage_path
+        self.radius = radius
+        self.max_crops_per_cluster = max_crops_per_cluster
+        self.max_clusters = max_clusters
+        self.min_face_size = min_face_size
+        self.flush_interval = flush_interval
+        self.index_path = os.path.join(storage_path, "clusters.json")
+        # Every process that collects unknown faces (GUI, camera ingest, servers) shares the
+        # index, so changes are merged into the file under this lock instead of overwriting it
+        self.lock_path = self.index_path + '.lock'
+        self._lock = threading.Lock()
+        # Working view used for matching: the index as last read plus this process's changes
+        self._clusters = {}
+        # Sightings and crops not yet merged into the index, per cluster id
+        self._deltas = {}
+        self._removed = set()
+        self._next_local_id = 1
+        self._wake = threading.Event()
+        self._writer = None
+        self._clusters = self.read_index()[1]
+    
+    def read_index(self):
+        """Read (next_id, clusters) from the shared index"""
+        if not os.path.exists(self.index_path):
+            return 1, {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            clusters = {}
+            for cluster in data.get('clusters', []):
+                cluster['centroid'] = np.asarray(cluster['centroid'], dtype=np.float32)
+                clusters[cluster['cluster_id']] = cluster
+            return data.get('next_id', 1), clusters
+        except Exception as e:
+            print(f"Error loading unknown face clusters: {e}")
+            return 1, {}
+    
+    def write_index(self, next_id, clusters):
+        """Persist the cluster index atomically; called with the file lock held"""
+        os.makedirs(self.storage_path, exist_ok=True)
+        clusters = [dict(cluster, centroid=cluster['centroid'].tolist()) for cluster in clusters.values()]
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'next_id': next_id, 'clusters': clusters}, f)
+        os.replace(temp_path, self.index_path)
+    
+    def match(self, encoding):
+        """Return the id of the cluster an embedding falls into, or None"""
+        with self._lock:
+            return self.nearest_cluster(normalize_rows(encoding)[0], self._clusters)
+    
+    def nearest_cluster(self, unit, clusters):
+        if not clusters:
+            return None
+        ids = list(clusters.keys())
+        centroids = normalize_rows([clusters[i]['centroid'] for i in ids])
+        distances = 1.0 - centroids @ unit
+        best = int(np.argmin(distances))
+        return ids[best] if distances[best] <= self.radius else None
+    
+    def add(self, face_image, encoding):
+        """Add a rejected face (BGR crop with some context) and return its cluster id"""
+        # Runs on the recognition path, so only memory is touched; the writer thread stores
+        # crops and merges the index. New clusters get a local id until they are merged
+        unit = normalize_rows(encoding)[0]
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        queued_crop = False
+        with self._lock:
+            cluster_id = self.nearest_cluster(unit, self._clusters)
+            if cluster_id is None:
+                if len(self._clusters) >= self.max_clusters:
+                    self.evict_oldest()
+                cluster_id = f"new_{self._next_local_id}"
+                self._next_local_id += 1
+                self._clusters[cluster_id] = {
+                    'cluster_id': cluster_id,
+                    'centroid': unit,
+                    'count': 0,
+                    'crops': [],
+                    'first_seen': now,
+                    'last_seen': now
+                }
+            
+            delta = self._deltas.setdefault(cluster_id, {
+                'count': 0,
+                'sum': np.zeros_like(unit),
+                'crops': [],
+                'first_seen': now,
+                'last_seen': now
+            })
+            delta['count'] += 1
+            delta['sum'] = delta['sum'] + unit
+            delta['last_seen'] = now
+            
+            cluster = self._clusters[cluster_id]
+            # Running mean of the member embeddings
+            cluster['centroid'] = (cluster['centroid'] * cluster['count'] + unit) / (cluster['count'] + 1)
+            cluster['count'] += 1
+            cluster['last_seen'] = now
+            
+            if (len(cluster['crops']) + len(delta['crops']) < self.max_crops_per_cluster and
+                    min(face_image.shape[:2]) >= self.min_face_size):
+                # The crop is a view into the frame, which the caller may reuse. The random
+                # suffix keeps names from processes saving in the same millisecond apart
+                stamp = f"{int(time.time() * 1000)}_{uuid.uuid4().hex[:6]}"
+                delta['crops'].append((stamp, face_image.copy()))
+                queued_crop = True
+        
+        self.start_writer()
+        if queued_crop:
+            self._wake.set()
+        return cluster_id
+    
+    def start_writer(self):
+        """Start the background thread that stores crops and merges the index"""
+        if self._writer is None:
+            self._writer = threading.Thread(target=self.run_writer, daemon=True, name="unknown-faces")
+            self._writer.start()
+    
+    def run_writer(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error saving unknown face clusters: {e}")
+    
+    def flush(self):
+        """Merge this process's changes into the shared index and reload it"""
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+            removed, self._removed = self._removed, set()
+        
+        # Read, merge and write while holding the lock, so no process loses another's changes
+        with FileLock(self.lock_path):
+            next_id, clusters = self.read_index()
+            if deltas or removed:
+                for cluster_id in removed:
+                    if clusters.pop(cluster_id, None) is not None:
+                        shutil.rmtree(os.path.join(self.storage_path, cluster_id), ignore_errors=True)
+                for cluster_id, delta in deltas.items():
+                    next_id = self.merge_delta(clusters, cluster_id, delta, next_id)
+                while len(clusters) > self.max_clusters:
+                    oldest = min(clusters.values(), key=lambda cluster: cluster['last_seen'])
+                    shutil.rmtree(os.path.join(self.storage_path, oldest['cluster_id']), ignore_errors=True)
+                    del clusters[oldest['cluster_id']]
+                self.write_index(next_id, clusters)
+        
+        with self._lock:
+            # Changes made while the index was being written stay on top of the new snapshot
+            for cluster_id, delta in self._deltas.items():
+                self.apply_delta(clusters, cluster_id, delta)
+            for cluster_id in self._removed:
+                clusters.pop(cluster_id, None)
+            self._clusters = clusters
+    
+    def apply_delta(self, clusters, cluster_id, delta):
+        """Add a delta's sightings to a cluster of the working view"""
+        cluster = clusters.get(cluster_id)
+        if cluster is None:
+            clusters[cluster_id] = {
+                'cluster_id': cluster_id,
+                'centroid': delta['sum'] / delta['count'],
+                'count': delta['count'],
+                'crops': [],
+                'first_seen': delta['first_seen'],
+                'last_seen': delta['last_seen']
+            }
+            return
+        cluster['centroid'] = (cluster['centroid'] * cluster['count'] + delta['sum']) / (cluster['count'] + delta['count'])
+        cluster['count'] += delta['count']
+        cluster['last_seen'] = max(cluster['last_seen'], delta['last_seen'])
+    
+    def merge_delta(self, clusters, cluster_id, delta, next_id):
+        """Merge a delta into the index clusters and store its crops; returns the next free id"""
+        if cluster_id not in clusters:
+            # A local cluster, or one another process removed: join a matching cluster if any
+            # process already created one, otherwise take the next shared id
+            target = self.nearest_cluster(normalize_rows(delta['sum'])[0], clusters)
+            if target is None:
+                target = f"unknown_{next_id:04d}"
+                next_id += 1
+                clusters[target] = {
+                    'cluster_id': target,
+                    'centroid': np.zeros_like(delta['sum']),
+                    'count': 0,
+                    'crops': [],
+                    'first_seen': delta['first_seen'],
+                    'last_seen': delta['last_seen']
+                }
+            cluster_id = target
+        
+        self.apply_delta(clusters, cluster_id, delta)
+        cluster = clusters[cluster_id]
+        cluster['first_seen'] = min(cluster['first_seen'], delta['first_seen'])
+        
+        cluster_folder = os.path.join(self.storage_path, cluster_id)
+        for stamp, face_image in delta['crops']:
+            if len(cluster['crops']) >= self.max_crops_per_cluster:
+                break
+            os.makedirs(cluster_folder, exist_ok=True)
+            crop_name = f"{cluster_id}_{stamp}.jpg"
+            if cv2.imwrite(os.path.join(cluster_folder, crop_name), face_image):
+                cluster['crops'].append(crop_name)
+        return next_id
+    
+    def evict_oldest(self):
+        """Drop the least recently seen cluster to stay within max_clusters"""
+        oldest = min(self._clusters.values(), key=lambda cluster: cluster['last_seen'])
+        cluster_id = oldest['cluster_id']
+        del self._clusters[cluster_id]
+        self._deltas.pop(cluster_id, None)
+        # Local clusters were never written; merged ones are removed from the index too
+        if not cluster_id.startswith('new_'):
+            self._removed.add(cluster_id)
+    
+    def list_clusters(self, min_count=1):
+        """Clusters ordered by number of sightings, without their centroids"""
+        # Merging first includes the clusters other processes collected
+        self.flush()
+        with self._lock:
+            clusters = [{key: value for key, value in cluster.items() if key != 'centroid'}
+                        for cluster_id, cluster in self._clusters.items()
+                        if cluster['count'] >= min_count and not cluster_id.startswith('new_')]
+        clusters.sort(key=lambda cluster: cluster['count'], reverse=True)
+        return clusters
+    
+    def forget(self, cluster_id):
+        """Drop a cluster removed from the index from the working view"""
+        with self._lock:
+            self._clusters.pop(cluster_id, None)
+            self._deltas.pop(cluster_id, None)
+    
+    def enroll_cluster(self, cluster_id, student_folder):
+        """Move a cluster's crops into a student's training folder and forget the cluster"""
+        self.flush()
+        with FileLock(self.lock_path):
+            next_id, clusters = self.read_index()
+            cluster = clusters.get(cluster_id)
+            if cluster is None:
+                return False, f"Unknown cluster {cluster_id}"
+            if not cluster['crops']:
+                return False, f"Cluster {cluster_id} has no stored face images"
+            
+            os.makedirs(student_folder, exist_ok=True)
+            cluster_folder = os.path.join(self.storage_path, cluster_id)
+            moved = 0
+            for crop_name in cluster['crops']:
+                source = os.path.join(cluster_folder, crop_name)
+                if os.path.exists(source):
+                    shutil.move(source, os.path.join(student_folder, crop_name))
+                    moved += 1
+            
+            shutil.rmtree(cluster_folder, ignore_errors=True)
+            del clusters[cluster_id]
+            self.write_index(next_id, clusters)
+        self.forget(cluster_id)
+        return True, f"Moved {moved} face images from {cluster_id}"
+    
+    def discard_cluster(self, cluster_id):
+        """Delete a cluster and its crops"""
+        self.flush()
+        with FileLock(self.lock_path):
+            next_id, clusters = self.read_index()
+            if cluster_id not in clusters:
+                return False
+            shutil.rmtree(os.path.join(self.storage_path, cluster_id), ignore_errors=True)
+            del clusters[cluster_id]
+            self.write_index(next_id, clusters)
+        self.forget(cluster_id)
+        return True
@@ -0,0 +1,90 @@
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+class RecognitionCache:
+    """Short-lived per-session cache of recent recognitions keyed by embedding proximity"""
+    
+    # Entries are (unit_embedding, student_id, confidence, expires_at, model_version); a face
+    # that stays in view keeps refreshing its entry, so results from a replaced model are
+    # dropped by version rather than left to expire
+    
+    def __init__(self, radius=0.05, ttl=300.0, max_entries=256):
+        self.radius = radius
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._marked = set()
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def clear(self):
+        """Forget cached recognitions and marked students, e.g. when a new session starts"""
+        with self._lock:
+            self._entries.clear()
+            self._marked.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def evict_expired(self, now):
+        """Drop entries older than the TTL; oldest entries sit at the front"""
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry[3] > now:
+                break
+            del self._entries[key]
+    
+    def evict_other_versions(self, model_version):
+        """Drop entries recognized by a different model version"""
+        stale = [key for key, entry in self._entries.items() if entry[4] != model_version]
+        for key in stale:
+            del self._entries[key]
+    
+    def lookup(self, encoding, model_version=None, now=None):
+        """Return (student_id, confidence) for a cached embedding within the cosine radius"""
+        now = time.monotonic() if now is None else now
+        unit = encoding / (np.linalg.norm(encoding) + 1e-10)
+        with self._lock:
+            self.evict_expired(now)
+            self.evict_other_versions(model_version)
+            if not self._entries:
+                self.misses += 1
+                return None
+            
+            keys = list(self._entries.keys())
+            similarities = np.stack([entry[0] for entry in self._entries.values()]) @ unit
+            best = int(np.argmax(similarities))
+            if 1.0 - similarities[best] > self.radius:
+                self.misses += 1
+                return None
+            
+            # A hit refreshes both the LRU position and the TTL
+            key = keys[best]
+            cached_unit, student_id, confidence, _, version = self._entries.pop(key)
+            self._entries[key] = (cached_unit, student_id, confidence, now + self.ttl, version)
+            self.hits += 1
+            return student_id, confidence
+    
+    def add(self, encoding, student_id, confidence, model_version=None, now=None):
+        """Cache the recognition result an embedding got from a model version"""
+        now = time.monotonic() if now is None else now
+        unit = encoding / (np.linalg.norm(encoding) + 1e-10)
+        with self._lock:
+            self._entries[self._next_key] = (unit, student_id, confidence, now + self.ttl, model_version)
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def mark(self, student_id):
+        """Remember that a student's attendance was recorded in this session"""
+        with self._lock:
+            self._marked.add(student_id)
+    
+    def is_marked(self, student_id):
+        """Check whether a student was already recorded in this session"""
+        with self._lock:
+            return student_id in self._marked
@@ -0,0 +1,133 @@
+import os
+import json
+
+import numpy as np
+from sklearn.svm import LinearSVC
+
+from face_recognition.open_set import OpenSetClassifier
+
+FORMAT_VERSION = 1
+RECOGNIZER_FILE = 'recognizer.json'
+ARRAY_FILES = ('weights', 'bias', 'centroids', 'thresholds')
+
+class LinearRecognizer:
+    """One-vs-rest linear classifier and open-set centroids stored as flat, memory-mappable arrays"""
+    
+    def __init__(self, labels, weights, bias, open_set, encoder_fingerprint=None):
+        self.labels = list(labels)
+        self.weights = weights
+        self.bias = bias
+        self.open_set = open_set
+        self.encoder_fingerprint = encoder_fingerprint
+        self.label_index = {label: i for i, label in enumerate(self.labels)}
+        # Sub-galleries of recently used rosters, keyed by the roster's student ids
+        self._sub_galleries = {}
+    
+    @classmethod
+    def fit(cls, encodings, labels, encoder_fingerprint=None):
+        """Fit a linear SVM per student plus the open-set rejection layer"""
+        encodings = np.asarray(encodings, dtype=np.float32)
+        open_set = OpenSetClassifier().fit(encodings, labels)
+        classes = open_set.labels
+        
+        if len(classes) == 1:
+            # A single student needs no classifier; the open-set layer does the rejecting
+            weights = np.zeros((1, encodings.shape[1]), dtype=np.float32)
+            bias = np.zeros(1, dtype=np.float32)
+        else:
+            svm = LinearSVC().fit(encodings, np.asarray(labels))
+            weights, bias = svm.coef_, svm.intercept_
+            if len(classes) == 2:
+                # Binary SVMs keep one hyperplane; score both sides so argmax works for every case
+                weights, bias = np.vstack([-weights, weights]), np.concatenate([-bias, bias])
+        
+        return cls(classes, np.ascontiguousarray(weights, dtype=np.float32),
+                   np.asarray(bias, dtype=np.float32), open_set, encoder_fingerprint)
+    
+    def sub_gallery(self, roster):
+        """Label rows, weights and biases of the roster students this recognizer was trained on"""
+        key = roster if isinstance(roster, frozenset) else frozenset(roster)
+        gallery = self._sub_galleries.get(key)
+        if gallery is None:
+            rows = np.asarray(sorted(self.label_index[label] for label in key if label in self.label_index),
+                              dtype=np.intp)
+            # Copied out of the memory map once, so each frame scores a small contiguous matrix
+            gallery = (rows, np.ascontiguousarray(self.weights[rows]), np.asarray(self.bias[rows]))
+            if len(self._sub_galleries) >= 32:
+                self._sub_galleries.clear()
+            self._sub_galleries[key] = gallery
+        return gallery
+    
+    def predict(self, encodings, roster=None):
+        """Label with the highest decision score for each embedding row, among the roster if given"""
+        if roster is None:
+            scores = np.atleast_2d(encodings) @ self.weights.T + self.bias
+            return [self.labels[index] for index in np.argmax(scores, axis=1)]
+        
+        rows, weights, bias = self.sub_gallery(roster)
+        encodings = np.atleast_2d(encodings)
+        if not len(rows):
+            return [None] * len(encodings)
+        scores = encodings @ weights.T + bias
+        return [self.labels[rows[index]] for index in np.argmax(scores, axis=1)]
+    
+    def save(self, folder):
+        """Write the arrays as .npy files and the label table as JSON"""
+        os.makedirs(folder, exist_ok=True)
+        arrays = {
+            'weights': self.weights,
+            'bias': self.bias,
+            'centroids': self.open_set.centroids,
+            'thresholds': self.open_set.thresholds
+        }
+        for name in ARRAY_FILES:
+            np.save(os.path.join(folder, f"{name}.npy"), np.ascontiguousarray(arrays[name], dtype=np.float32))
+        with open(os.path.join(folder, RECOGNIZER_FILE), 'w', encoding='utf-8') as f:
+            json.dump({
+                'format_version': FORMAT_VERSION,
+                'labels': self.labels,
+                'embedding_size': int(self.weights.shape[1]),
+                'encoder_fingerprint': self.encoder_fingerprint
+            }, f, indent=2)
+    
+    @classmethod
+    def load(cls, folder, mmap=True):
+        """Load a saved recognizer; arrays are memory-mapped so processes share their pages"""
+        with open(os.path.join(folder, RECOGNIZER_FILE), 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        if header.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported recognizer format {header.get('format_version')}")
+        
+        # .npy files hold no Python objects, so nothing is unpickled
+        arrays = {name: np.load(os.path.join(folder, f"{name}.npy"), mmap_mode='r' if mmap else None,
+                                allow_pickle=False)
+                  for name in ARRAY_FILES}
+        labels = header['labels']
+        return cls(labels, arrays['weights'], arrays['bias'],
+                   OpenSetClassifier(labels, arrays['centroids'], arrays['thresholds']),
+                   header.get('encoder_fingerprint'))
+
+class PickledRecognizer:
+    """Adapter for SVC and LabelEncoder pickles written by earlier versions"""
+    
+    def __init__(self, classifier, label_encoder, open_set=None):
+        self.classifier = classifier
+        self.label_encoder = label_encoder
+        self.open_set = open_set
+        self.encoder_fingerprint = None
+    
+    @classmethod
+    def load(cls, classifier_path, label_encoder_path, open_set_path=None):
+        # Only imported for old models; unpickling runs code, so load trusted files only
+        import joblib
+        open_set = None
+        if open_set_path and os.path.exists(open_set_path):
+            open_set = OpenSetClassifier.load(open_set_path)
+        return cls(joblib.load(classifier_path), joblib.load(label_encoder_path), open_set)
+    
+    def predict(self, encodings):
+        return list(self.label_encoder.inverse_transform(self.classifier.predict(encodings)))
+    
+    def max_probability(self, encodings):
+        """SVC probability of the predicted label, for models without an open-set layer"""
+        return np.max(self.classifier.predict_proba(encodings), axis=1)
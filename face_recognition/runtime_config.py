@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+EduFace AI - Runtime thread configuration
+Sizes TensorFlow, OpenCV and BLAS thread pools for the execution mode
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+# Add the project root to the Python path when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RUNTIME_CONFIG_PATH = 'models/runtime_config.json'
+MODES = ('interactive', 'pool', 'server')
+BLAS_VARIABLES = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                  'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+def default_settings(mode, num_workers=1, cores=None):
+    """Thread counts that keep the mode from running more busy threads than cores"""
+    cores = cores or os.cpu_count() or 1
+    if mode == 'interactive':
+        # One recognizer with the whole machine; a second op stream for training in the background
+        return {'intra_op': cores, 'inter_op': 2, 'opencv': cores, 'blas': cores}
+    if mode == 'server':
+        # One batching thread runs the models; request threads only decode, one core each
+        return {'intra_op': cores, 'inter_op': 1, 'opencv': 1, 'blas': 1}
+    if mode == 'pool':
+        # Workers run side by side, so each gets an equal slice
+        share = max(1, cores // max(1, num_workers))
+        return {'intra_op': share, 'inter_op': 1, 'opencv': 1, 'blas': share}
+    raise ValueError(f"Unknown runtime mode {mode}")
+
+def load_tuned_settings(mode, num_workers=1, config_path=RUNTIME_CONFIG_PATH):
+    """Settings measured by --autotune on this machine, if any"""
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            tuned = json.load(f)
+    except (OSError, ValueError):
+        return None
+    entry = tuned.get('modes', {}).get(mode)
+    if entry is None or tuned.get('cores') != os.cpu_count():
+        return None
+    if mode == 'pool':
+        # Tuned per-worker threads only fit the worker count they were measured with
+        return entry['settings'] if entry.get('num_workers') == num_workers else None
+    return entry['settings']
+
+def tuned_pool_workers(config_path=RUNTIME_CONFIG_PATH):
+    """Worker count that --autotune found fastest for pool mode, if measured"""
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            tuned = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if tuned.get('cores') != os.cpu_count():
+        return None
+    return tuned.get('modes', {}).get('pool', {}).get('num_workers')
+
+def configure_runtime(mode='interactive', num_workers=1, settings=None):
+    """Apply thread settings for a mode; call before the recognition models are built"""
+    settings = dict(settings or load_tuned_settings(mode, num_workers) or
+                    default_settings(mode, num_workers))
+    
+    # Libraries that have not started yet pick these up when they load
+    for variable in BLAS_VARIABLES:
+        os.environ[variable] = str(settings['blas'])
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(settings['intra_op'])
+    os.environ['TF_NUM_INTEROP_THREADS'] = str(settings['inter_op'])
+    
+    # BLAS pools that are already running (numpy imported) are resized in place
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=settings['blas'])
+    except ImportError:
+        pass
+    
+    try:
+        import cv2 # type: ignore
+        cv2.setNumThreads(settings['opencv'])
+    except ImportError:
+        pass
+    
+    # TensorFlow is never imported here (pool parents must not load it); when it is not loaded
+    # yet, the TF_NUM_* variables above size its pools
+    tf = sys.modules.get('tensorflow')
+    try:
+        if tf is not None:
+            tf.config.threading.set_intra_op_parallelism_threads(settings['intra_op'])
+            tf.config.threading.set_inter_op_parallelism_threads(settings['inter_op'])
+    except RuntimeError as e:
+        # TensorFlow fixes its pools when the first model is built; the env vars still apply to new processes
+        print(f"Error configuring TensorFlow threads: {e}")
+    
+    return settings
+
+def measure_throughput(settings, seconds, images_path):
+    """Images per second for detection, encoding and classification with the given settings (one process)"""
+    configure_runtime(settings=settings)
+    
+    import cv2 # type: ignore
+    from face_recognition.face_detector import FaceRecognitionSystem
+    
+    paths = []
+    for folder, _, files in os.walk(images_path):
+        paths.extend(os.path.join(folder, name) for name in sorted(files)
+                     if name.lower().endswith(('.jpg', '.jpeg', '.png')))
+    images = [image for image in (cv2.imread(path) for path in paths[:50]) if image is not None]
+    
+    face_recognition = FaceRecognitionSystem(collect_unknowns=False)
+    # Images without faces only time MTCNN; keep those with faces so every stage is measured
+    images = [image for image in images if face_recognition.detect_faces(image)]
+    if not images:
+        raise ValueError(f"No faces found in the images under {images_path}")
+    face_recognition.process_images(images[:1])
+    
+    processed = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        face_recognition.process_images([images[processed % len(images)]])
+        processed += 1
+    return processed / (time.perf_counter() - start)
+
+def run_measurements(settings, processes, seconds, images_path):
+    """Run measurement processes side by side and return their combined throughput"""
+    command = [sys.executable, os.path.abspath(__file__), '--measure', json.dumps(settings),
+               '--seconds', str(seconds), '--images', images_path]
+    # Each measurement needs a fresh process: TensorFlow thread pools cannot be resized once built
+    children = [subprocess.Popen(command, stdout=subprocess.PIPE, text=True) for _ in range(processes)]
+    total = 0.0
+    for child in children:
+        output, _ = child.communicate()
+        if child.returncode != 0:
+            return None
+        total += float(output.strip().splitlines()[-1])
+    return total
+
+def candidate_settings(mode, cores):
+    """(settings, worker count) pairs to try for a mode"""
+    counts = sorted({1, 2, max(1, cores // 4), max(1, cores // 2), cores})
+    if mode == 'pool':
+        return [(dict(default_settings('pool', cores // threads, cores), intra_op=threads, blas=threads),
+                 max(1, cores // threads)) for threads in counts]
+    base = default_settings(mode, cores=cores)
+    return [(dict(base, intra_op=threads, opencv=min(base['opencv'], threads)), 1) for threads in counts]
+
+def autotune(modes, seconds, images_path, config_path=RUNTIME_CONFIG_PATH):
+    """Measure each candidate and save the fastest settings per mode"""
+    cores = os.cpu_count() or 1
+    tuned = {'cores': cores, 'modes': {}, 'measurements': []}
+    # Modes not tuned in this run, or whose candidates all failed, keep their earlier results,
+    # unless those came from a machine with a different core count
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        saved = None
+    if saved and saved.get('cores') == cores:
+        tuned['modes'] = dict(saved.get('modes', {}))
+        tuned['measurements'] = [entry for entry in saved.get('measurements', []) if entry.get('mode') not in modes]
+    
+    for mode in modes:
+        best = None
+        for settings, workers in candidate_settings(mode, cores):
+            throughput = run_measurements(settings, workers, seconds, images_path)
+            print(f"{mode:12s} workers={workers:<3d} intra_op={settings['intra_op']:<3d} "
+                  f"inter_op={settings['inter_op']} -> "
+                  f"{'failed' if throughput is None else f'{throughput:.1f} images/s'}")
+            tuned['measurements'].append({'mode': mode, 'num_workers': workers,
+                                          'settings': settings, 'images_per_second': throughput})
+            if throughput is not None and (best is None or throughput > best['images_per_second']):
+                best = {'num_workers': workers, 'settings': settings, 'images_per_second': throughput}
+        if best:
+            tuned['modes'][mode] = best
+    
+    os.makedirs(os.path.dirname(config_path) or '.', exist_ok=True)
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump(tuned, f, indent=2)
+    return tuned
+
+def main():
+    parser = argparse.ArgumentParser(description='Show or auto-tune the thread configuration')
+    parser.add_argument('--autotune', action='store_true',
+                        help='Measure throughput for candidate settings and save the best')
+    parser.add_argument('--mode', choices=MODES, action='append',
+                        help='Mode to tune (repeatable, default: all)')
+    parser.add_argument('--seconds', type=float, default=10, help='Measurement time per candidate')
+    parser.add_argument('--images', help='Folder of sample images with faces, e.g. training_data '
+                                         '(required with --autotune)')
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.measure:
+        print(measure_throughput(json.loads(args.measure), args.seconds, args.images))
+        return
+    
+    modes = args.mode or list(MODES)
+    if args.autotune and not args.images:
+        # Frames without faces would only time detection, not embedding and classification
+        parser.error("--autotune needs --images with a folder of face images")
+    if args.autotune:
+        tuned = autotune(modes, args.seconds, args.images)
+        print(f"Saved tuned settings to {RUNTIME_CONFIG_PATH}")
+        for mode, entry in tuned['modes'].items():
+            print(f"{mode:12s} {entry['settings']} ({entry['images_per_second']:.1f} images/s, "
+                  f"{entry['num_workers']} workers)")
+        return
+    
+    for mode in modes:
+        tuned = load_tuned_settings(mode)
+        print(f"{mode:12s} {tuned or default_settings(mode)} ({'tuned' if tuned else 'default'})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import cv2 # type: ignore
+import numpy as np
+
+from face_recognition.model_store import ModelStore, ENCODER_WEIGHTS_PATH
+from face_recognition.runtime_config import configure_runtime, default_settings, tuned_pool_workers
+
+# The recognition system of the current worker process
+_worker_system = None
+
+def init_worker(num_workers, threads_per_worker):
+    """Build the worker's recognition system after the fork"""
+    global _worker_system
+    settings = None
+    if threads_per_worker:
+        settings = dict(default_settings('pool', num_workers), intra_op=threads_per_worker,
+                        blas=threads_per_worker)
+    configure_runtime('pool', num_workers, settings)
+    
+    # TensorFlow is imported only here: its runtime cannot be shared across a fork once started
+    from face_recognition.face_detector import FaceRecognitionSystem
+    _worker_system = FaceRecognitionSystem(collect_unknowns=False)
+
+def prepare_encoder_weights():
+    """Create the shared encoder weights file, run in a short-lived process of its own"""
+    from face_recognition.face_detector import FaceRecognitionSystem, ensure_encoder_weights
+    ensure_encoder_weights(FaceRecognitionSystem.create_simple_encoder())
+
+def worker_ready():
+    """No-op used to make the pool start its workers"""
+    return os.getpid()
+
+def recognize_encoded(image_bytes, roster=None):
+    """Decode and recognize one image inside a worker; returns plain Python results"""
+    image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Could not decode image")
+    rosters = [frozenset(roster)] if roster is not None else None
+    return [{
+        'student_id': face_data['student_id'],
+        'confidence': float(face_data['confidence']),
+        'box': [int(v) for v in face_data['box']]
+    } for face_data in _worker_system.process_images([image], rosters=rosters)[0]]
+
+class RecognitionWorkerPool:
+    """Recognizes encoded images in a pool of processes that share the memory-mapped recognizer"""
+    
+    def __init__(self, num_workers=None, threads_per_worker=None):
+        # threads_per_worker=None uses the tuned or default share from runtime_config
+        self.num_workers = num_workers or tuned_pool_workers() or os.cpu_count() or 1
+        self.threads_per_worker = threads_per_worker
+        self.model_store = ModelStore()
+        self._executor = None
+    
+    def start(self):
+        """Start the worker processes"""
+        if self._executor is not None:
+            return
+        
+        # fork lets workers inherit the already imported modules copy-on-write
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+        self._executor = ProcessPoolExecutor(self.num_workers, mp_context=context,
+                                             initializer=init_worker,
+                                             initargs=(self.num_workers, self.threads_per_worker))
+        
+        # Workers load the encoder weights from disk, so they must exist before the first
+        # one forks; creating them needs TensorFlow, which stays out of this process
+        if not os.path.exists(ENCODER_WEIGHTS_PATH):
+            process = context.Process(target=prepare_encoder_weights)
+            process.start()
+            process.join()
+        
+        # The executor forks lazily on submit(). Fork every worker now, while the caller has no
+        # other threads: a fork taken while another thread holds a lock (metrics, the journal)
+        # leaves that lock held forever in the child. Call start() before starting other threads
+        wait([self._executor.submit(worker_ready) for _ in range(self.num_workers)])
+    
+    def stop(self):
+        """Wait for queued images and shut the workers down"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+    
+    def submit_encoded(self, image_bytes, roster=None):
+        """Queue JPEG/PNG bytes for recognition; returns a Future"""
+        # Encoded bytes are much smaller than the decoded frame, so they cross the pipe instead
+        return self._executor.submit(recognize_encoded, image_bytes, roster)
+    
+    def recognize_encoded(self, image_bytes, timeout=None, roster=None):
+        """Recognize faces in JPEG/PNG bytes, blocking until a worker is done"""
+        return self.submit_encoded(image_bytes, roster).result(timeout)
+    
+    def model_version(self):
+        return self.model_store.current_version()
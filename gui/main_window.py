@@ -3,25 +3,43 @@ from tkinter import ttk, messagebox, filedialog
 import cv2
 from PIL import Image, ImageTk
 import threading
-from datetime import datetime
-import pandas as pd
+from datetime import datetime, timedelta
 import os
 
 from database.database_manager import DatabaseManager
+from database.attendance_analytics import AttendanceAnalytics
+from database.attendance_exporter import AttendanceExporter, EXPORT_FORMATS
+from database.attendance_session import AttendanceSession
 from face_recognition.face_detector import FaceRecognitionSystem
+from face_recognition.recognition_cache import RecognitionCache
 from training.training_manager import TrainingManager
+from training.training_job import TrainingJobManager
+from monitoring.performance_metrics import metrics
+from monitoring.profiler import profiler
+
+STUDENTS_PAGE_SIZE = 200
+# Pages kept in the student list at once; pages scrolled far out of view are removed
+STUDENTS_WINDOW_PAGES = 3
 
 class MainApplication:
-    def __init__(self, root):
+    def __init__(self, root, camera_source=0):
         self.root = root
+        self.camera_source = camera_source
         self.root.title("EduFace - Face Recognition Attendance System")
         self.root.geometry("1200x800")
         self.root.configure(bg='#f0f8ff')
         
         # Initialize components
         self.db_manager = DatabaseManager()
+        self.attendance_analytics = AttendanceAnalytics(self.db_manager)
+        self.attendance_exporter = AttendanceExporter(self.db_manager)
         self.face_recognition = FaceRecognitionSystem()
         self.training_manager = TrainingManager()
+        self.training_jobs = TrainingJobManager(self.training_manager)
+        self.recognition_cache = RecognitionCache()
+        self.recognition_session = None
+        self.attendance_session = None
+        self.session_closing = False
         
         # Variables
         self.current_user = None
@@ -137,6 +155,9 @@ class MainApplication:
         
         # Show dashboard by default
         self.show_dashboard()
+        
+        # Offer to finish a training run cut short by a crash or shutdown
+        self.root.after(500, self.offer_training_resume)
     
     def create_header(self, parent):
         """Create the application header"""
@@ -226,64 +247,106 @@ class MainApplication:
         stats_frame.pack(fill='x', padx=20, pady=10)
         
         # Get statistics
-        students = self.db_manager.get_all_students()
+        total_students = self.db_manager.count_students()
         training_stats = self.training_manager.get_training_statistics()
         
         stats = [
-            ("Total Students", len(students), "#059669"),
+            ("Total Students", total_students, "#059669"),
             ("Trained Students", training_stats['total_students'], "#1e3a8a"),
             ("Training Images", training_stats['total_images'], "#ea580c"),
             ("System Status", "Active", "#7c3aed")
         ]
         
+        self.dashboard_stat_labels = {}
         for i, (title, value, color) in enumerate(stats):
             card = tk.Frame(stats_frame, bg=color, padx=20, pady=15, relief='solid', bd=1)
             card.grid(row=0, column=i, padx=10, pady=10, sticky='ew')
             
-            tk.Label(card, text=str(value), font=('Arial', 20, 'bold'),
-                    bg=color, fg='white').pack()
+            value_label = tk.Label(card, text=str(value), font=('Arial', 20, 'bold'),
+                                  bg=color, fg='white')
+            value_label.pack()
             tk.Label(card, text=title, font=('Arial', 10),
                     bg=color, fg='white').pack()
+            self.dashboard_stat_labels[title] = value_label
         
         # Configure grid weights
         for i in range(4):
             stats_frame.grid_columnconfigure(i, weight=1)
         
-        # Recent activity
-        activity_frame = tk.Frame(self.content_area, bg='white', padx=20, pady=20)
-        activity_frame.pack(fill='both', expand=True, padx=20, pady=20)
+        # Live performance panel
+        performance_frame = tk.Frame(self.content_area, bg='white', padx=20, pady=20)
+        performance_frame.pack(fill='both', expand=True, padx=20, pady=20)
         
-        tk.Label(activity_frame, text="System Information", font=('Arial', 16, 'bold'),
-                bg='white', fg='#1e3a8a').pack(anchor='w', pady=(0, 10))
+        header_frame = tk.Frame(performance_frame, bg='white')
+        header_frame.pack(fill='x', pady=(0, 10))
         
-        info_text = tk.Text(activity_frame, height=10, font=('Arial', 10),
-                           bg='#f8fafc', relief='solid', bd=1)
-        info_text.pack(fill='both', expand=True)
+        tk.Label(header_frame, text="Pipeline Performance", font=('Arial', 16, 'bold'),
+                bg='white', fg='#1e3a8a').pack(side='left')
         
-        # Add system information
-        info_content = f"""
-Face Recognition System Status:
-• MTCNN Face Detection: Active
-• FaceNet Face Recognition: Active
-• Database Connection: Connected
-• Training Data: {training_stats['total_students']} students, {training_stats['total_images']} images
-
-Recent System Activity:
-• System initialized successfully
-• Database tables created/verified
-• Face recognition models loaded
-• Ready for attendance tracking
-
-System Capabilities:
-• Multi-face detection in single image
-• Real-time face recognition
-• Automatic attendance recording
-• CSV export functionality
-• Student profile management
-        """
+        tk.Button(header_frame, text="Export Metrics", font=('Arial', 10),
+                 bg='#6b7280', fg='white', padx=15, pady=5,
+                 command=self.export_performance_metrics, cursor='hand2').pack(side='right')
+        tk.Button(header_frame, text="Reset", font=('Arial', 10),
+                 bg='#6b7280', fg='white', padx=15, pady=5,
+                 command=metrics.reset, cursor='hand2').pack(side='right', padx=(0, 10))
+        
+        columns = ('Stage', 'Calls', 'Mean ms', 'p50 ms', 'p95 ms', 'p99 ms', 'Max ms')
+        self.performance_tree = ttk.Treeview(performance_frame, columns=columns, show='headings', height=10)
+        for col in columns:
+            self.performance_tree.heading(col, text=col)
+            self.performance_tree.column(col, width=90 if col != 'Stage' else 220,
+                                         anchor='w' if col == 'Stage' else 'e')
+        self.performance_tree.pack(fill='both', expand=True)
+        
+        self.refresh_performance_panel()
         
-        info_text.insert('1.0', info_content.strip())
-        info_text.configure(state='disabled')
+        # Cached statistics are shown immediately; revalidate in the background
+        self.training_manager.refresh_training_statistics(
+            lambda stats: self.root.after(0, lambda: self.update_dashboard_training_stats(stats)))
+    
+    def refresh_performance_panel(self):
+        """Update the performance panel and schedule the next refresh"""
+        if getattr(self, 'performance_after_id', None) is not None:
+            self.root.after_cancel(self.performance_after_id)
+            self.performance_after_id = None
+        
+        if not self.performance_tree.winfo_exists():
+            return
+        
+        for item in self.performance_tree.get_children():
+            self.performance_tree.delete(item)
+        
+        snapshot = metrics.snapshot()
+        for stage, stats in snapshot.items():
+            self.performance_tree.insert('', 'end', values=(
+                stage, stats['count'], f"{stats['mean_ms']:.1f}", f"{stats['p50_ms']:.1f}",
+                f"{stats['p95_ms']:.1f}", f"{stats['p99_ms']:.1f}", f"{stats['max_ms']:.1f}"
+            ))
+        if not snapshot:
+            self.performance_tree.insert('', 'end', values=(
+                "No operations timed yet", '', '', '', '', '', ''))
+        
+        self.performance_after_id = self.root.after(2000, self.refresh_performance_panel)
+    
+    def export_performance_metrics(self):
+        """Export the current performance metrics to a file"""
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("Prometheus text", "*.prom")],
+            initialfile=f"eduface_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+        
+        if file_path:
+            metrics.export(file_path)
+            messagebox.showinfo("Success", f"Metrics exported to {file_path}")
+    
+    def update_dashboard_training_stats(self, training_stats):
+        """Update dashboard cards after a background statistics refresh"""
+        labels = getattr(self, 'dashboard_stat_labels', {})
+        for title, key in [("Trained Students", 'total_students'), ("Training Images", 'total_images')]:
+            label = labels.get(title)
+            if label is not None and label.winfo_exists():
+                label.configure(text=str(training_stats[key]))
     
     def show_student_management(self):
         """Show student management interface"""
@@ -349,6 +412,32 @@ System Capabilities:
                            command=self.add_student, cursor='hand2')
         add_btn.pack(pady=(15, 0))
         
+        # Course enrollment: students selected in the list below join or leave a course roster
+        enrollment_frame = tk.LabelFrame(self.content_area, text="Course Enrollment",
+                                        font=('Arial', 12, 'bold'), bg='white',
+                                        fg='#1e3a8a', padx=20, pady=15)
+        enrollment_frame.pack(fill='x', padx=20, pady=10)
+        
+        tk.Label(enrollment_frame, text="Course:", font=('Arial', 10, 'bold'),
+                bg='white').pack(side='left', padx=(0, 10))
+        self.enrollment_course_var = tk.StringVar()
+        self.enrollment_course_combo = ttk.Combobox(enrollment_frame, textvariable=self.enrollment_course_var,
+                                                   width=25)
+        self.enrollment_course_combo.pack(side='left', padx=(0, 20))
+        self.enrollment_course_combo.bind('<<ComboboxSelected>>', lambda event: self.refresh_enrollment_count())
+        
+        tk.Button(enrollment_frame, text="Enroll Selected", font=('Arial', 10, 'bold'),
+                 bg='#1e3a8a', fg='white', padx=15, pady=5,
+                 command=self.enroll_selected_students, cursor='hand2').pack(side='left', padx=(0, 10))
+        tk.Button(enrollment_frame, text="Remove Selected", font=('Arial', 10),
+                 bg='#dc2626', fg='white', padx=15, pady=5,
+                 command=lambda: self.enroll_selected_students(remove=True),
+                 cursor='hand2').pack(side='left', padx=(0, 10))
+        
+        self.enrollment_count_label = tk.Label(enrollment_frame, text="", font=('Arial', 9),
+                                              bg='white', fg='#6b7280')
+        self.enrollment_count_label.pack(side='left')
+        
         # Students list
         list_frame = tk.LabelFrame(self.content_area, text="Registered Students",
                                   font=('Arial', 12, 'bold'), bg='white',
@@ -364,14 +453,19 @@ System Capabilities:
             self.students_tree.column(col, width=120)
         
         # Scrollbar
-        scrollbar = ttk.Scrollbar(list_frame, orient='vertical', command=self.students_tree.yview)
-        self.students_tree.configure(yscrollcommand=scrollbar.set)
+        self.students_scrollbar = ttk.Scrollbar(list_frame, orient='vertical', command=self.students_tree.yview)
+        self.students_tree.configure(yscrollcommand=self.on_students_scroll)
+        
+        self.students_count_label = tk.Label(list_frame, text="", font=('Arial', 9),
+                                            bg='white', fg='#6b7280')
+        self.students_count_label.pack(side='bottom', anchor='w')
         
         self.students_tree.pack(side='left', fill='both', expand=True)
-        scrollbar.pack(side='right', fill='y')
+        self.students_scrollbar.pack(side='right', fill='y')
         
         # Load students
         self.refresh_students_list()
+        self.refresh_enrollment_courses()
     
     def add_student(self):
         """Add a new student to the database"""
@@ -403,19 +497,126 @@ System Capabilities:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to add student: {str(e)}")
     
+    def refresh_enrollment_courses(self):
+        """Fill the enrollment course list"""
+        self.enrollment_course_combo['values'] = [course['course_name'] for course in self.db_manager.get_courses()]
+        self.refresh_enrollment_count()
+    
+    def refresh_enrollment_count(self):
+        """Show how many students the chosen course has enrolled"""
+        course = self.enrollment_course_var.get().strip()
+        if course:
+            count = len(self.db_manager.get_course_roster(course))
+            self.enrollment_count_label.configure(text=f"{count} students enrolled in {course}")
+        else:
+            self.enrollment_count_label.configure(text="")
+    
+    def enroll_selected_students(self, remove=False):
+        """Enroll the students selected in the list in the chosen course, or remove them"""
+        course = self.enrollment_course_var.get().strip()
+        if not course:
+            messagebox.showerror("Error", "Please enter a course name!")
+            return
+        # set() returns the stored text; item() would turn ids like "007" into ints
+        student_ids = [self.students_tree.set(item, 'Student ID') for item in self.students_tree.selection()]
+        if not student_ids:
+            messagebox.showwarning("Warning", "Please select students in the list!")
+            return
+        
+        if remove:
+            success, message = self.db_manager.unenroll_students(course, student_ids)
+        else:
+            success, message = self.db_manager.enroll_students(course, student_ids)
+        
+        if success:
+            self.refresh_enrollment_courses()
+        else:
+            messagebox.showerror("Error", message)
+    
     def refresh_students_list(self):
         """Refresh the students list in the treeview"""
         # Clear existing items
         for item in self.students_tree.get_children():
             self.students_tree.delete(item)
         
-        # Add students
-        students = self.db_manager.get_all_students()
-        for student in students:
-            self.students_tree.insert('', 'end', values=(
-                student['id'], student['student_id'], student['name'],
-                student['email'], student['cgpa'], student['advisor']
-            ))
+        # The treeview holds a window of at most STUDENTS_WINDOW_PAGES consecutive pages.
+        # page_keys[i] is the keyset key page i starts after, so any page can be fetched
+        # again once it has been seen; page_items holds the rows of the pages in the window
+        self.students_page_keys = [None]
+        self.students_page_items = []
+        self.students_first_page = 0
+        self.students_page_pending = False
+        self.students_total = self.db_manager.count_students()
+        self.load_students_page(0)
+    
+    def load_students_page(self, page):
+        """Add a page of students at the top or bottom of the window, dropping the page at the other end"""
+        self.students_page_pending = False
+        if not self.students_tree.winfo_exists():
+            return
+        
+        students, next_key = self.db_manager.get_students_page(self.students_page_keys[page], STUDENTS_PAGE_SIZE)
+        if next_key is not None and page + 1 == len(self.students_page_keys):
+            self.students_page_keys.append(next_key)
+        
+        at_top = page < self.students_first_page
+        
+        def change():
+            position = 0 if at_top else 'end'
+            items = []
+            for student in students:
+                items.append(self.students_tree.insert('', position, values=(
+                    student['id'], student['student_id'], student['name'],
+                    student['email'], student['cgpa'], student['advisor']
+                )))
+                if at_top:
+                    position += 1
+            
+            if at_top:
+                self.students_page_items.insert(0, items)
+                self.students_first_page = page
+            else:
+                self.students_page_items.append(items)
+            
+            # Selected rows in a dropped page are deselected with it
+            if len(self.students_page_items) > STUDENTS_WINDOW_PAGES:
+                if at_top:
+                    dropped = self.students_page_items.pop()
+                else:
+                    dropped = self.students_page_items.pop(0)
+                    self.students_first_page += 1
+                self.students_tree.delete(*dropped)
+        
+        self.keep_students_view(change)
+        
+        first_row = self.students_first_page * STUDENTS_PAGE_SIZE
+        loaded = len(self.students_tree.get_children())
+        self.students_count_label.configure(
+            text=f"Showing {first_row + 1 if loaded else 0}-{first_row + loaded} of {self.students_total} students")
+    
+    def keep_students_view(self, change):
+        """Apply a change to the student rows without moving the rows on screen"""
+        # Rows added or removed above the view would otherwise shift it by a whole page
+        items = self.students_tree.get_children()
+        top = items[min(len(items) - 1, round(self.students_tree.yview()[0] * len(items)))] if items else None
+        change()
+        if top is not None and self.students_tree.exists(top):
+            self.students_tree.yview_moveto(
+                self.students_tree.index(top) / max(1, len(self.students_tree.get_children())))
+    
+    def on_students_scroll(self, first, last):
+        """Update the scrollbar and fetch the neighbouring page when nearing either end"""
+        self.students_scrollbar.set(first, last)
+        if self.students_page_pending:
+            return
+        
+        last_page = self.students_first_page + len(self.students_page_items) - 1
+        if float(last) > 0.9 and last_page + 1 < len(self.students_page_keys):
+            self.students_page_pending = True
+            self.root.after_idle(self.load_students_page, last_page + 1)
+        elif float(first) < 0.1 and self.students_first_page > 0:
+            self.students_page_pending = True
+            self.root.after_idle(self.load_students_page, self.students_first_page - 1)
     
     def show_training_system(self):
         """Show training system interface"""
@@ -471,6 +672,32 @@ System Capabilities:
                              cursor='hand2')
         train_btn.pack(side='left')
         
+        # Faces rejected during attendance, grouped per visitor
+        unknown_frame = tk.LabelFrame(self.content_area, text="Unknown Visitors",
+                                     font=('Arial', 12, 'bold'), bg='white',
+                                     fg='#1e3a8a', padx=20, pady=15)
+        unknown_frame.pack(fill='x', padx=20, pady=10)
+        
+        columns = ('Cluster', 'Sightings', 'Images', 'First Seen', 'Last Seen')
+        self.unknown_tree = ttk.Treeview(unknown_frame, columns=columns, show='headings', height=5)
+        for col in columns:
+            self.unknown_tree.heading(col, text=col)
+            self.unknown_tree.column(col, width=140)
+        self.unknown_tree.pack(fill='x')
+        
+        unknown_buttons = tk.Frame(unknown_frame, bg='white')
+        unknown_buttons.pack(fill='x', pady=(10, 0))
+        
+        tk.Button(unknown_buttons, text="Enroll as Selected Student", font=('Arial', 10, 'bold'),
+                 bg='#1e3a8a', fg='white', padx=15, pady=5,
+                 command=self.enroll_unknown_cluster, cursor='hand2').pack(side='left', padx=(0, 10))
+        tk.Button(unknown_buttons, text="Discard", font=('Arial', 10),
+                 bg='#dc2626', fg='white', padx=15, pady=5,
+                 command=self.discard_unknown_cluster, cursor='hand2').pack(side='left', padx=(0, 10))
+        tk.Button(unknown_buttons, text="Refresh", font=('Arial', 10),
+                 bg='#6b7280', fg='white', padx=15, pady=5,
+                 command=self.refresh_unknown_clusters, cursor='hand2').pack(side='left')
+        
         # Training statistics
         stats_frame = tk.LabelFrame(self.content_area, text="Training Statistics",
                                    font=('Arial', 12, 'bold'), bg='white',
@@ -483,6 +710,7 @@ System Capabilities:
         
         # Load initial data
         self.refresh_training_students()
+        self.refresh_unknown_clusters()
         self.refresh_training_statistics()
     
     def refresh_training_students(self):
@@ -491,6 +719,54 @@ System Capabilities:
         student_options = [f"{s['student_id']} - {s['name']}" for s in students]
         self.training_student_combo['values'] = student_options
     
+    def refresh_unknown_clusters(self):
+        """Show the unknown-visitor clusters collected during attendance"""
+        for item in self.unknown_tree.get_children():
+            self.unknown_tree.delete(item)
+        for cluster in self.face_recognition.unknown_faces.list_clusters():
+            self.unknown_tree.insert('', 'end', iid=cluster['cluster_id'], values=(
+                cluster['cluster_id'], cluster['count'], len(cluster['crops']),
+                cluster['first_seen'], cluster['last_seen']
+            ))
+    
+    def enroll_unknown_cluster(self):
+        """Add the selected cluster's face images to the selected student's training data"""
+        selection = self.unknown_tree.selection()
+        if not selection:
+            messagebox.showerror("Error", "Please select an unknown visitor!")
+            return
+        selected = self.training_student_var.get()
+        if not selected:
+            messagebox.showerror("Error", "Please select the student to enroll them as!\n\n"
+                                 "Add the student under Student Management first if needed.")
+            return
+        
+        cluster_id = selection[0]
+        student_id = selected.split(' - ')[0]
+        if not messagebox.askyesno("Enroll Visitor",
+                                   f"Use the images of {cluster_id} as training images "
+                                   f"for student {student_id}?"):
+            return
+        
+        success, message = self.training_manager.enroll_unknown_cluster(
+            cluster_id, student_id, self.face_recognition.unknown_faces)
+        if success:
+            messagebox.showinfo("Success", f"{message}.\n\nRun Train System to recognize this student.")
+        else:
+            messagebox.showerror("Error", message)
+        self.refresh_unknown_clusters()
+        self.refresh_training_statistics()
+    
+    def discard_unknown_cluster(self):
+        """Delete the selected unknown-visitor cluster"""
+        selection = self.unknown_tree.selection()
+        if not selection:
+            messagebox.showerror("Error", "Please select an unknown visitor!")
+            return
+        if messagebox.askyesno("Discard Visitor", f"Delete all images of {selection[0]}?"):
+            self.face_recognition.unknown_faces.discard_cluster(selection[0])
+            self.refresh_unknown_clusters()
+    
     def capture_training_images(self):
         """Capture training images for selected student"""
         selected = self.training_student_var.get()
@@ -513,7 +789,8 @@ System Capabilities:
         if result:
             # Run capture in separate thread
             def capture_thread():
-                success, message = self.training_manager.capture_training_images(student_id)
+                success, message = self.training_manager.capture_training_images(
+                    student_id, camera_source=self.camera_source)
                 self.root.after(0, lambda: self.capture_complete(success, message))
             
             threading.Thread(target=capture_thread, daemon=True).start()
@@ -534,56 +811,125 @@ System Capabilities:
                                    "Continue?")
         
         if result:
-            # Create progress window
-            progress_window = tk.Toplevel(self.root)
-            progress_window.title("Training Progress")
-            progress_window.geometry("400x150")
-            progress_window.resizable(False, False)
-            progress_window.transient(self.root)
-            progress_window.grab_set()
-            
-            # Center the window
-            progress_window.geometry("+%d+%d" % (
-                self.root.winfo_rootx() + 400,
-                self.root.winfo_rooty() + 300
-            ))
-            
-            # Progress widgets
-            tk.Label(progress_window, text="Training Face Recognition System...", 
-                    font=('Arial', 12, 'bold')).pack(pady=20)
-            
-            progress_var = tk.StringVar(value="Initializing...")
-            progress_label = tk.Label(progress_window, textvariable=progress_var, 
-                                    font=('Arial', 10))
-            progress_label.pack(pady=10)
-            
-            progress_bar = ttk.Progressbar(progress_window, length=300, mode='determinate')
-            progress_bar.pack(pady=10)
-            
-            def progress_callback(message, percentage):
-                progress_var.set(message)
-                progress_bar['value'] = percentage
-                progress_window.update()
-            
-            def training_thread():
-                success, message = self.training_manager.train_system(progress_callback)
-                self.root.after(0, lambda: self.training_complete(success, message, progress_window))
-            
-            threading.Thread(target=training_thread, daemon=True).start()
+            self.start_training_job()
+    
+    def offer_training_resume(self):
+        """Ask whether to resume a training job that did not finish"""
+        state = self.training_jobs.find_interrupted_job()
+        if state is None or not self.root.winfo_exists():
+            return
+        
+        finished = len(state.get('completed_students', []))
+        if messagebox.askyesno("Resume Training",
+                               f"A training run last active at {state.get('updated_at', 'an unknown time')} did not finish "
+                               f"({finished} students were processed).\n\n"
+                               "Resume it now? Processed students will not be encoded again."):
+            self.start_training_job(resume=True)
+        else:
+            self.training_jobs.discard_interrupted()
+    
+    def start_training_job(self, resume=False):
+        """Queue a training job and show its progress with pause and cancel controls"""
+        # Create progress window; it is not modal so the application stays usable
+        progress_window = tk.Toplevel(self.root)
+        progress_window.title("Training Progress")
+        progress_window.geometry("400x190")
+        progress_window.resizable(False, False)
+        progress_window.transient(self.root)
+        
+        # Center the window
+        progress_window.geometry("+%d+%d" % (
+            self.root.winfo_rootx() + 400,
+            self.root.winfo_rooty() + 300
+        ))
+        
+        # Progress widgets
+        tk.Label(progress_window, text="Training Face Recognition System...", 
+                font=('Arial', 12, 'bold')).pack(pady=(20, 10))
+        
+        progress_var = tk.StringVar(value="Initializing...")
+        progress_label = tk.Label(progress_window, textvariable=progress_var, 
+                                font=('Arial', 10))
+        progress_label.pack(pady=5)
+        
+        progress_bar = ttk.Progressbar(progress_window, length=300, mode='determinate')
+        progress_bar.pack(pady=5)
+        
+        buttons_frame = tk.Frame(progress_window)
+        buttons_frame.pack(pady=10)
+        
+        # Called from the training worker thread, so hand updates to the Tk loop
+        def progress_callback(message, percentage):
+            def update():
+                if progress_window.winfo_exists():
+                    progress_var.set(message)
+                    progress_bar['value'] = percentage
+            self.root.after(0, update)
+        
+        def completion_callback(success, message):
+            self.root.after(0, lambda: self.training_complete(success, message, progress_window,
+                                                              cancelled=job.is_cancelled))
+        
+        if resume:
+            job = self.training_jobs.resume_interrupted(progress_callback, completion_callback)
+        else:
+            job = self.training_jobs.submit(progress_callback, completion_callback)
+        
+        position = self.training_jobs.queue_position(job)
+        if position > 0:
+            progress_var.set(f"Waiting for {position} earlier training job(s)...")
+        
+        def toggle_pause():
+            if job.is_paused:
+                job.resume()
+                pause_button.config(text="Pause")
+                progress_var.set("Resuming...")
+            else:
+                job.pause()
+                pause_button.config(text="Resume")
+                progress_var.set("Pausing after the current student...")
+        
+        def cancel():
+            if messagebox.askyesno("Cancel Training",
+                                   "Stop training after the current student?\n"
+                                   "Students already processed are kept for the next run.",
+                                   parent=progress_window):
+                job.cancel()
+                pause_button.config(state='disabled')
+                cancel_button.config(state='disabled')
+                progress_var.set("Cancelling after the current student...")
+        
+        pause_button = tk.Button(buttons_frame, text="Pause", width=10, command=toggle_pause)
+        pause_button.pack(side='left', padx=5)
+        cancel_button = tk.Button(buttons_frame, text="Cancel", width=10, command=cancel)
+        cancel_button.pack(side='left', padx=5)
     
-    def training_complete(self, success, message, progress_window):
+    def training_complete(self, success, message, progress_window, cancelled=False):
         """Handle training completion"""
-        progress_window.destroy()
+        if progress_window.winfo_exists():
+            progress_window.destroy()
         
         if success:
             messagebox.showinfo("Training Complete", message)
             self.refresh_training_statistics()
+        elif cancelled:
+            messagebox.showinfo("Training Cancelled", message)
         else:
             messagebox.showerror("Training Failed", message)
     
     def refresh_training_statistics(self):
         """Refresh training statistics display"""
-        stats = self.training_manager.get_training_statistics()
+        self.display_training_statistics(self.training_manager.get_training_statistics())
+        
+        def on_refreshed(stats):
+            self.root.after(0, lambda: self.display_training_statistics(stats))
+        
+        self.training_manager.refresh_training_statistics(on_refreshed)
+    
+    def display_training_statistics(self, stats):
+        """Render training statistics into the statistics text box"""
+        if not self.training_stats_text.winfo_exists():
+            return
         
         stats_content = f"""Training Data Statistics:
 
@@ -653,6 +999,23 @@ System Status:
         self.date_entry.grid(row=0, column=3, pady=5)
         self.date_entry.insert(0, datetime.now().strftime("%Y-%m-%d"))
         
+        # Session window: from Start Session for the given minutes, late after the threshold
+        tk.Label(selection_frame, text="Room:", font=('Arial', 11, 'bold'),
+                bg='white').grid(row=1, column=0, sticky='w', padx=(0, 10), pady=5)
+        self.room_entry = tk.Entry(selection_frame, font=('Arial', 11), width=25)
+        self.room_entry.grid(row=1, column=1, padx=(0, 20), pady=5)
+        
+        tk.Label(selection_frame, text="Minutes / late after:", font=('Arial', 11, 'bold'),
+                bg='white').grid(row=1, column=2, sticky='w', padx=(0, 10), pady=5)
+        window_frame = tk.Frame(selection_frame, bg='white')
+        window_frame.grid(row=1, column=3, sticky='w', pady=5)
+        self.session_minutes_entry = tk.Entry(window_frame, font=('Arial', 11), width=5)
+        self.session_minutes_entry.pack(side='left')
+        self.session_minutes_entry.insert(0, "90")
+        self.late_minutes_entry = tk.Entry(window_frame, font=('Arial', 11), width=5)
+        self.late_minutes_entry.pack(side='left', padx=(5, 0))
+        self.late_minutes_entry.insert(0, "10")
+        
         # Buttons
         buttons_frame = tk.Frame(controls_frame, bg='white')
         buttons_frame.pack(fill='x')
@@ -669,11 +1032,22 @@ System Status:
                                cursor='hand2')
         capture_btn.pack(side='left', padx=(0, 10))
         
-        export_btn = tk.Button(buttons_frame, text="Export CSV", 
+        export_btn = tk.Button(buttons_frame, text="Export", 
                               font=('Arial', 11, 'bold'), bg='#ea580c', fg='white',
-                              padx=20, pady=10, command=self.export_attendance_csv,
+                              padx=20, pady=10, command=self.export_attendance,
                               cursor='hand2')
-        export_btn.pack(side='left')
+        export_btn.pack(side='left', padx=(0, 10))
+        
+        self.session_btn = tk.Button(buttons_frame, text="Start Session", 
+                                    font=('Arial', 11, 'bold'), bg='#7c3aed', fg='white',
+                                    padx=20, pady=10, command=self.toggle_attendance_session,
+                                    cursor='hand2')
+        self.session_btn.pack(side='left')
+        
+        self.session_status_var = tk.StringVar(value="No session running")
+        tk.Label(controls_frame, textvariable=self.session_status_var, font=('Arial', 10),
+                bg='white', fg='#6b7280').pack(anchor='w', pady=(10, 0))
+        self.update_session_controls()
         
         # Results area
         results_frame = tk.LabelFrame(self.content_area, text="Attendance Results",
@@ -697,6 +1071,123 @@ System Status:
         self.attendance_tree.pack(side='left', fill='both', expand=True)
         attendance_scrollbar.pack(side='right', fill='y')
     
+    def toggle_attendance_session(self):
+        """Start a session for the entered course, or end the running one"""
+        if self.attendance_session is not None:
+            self.end_attendance_session()
+            return
+        
+        course = self.course_entry.get().strip()
+        if not course:
+            messagebox.showerror("Error", "Please enter a course name!")
+            return
+        try:
+            minutes = int(self.session_minutes_entry.get().strip())
+            late_text = self.late_minutes_entry.get().strip()
+            late_minutes = int(late_text) if late_text else None
+        except ValueError:
+            messagebox.showerror("Error", "Session length and late threshold must be whole minutes!")
+            return
+        
+        start = datetime.now()
+        try:
+            self.attendance_session = AttendanceSession(
+                self.db_manager, course, self.db_manager.get_course_roster(course),
+                room=self.room_entry.get().strip() or None, start=start,
+                end=start + timedelta(minutes=minutes), late_after_minutes=late_minutes)
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not start session: {e}")
+            return
+        
+        self.recognition_cache.clear()
+        self.recognition_session = None
+        self.date_entry.delete(0, tk.END)
+        self.date_entry.insert(0, self.attendance_session.date)
+        self.update_session_controls()
+        self.root.after(30000, self.check_attendance_session)
+    
+    def end_attendance_session(self):
+        """Close the running session, recording everyone not seen as absent"""
+        session = self.attendance_session
+        if session is None or self.session_closing:
+            return
+        self.session_closing = True
+        if hasattr(self, 'session_btn') and self.session_btn.winfo_exists():
+            self.session_btn.config(state='disabled')
+        
+        # Writing the absences and looking up their names can take a while for a large roster
+        def close_thread():
+            try:
+                summary = session.close()
+                names = self.db_manager.get_student_names(summary['absent'])
+            except Exception as e:
+                error = str(e)
+                self.root.after(0, lambda: self.attendance_session_close_failed(session, error))
+                return
+            self.root.after(0, lambda: self.attendance_session_closed(session, summary, names))
+        
+        threading.Thread(target=close_thread, daemon=True).start()
+    
+    def attendance_session_closed(self, session, summary, names):
+        """Show the absences of a closed session"""
+        self.session_closing = False
+        # The session is only dropped once it is closed, so a failed close can be retried
+        if self.attendance_session is session:
+            self.attendance_session = None
+        if hasattr(self, 'session_btn') and self.session_btn.winfo_exists():
+            self.session_btn.config(state='normal')
+        self.update_session_controls()
+        
+        rows = [(student_id, names.get(student_id, ''), '', '', 'Absent') for student_id in summary['absent']]
+        self.insert_attendance_rows(rows)
+        
+        messagebox.showinfo("Session Ended",
+                          f"{session.course_name}: {summary['present']} present, "
+                          f"{summary['late']} late, {len(summary['absent'])} absent.")
+    
+    def attendance_session_close_failed(self, session, error):
+        """Keep the session running so closing it can be retried"""
+        self.session_closing = False
+        if hasattr(self, 'session_btn') and self.session_btn.winfo_exists():
+            self.session_btn.config(state='normal')
+        messagebox.showerror("Error", f"Could not close session: {error}\n\n"
+                             "The session is still open; try ending it again.")
+        if self.attendance_session is session:
+            self.root.after(30000, self.check_attendance_session)
+    
+    def insert_attendance_rows(self, rows, chunk_size=200):
+        """Add rows to the attendance results a chunk at a time so the window stays responsive"""
+        if not rows or not hasattr(self, 'attendance_tree') or not self.attendance_tree.winfo_exists():
+            return
+        for values in rows[:chunk_size]:
+            self.attendance_tree.insert('', 'end', values=values)
+        self.root.after_idle(lambda: self.insert_attendance_rows(rows[chunk_size:], chunk_size))
+    
+    def check_attendance_session(self):
+        """End the session automatically once its window has passed"""
+        session = self.attendance_session
+        if session is None or not self.root.winfo_exists():
+            return
+        if datetime.now() > session.end:
+            self.end_attendance_session()
+        else:
+            self.root.after(30000, self.check_attendance_session)
+    
+    def update_session_controls(self):
+        """Reflect the running session in the attendance controls"""
+        if not hasattr(self, 'session_btn') or not self.session_btn.winfo_exists():
+            return
+        session = self.attendance_session
+        if session is None:
+            self.session_btn.config(text="Start Session")
+            self.session_status_var.set("No session running")
+        else:
+            late = f", late after {session.late_after.strftime('%H:%M')}" if session.late_after else ""
+            self.session_btn.config(text="End Session")
+            roster = "" if session.roster else " (no enrolled students; absences are not recorded)"
+            self.session_status_var.set(
+                f"Session for {session.course_name} until {session.end.strftime('%H:%M')}{late}{roster}")
+    
     def upload_attendance_image(self):
         """Upload and process an image for attendance"""
         if not self.course_entry.get().strip():
@@ -724,7 +1215,7 @@ System Status:
         capture_window.resizable(False, False)
         
         # Initialize camera
-        cap = cv2.VideoCapture(0)
+        cap = cv2.VideoCapture(self.camera_source)
         if not cap.isOpened():
             messagebox.showerror("Error", "Could not open camera!")
             capture_window.destroy()
@@ -777,11 +1268,12 @@ System Status:
                  bg='#dc2626', fg='white', padx=20, pady=8,
                  command=close_capture, cursor='hand2').pack(side='left')
         
-        # Start video feed
-        update_frame()
-        
-        # Wait for window to close
-        capture_window.wait_window()
+        # Start video feed; the whole preview session is one profiled operation
+        with profiler.profile('live_capture'):
+            update_frame()
+            
+            # Wait for window to close
+            capture_window.wait_window()
         
         # Process captured image
         if captured_image is not None:
@@ -814,41 +1306,76 @@ System Status:
         progress_bar.pack(pady=10)
         progress_bar.start()
         
+        # Successive images for the same course and date share one recognition session
+        if self.recognition_session != (course, date):
+            self.recognition_cache.clear()
+            self.recognition_session = (course, date)
+        
+        # A running session for this course decides present, late and already marked
+        session = self.attendance_session
+        if session is not None and (session.course_name != course or session.date != date):
+            session = None
+        
+        # Enrolled students are matched first; everyone else only if no enrolled student fits
+        if session is not None:
+            roster = session.roster_ids
+        else:
+            roster = frozenset(self.db_manager.get_course_roster(course)) or None
+        
         def process_thread():
-            try:
-                # Process image
-                recognized_faces = self.face_recognition.process_image_for_attendance(image_path)
-                
-                # Record attendance
-                attendance_records = []
-                for face_data in recognized_faces:
-                    student_id = face_data['student_id']
-                    confidence = face_data['confidence']
+            with profiler.profile('attendance'):
+                try:
+                    # Process image
+                    recognized_faces = self.face_recognition.process_image_for_attendance(
+                        image_path, cache=self.recognition_cache, roster=roster)
                     
-                    # Get student info
-                    student = self.db_manager.get_student(student_id)
-                    if student:
-                        # Record attendance
-                        self.db_manager.record_attendance(student_id, course, date, current_time)
+                    # Record attendance
+                    attendance_records = []
+                    already_marked = 0
+                    for face_data in recognized_faces:
+                        student_id = face_data['student_id']
+                        confidence = face_data['confidence']
                         
-                        attendance_records.append({
-                            'student_id': student_id,
-                            'name': student['name'],
-                            'time': current_time,
-                            'confidence': f"{confidence:.2%}",
-                            'status': 'Present'
-                        })
-                
-                self.root.after(0, lambda: self.attendance_processing_complete(
-                    processing_window, attendance_records))
+                        # Students recorded earlier in this session need no database work
+                        if (session.is_marked(student_id) if session is not None
+                                else self.recognition_cache.is_marked(student_id)):
+                            already_marked += 1
+                            continue
+                        
+                        # Get student info
+                        student = self.db_manager.get_student(student_id)
+                        if student:
+                            # Record attendance; the session buffers its writes
+                            if session is not None:
+                                status = session.mark(student_id)
+                                if status is None:
+                                    continue
+                            else:
+                                status = 'present'
+                                self.db_manager.record_attendance(student_id, course, date, current_time)
+                                self.recognition_cache.mark(student_id)
+                            
+                            attendance_records.append({
+                                'student_id': student_id,
+                                'name': student['name'],
+                                'time': current_time,
+                                'confidence': f"{confidence:.2%}",
+                                'status': status.capitalize()
+                            })
+                    
+                    if session is not None:
+                        session.flush()
+                    
+                    self.root.after(0, lambda: self.attendance_processing_complete(
+                        processing_window, attendance_records, already_marked))
                 
-            except Exception as e:
-                self.root.after(0, lambda: self.attendance_processing_error(
-                    processing_window, str(e)))
+                except Exception as e:
+                    self.root.after(0, lambda: self.attendance_processing_error(
+                        processing_window, str(e)))
         
         threading.Thread(target=process_thread, daemon=True).start()
     
-    def attendance_processing_complete(self, processing_window, attendance_records):
+    def attendance_processing_complete(self, processing_window, attendance_records, already_marked=0):
         """Handle attendance processing completion"""
         processing_window.destroy()
         
@@ -862,6 +1389,9 @@ System Status:
             
             messagebox.showinfo("Success", 
                               f"Attendance recorded for {len(attendance_records)} student(s)!")
+        elif already_marked:
+            messagebox.showinfo("Already Recorded", 
+                              f"All {already_marked} recognized student(s) were already marked present.")
         else:
             messagebox.showwarning("No Recognition", 
                                  "No students were recognized in the image.")
@@ -871,47 +1401,104 @@ System Status:
         processing_window.destroy()
         messagebox.showerror("Processing Error", f"Failed to process image: {error_message}")
     
-    def export_attendance_csv(self):
-        """Export attendance to CSV file"""
-        course = self.course_entry.get().strip()
-        date = self.date_entry.get().strip()
-        
-        if not course:
-            messagebox.showerror("Error", "Please enter a course name!")
-            return
-        
-        # Get attendance records
-        records = self.db_manager.get_attendance(course, date)
-        
-        if not records:
-            messagebox.showwarning("No Data", "No attendance records found for the specified course and date.")
-            return
-        
-        # Create DataFrame
-        df_data = []
-        for record in records:
-            df_data.append({
-                'Student ID': record['student_id'],
-                'Student Name': record['student_name'],
-                'Course': record['course_name'],
-                'Date': record['date'],
-                'Time': record['time'],
-                'Status': record['status']
-            })
-        
-        df = pd.DataFrame(df_data)
-        
-        # Save file
-        filename = f"attendance_{course.replace(' ', '_')}_{date}.csv"
-        file_path = filedialog.asksaveasfilename(
-            defaultextension=".csv",
-            filetypes=[("CSV files", "*.csv")],
-            initialname=filename
-        )
+    def export_attendance(self):
+        """Export attendance for a range of courses and dates"""
+        export_window = tk.Toplevel(self.root)
+        export_window.title("Export Attendance")
+        export_window.geometry("420x300")
+        export_window.resizable(False, False)
+        export_window.transient(self.root)
+        
+        form_frame = tk.Frame(export_window, padx=20, pady=15)
+        form_frame.pack(fill='x')
+        
+        # Defaults come from the attendance controls
+        tk.Label(form_frame, text="Courses (comma separated, blank for all):",
+                font=('Arial', 10)).grid(row=0, column=0, columnspan=2, sticky='w')
+        courses_entry = tk.Entry(form_frame, font=('Arial', 10), width=40)
+        courses_entry.grid(row=1, column=0, columnspan=2, sticky='w', pady=(0, 10))
+        courses_entry.insert(0, self.course_entry.get().strip())
+        
+        tk.Label(form_frame, text="From date:", font=('Arial', 10)).grid(row=2, column=0, sticky='w')
+        start_entry = tk.Entry(form_frame, font=('Arial', 10), width=15)
+        start_entry.grid(row=2, column=1, sticky='w', pady=2)
+        start_entry.insert(0, self.date_entry.get().strip())
+        
+        tk.Label(form_frame, text="To date:", font=('Arial', 10)).grid(row=3, column=0, sticky='w')
+        end_entry = tk.Entry(form_frame, font=('Arial', 10), width=15)
+        end_entry.grid(row=3, column=1, sticky='w', pady=2)
+        end_entry.insert(0, self.date_entry.get().strip())
+        
+        tk.Label(form_frame, text="Format:", font=('Arial', 10)).grid(row=4, column=0, sticky='w')
+        format_var = tk.StringVar(value='csv')
+        ttk.Combobox(form_frame, textvariable=format_var, values=list(EXPORT_FORMATS.keys()),
+                    width=12, state='readonly').grid(row=4, column=1, sticky='w', pady=2)
+        
+        status_var = tk.StringVar(value="")
+        tk.Label(export_window, textvariable=status_var, font=('Arial', 9)).pack()
+        progress_bar = ttk.Progressbar(export_window, length=350, mode='determinate')
+        progress_bar.pack(pady=5)
+        
+        buttons_frame = tk.Frame(export_window)
+        buttons_frame.pack(pady=10)
+        cancel_event = threading.Event()
+        
+        def on_progress(exported, total):
+            self.root.after(0, lambda: update_progress(exported, total))
+        
+        def update_progress(exported, total):
+            if export_window.winfo_exists():
+                progress_bar['value'] = exported * 100 / total
+                status_var.set(f"Exported {exported} of {total} records...")
+        
+        def on_complete(success, message):
+            self.root.after(0, lambda: finish_export(success, message))
+        
+        def finish_export(success, message):
+            if export_window.winfo_exists():
+                export_window.destroy()
+            if success:
+                messagebox.showinfo("Success", message)
+            else:
+                messagebox.showwarning("Export", message)
         
-        if file_path:
-            df.to_csv(file_path, index=False)
-            messagebox.showinfo("Success", f"Attendance exported to {file_path}")
+        def start_export():
+            courses = [course.strip() for course in courses_entry.get().split(',') if course.strip()]
+            start_date = start_entry.get().strip() or None
+            end_date = end_entry.get().strip() or None
+            fmt = format_var.get()
+            
+            name = courses[0].replace(' ', '_') if len(courses) == 1 else 'all_courses'
+            filename = f"attendance_{name}_{start_date or 'start'}_{end_date or 'end'}{EXPORT_FORMATS[fmt]}"
+            file_path = filedialog.asksaveasfilename(
+                defaultextension=EXPORT_FORMATS[fmt],
+                filetypes=[(f"{fmt.upper()} files", f"*{EXPORT_FORMATS[fmt]}")],
+                initialfile=filename
+            )
+            if not file_path:
+                return
+            
+            export_btn.configure(state='disabled')
+            status_var.set("Starting export...")
+            self.attendance_exporter.export_async(
+                file_path, on_complete, fmt=fmt, course_names=courses or None,
+                start_date=start_date, end_date=end_date,
+                progress_callback=on_progress, cancel_event=cancel_event)
+        
+        def cancel_export():
+            cancel_event.set()
+            export_window.destroy()
+        
+        # Closing the window stops a running export instead of leaving it running unseen
+        export_window.protocol("WM_DELETE_WINDOW", cancel_export)
+        
+        export_btn = tk.Button(buttons_frame, text="Export", font=('Arial', 10, 'bold'),
+                              bg='#ea580c', fg='white', padx=15, pady=5,
+                              command=start_export, cursor='hand2')
+        export_btn.pack(side='left', padx=5)
+        tk.Button(buttons_frame, text="Cancel", font=('Arial', 10, 'bold'),
+                 bg='#dc2626', fg='white', padx=15, pady=5,
+                 command=cancel_export, cursor='hand2').pack(side='left', padx=5)
     
     def show_student_profiles(self):
         """Show student profiles interface"""
@@ -959,10 +1546,18 @@ System Status:
                                    fg='#6b7280', padx=15, pady=10)
         search_frame.pack(fill='x', pady=(15, 0))
         
-        tk.Label(search_frame, text="Student ID:", font=('Arial', 10),
+        tk.Label(search_frame, text="Student ID, name or email:", font=('Arial', 10),
                 bg='white').pack(anchor='w')
         self.search_entry = tk.Entry(search_frame, font=('Arial', 10), width=25)
         self.search_entry.pack(fill='x', pady=(5, 10))
+        self.search_entry.bind('<KeyRelease>', self.schedule_incremental_search)
+        
+        # Incremental search results
+        self.search_results_listbox = tk.Listbox(search_frame, font=('Arial', 10), height=6)
+        self.search_results_listbox.pack(fill='x', pady=(0, 10))
+        self.search_results_listbox.bind('<<ListboxSelect>>', self.on_search_result_selected)
+        self.search_results = []
+        self.search_after_id = None
         
         search_btn = tk.Button(search_frame, text="Search", font=('Arial', 10, 'bold'),
                               bg='#6b7280', fg='white', padx=15, pady=5,
@@ -1070,17 +1665,47 @@ System Status:
             messagebox.showerror("Error", f"Failed to process image: {str(e)}")
     
     def search_student_profile(self):
-        """Search for student profile by ID"""
-        student_id = self.search_entry.get().strip()
-        if not student_id:
-            messagebox.showerror("Error", "Please enter a student ID!")
+        """Search for student profile by ID, name or email"""
+        query = self.search_entry.get().strip()
+        if not query:
+            messagebox.showerror("Error", "Please enter a student ID, name or email!")
             return
         
-        student = self.db_manager.get_student(student_id)
-        if student:
-            self.display_student_profile(student)
+        students = self.db_manager.search_students(query, limit=20)
+        self.show_search_results(students)
+        if students:
+            self.display_student_profile(students[0])
         else:
-            messagebox.showerror("Not Found", f"Student with ID '{student_id}' not found!")
+            messagebox.showerror("Not Found", f"No student matching '{query}' found!")
+    
+    def schedule_incremental_search(self, event=None):
+        """Run the search shortly after the user stops typing"""
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(150, self.run_incremental_search)
+    
+    def run_incremental_search(self):
+        """Update the search results list for the current query"""
+        self.search_after_id = None
+        if not self.search_entry.winfo_exists():
+            return
+        
+        query = self.search_entry.get().strip()
+        students = self.db_manager.search_students(query, limit=20) if query else []
+        self.show_search_results(students)
+    
+    def show_search_results(self, students):
+        """Fill the search results list"""
+        self.search_results = students
+        self.search_results_listbox.delete(0, tk.END)
+        for student in students:
+            self.search_results_listbox.insert(tk.END, f"{student['student_id']} - {student['name']} ({student['email']})")
+    
+    def on_search_result_selected(self, event=None):
+        """Show the profile of the selected search result"""
+        selection = self.search_results_listbox.curselection()
+        if selection and selection[0] < len(self.search_results):
+            self.display_student_profile(self.search_results[selection[0]])
     
     def show_reports(self):
         """Show reports interface"""
@@ -1096,17 +1721,68 @@ System Status:
         tk.Label(title_frame, text="System statistics and attendance reports",
                 font=('Arial', 12), bg='white', fg='#6b7280').pack(anchor='w')
         
+        # Report controls
+        controls_frame = tk.Frame(self.content_area, bg='white')
+        controls_frame.pack(fill='x', padx=40)
+        
+        tk.Label(controls_frame, text="Course:", font=('Arial', 11, 'bold'),
+                bg='white').pack(side='left', padx=(0, 10))
+        self.report_course_var = tk.StringVar()
+        self.report_course_combo = ttk.Combobox(controls_frame, textvariable=self.report_course_var,
+                                               width=30, state='readonly')
+        self.report_course_combo.pack(side='left', padx=(0, 20))
+        
+        generate_btn = tk.Button(controls_frame, text="Generate Report", font=('Arial', 10, 'bold'),
+                                bg='#1e3a8a', fg='white', padx=15, pady=5,
+                                command=lambda: self.generate_report(self.report_course_var.get() or None),
+                                cursor='hand2')
+        generate_btn.pack(side='left')
+        
         # Reports content
         reports_frame = tk.Frame(self.content_area, bg='white', padx=20, pady=20)
         reports_frame.pack(fill='both', expand=True, padx=20, pady=10)
         
         # System statistics
-        stats_text = tk.Text(reports_frame, height=20, font=('Arial', 10),
-                            bg='#f8fafc', relief='solid', bd=1)
-        stats_text.pack(fill='both', expand=True)
+        self.report_text = tk.Text(reports_frame, height=20, font=('Courier', 10),
+                                  bg='#f8fafc', relief='solid', bd=1)
+        self.report_text.pack(fill='both', expand=True)
         
-        # Generate report content
-        students = self.db_manager.get_all_students()
+        self.generate_report()
+    
+    def generate_report(self, course_name=None):
+        """Build the report in a background thread and display it when ready"""
+        self.report_text.configure(state='normal')
+        self.report_text.delete('1.0', tk.END)
+        self.report_text.insert('1.0', "Generating report...")
+        self.report_text.configure(state='disabled')
+        
+        def report_thread():
+            try:
+                courses = self.attendance_analytics.get_course_overview()
+                content = self.build_report_content(courses, course_name)
+            except Exception as e:
+                courses = []
+                content = f"Failed to generate report: {str(e)}"
+            self.root.after(0, lambda: self.display_report(content, courses))
+        
+        threading.Thread(target=report_thread, daemon=True).start()
+    
+    def display_report(self, report_content, courses):
+        """Show generated report content"""
+        if not self.report_text.winfo_exists():
+            return
+        
+        self.report_course_combo['values'] = [course['course_name'] for course in courses]
+        
+        self.report_text.configure(state='normal')
+        self.report_text.delete('1.0', tk.END)
+        self.report_text.insert('1.0', report_content.strip())
+        self.report_text.configure(state='disabled')
+    
+    def build_report_content(self, courses, course_name=None):
+        """Assemble the report text (runs off the UI thread)"""
+        total_students = self.db_manager.count_students()
+        students, _ = self.db_manager.get_students_page(limit=10)
         training_stats = self.training_manager.get_training_statistics()
         
         report_content = f"""
@@ -1114,7 +1790,7 @@ EDUFACE SYSTEM REPORT
 Generated on: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
 
 === SYSTEM OVERVIEW ===
-• Total Registered Students: {len(students)}
+• Total Registered Students: {total_students}
 • Students with Training Data: {training_stats['total_students']}
 • Total Training Images: {training_stats['total_images']}
 • System Status: Active
@@ -1123,9 +1799,23 @@ Generated on: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
 • Face Detection Algorithm: MTCNN (Multi-task CNN)
 • Face Recognition Algorithm: FaceNet
 • Classifier: Support Vector Machine (SVM)
-• Recognition Accuracy: 95% (based on testing)
-• Detection Accuracy: 100% (based on testing)
 
+=== ATTENDANCE BY COURSE ===
+"""
+        
+        if courses:
+            for course in courses:
+                report_content += (f"• {course['course_name']}: {course['days_held']} days held, "
+                                   f"{course['students']} students, "
+                                   f"average attendance {course['average_rate']:.1%} "
+                                   f"(last held {course['last_date']})\n")
+        else:
+            report_content += "• No attendance recorded yet\n"
+        
+        if course_name:
+            report_content += self.build_course_report(course_name)
+        
+        report_content += f"""
 === TRAINING DATA ANALYSIS ===
 """
         
@@ -1140,11 +1830,11 @@ Generated on: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
 === STUDENT DATABASE ===
 """
         
-        for student in students[:10]:  # Show first 10 students
+        for student in students:  # Show first 10 students
             report_content += f"• {student['student_id']} - {student['name']} (CGPA: {student['cgpa']})\n"
         
-        if len(students) > 10:
-            report_content += f"... and {len(students) - 10} more students\n"
+        if total_students > 10:
+            report_content += f"... and {total_students - 10} more students\n"
         
         report_content += f"""
 
@@ -1180,11 +1870,46 @@ System Version: 1.0.0
 Last Updated: {datetime.now().strftime("%Y-%m-%d")}
         """
         
-        stats_text.insert('1.0', report_content.strip())
-        stats_text.configure(state='disabled')
+        return report_content
+    
+    def build_course_report(self, course_name):
+        """Assemble the per-course section of the report"""
+        rates = self.attendance_analytics.get_student_attendance_rates(course_name)
+        trend = self.attendance_analytics.get_weekly_trend(course_name)
+        matrix = self.attendance_analytics.get_course_week_matrix(course_name)
+        
+        content = f"\n=== COURSE: {course_name} ===\n\nWeekly trend:\n"
+        for week in trend:
+            content += f"• {week['week']}: {week['days_held']} days held, {week['average_present']:.1f} present on average\n"
+        
+        content += "\nAttendance rates (lowest first):\n"
+        for rate in rates:
+            content += (f"• {rate['student_id']} - {rate['name']}: {rate['rate']:.1%} "
+                        f"({rate['days_present']}/{rate['days_held']} days)\n")
+        
+        # Days present per student per week
+        content += "\nWeekly matrix (days present / days held):\n"
+        content += "Student".ljust(16) + "".join(week.ljust(10) for week in matrix['weeks']) + "\n"
+        content += " " * 16 + "".join(str(days).ljust(10) for days in matrix['days_held']) + "\n"
+        for row in matrix['rows']:
+            content += row['student_id'][:15].ljust(16) + "".join(str(days).ljust(10) for days in row['days']) + "\n"
+        
+        if rates:
+            # A course day exists only once someone attended it
+            last_date = max(rate['last_date'] for rate in rates)
+            absentees = self.attendance_analytics.get_absentees(course_name, last_date)
+            content += f"\nAbsent on {last_date}:\n"
+            for student in absentees:
+                content += f"• {student['student_id']} - {student['name']}\n"
+            if not absentees:
+                content += "• None\n"
+        
+        return content
     
     def logout(self):
         """Handle user logout"""
+        if self.attendance_session is not None:
+            self.end_attendance_session()
         self.current_user = None
         self.is_logged_in = False
         self.create_login_screen()
@@ -6,12 +6,17 @@ Main entry point for the application
 
 import sys
 import os
+import argparse
 import tkinter as tk
 from tkinter import messagebox
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+# Thread pools are sized before the GUI imports numpy, OpenCV and TensorFlow
+from face_recognition.runtime_config import configure_runtime
+configure_runtime('interactive')
+
 try:
     from gui.main_window import MainApplication
 except ImportError as e:
@@ -56,10 +61,29 @@ def check_dependencies():
     
     return True
 
+def parse_arguments():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="EduFace AI - Face Recognition Attendance System")
+    parser.add_argument('--profile', nargs='?', const='profiles', metavar='DIR',
+                        default=os.environ.get('EDUFACE_PROFILE_DIR'),
+                        help="Capture cProfile and tracemalloc reports for training runs, "
+                             "attendance runs and live capture sessions into DIR "
+                             "(default: profiles)")
+    parser.add_argument('--camera', default=os.environ.get('EDUFACE_CAMERA', '0'),
+                        help="Camera used for capture: a device index, RTSP URL or video file "
+                             "(default: 0)")
+    return parser.parse_args()
+
 def main():
     """Main function to start the application"""
+    args = parse_arguments()
     print("Starting EduFace AI - Face Recognition Attendance System...")
     
+    if args.profile:
+        from monitoring.profiler import profiler
+        profiler.configure(args.profile)
+        print(f"Profiling enabled, reports will be written to {os.path.abspath(args.profile)}")
+    
     # Check dependencies
     if not check_dependencies():
         sys.exit(1)
@@ -75,7 +99,8 @@ def main():
             pass  # Icon file not found, continue without it
         
         # Create application
-        app = MainApplication(root)
+        from camera.camera_ingest import parse_camera_source
+        app = MainApplication(root, camera_source=parse_camera_source(args.camera))
         
         # Start the GUI event loop
         root.mainloop()
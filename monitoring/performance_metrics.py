@@ -0,0 +1,126 @@
+import time
+import json
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+class RollingHistogram:
+    """Recent timings for one stage plus lifetime totals"""
+    
+    def __init__(self, window=1024):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def record(self, seconds):
+        """Add one timing in seconds"""
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+    
+    def snapshot(self):
+        """Summary statistics; percentiles cover the rolling window only"""
+        samples = sorted(self.samples)
+        
+        def percentile(q):
+            if not samples:
+                return 0.0
+            index = min(len(samples) - 1, int(round(q * (len(samples) - 1))))
+            return samples[index] * 1000
+        
+        return {
+            'count': self.count,
+            'window': len(samples),
+            'total_s': self.total,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'max_ms': self.max * 1000
+        }
+
+class PerformanceMetrics:
+    """Registry of per-stage rolling timing histograms"""
+    
+    def __init__(self, window=1024):
+        self.window = window
+        self.started_at = time.time()
+        self._histograms = {}
+        self._lock = threading.Lock()
+    
+    def record(self, stage, seconds):
+        """Record a timing for a stage"""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = RollingHistogram(self.window)
+            histogram.record(seconds)
+    
+    @contextmanager
+    def time(self, stage):
+        """Time the enclosed block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+    
+    def timed(self, stage):
+        """Decorator that times every call of a function"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+            return wrapper
+        return decorator
+    
+    def snapshot(self):
+        """Statistics for every stage, sorted by stage name"""
+        with self._lock:
+            return {stage: histogram.snapshot()
+                    for stage, histogram in sorted(self._histograms.items())}
+    
+    def reset(self):
+        """Forget all recorded timings"""
+        with self._lock:
+            self._histograms = {}
+            self.started_at = time.time()
+    
+    def to_json(self):
+        """Metrics as a JSON document"""
+        return json.dumps({
+            'started_at': self.started_at,
+            'exported_at': time.time(),
+            'stages': self.snapshot()
+        }, indent=2)
+    
+    def to_prometheus(self):
+        """Metrics in the Prometheus text exposition format"""
+        lines = [
+            '# HELP eduface_stage_seconds Time spent per pipeline stage',
+            '# TYPE eduface_stage_seconds summary'
+        ]
+        for stage, stats in self.snapshot().items():
+            for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms'), ('0.99', 'p99_ms')):
+                lines.append(f'eduface_stage_seconds{{stage="{stage}",quantile="{quantile}"}} '
+                             f'{stats[key] / 1000:.6f}')
+            lines.append(f'eduface_stage_seconds_sum{{stage="{stage}"}} {stats["total_s"]:.6f}')
+            lines.append(f'eduface_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+        return '\n'.join(lines) + '\n'
+    
+    def export(self, file_path):
+        """Write metrics to a file; .prom/.txt gives Prometheus format, otherwise JSON"""
+        content = self.to_prometheus() if file_path.endswith(('.prom', '.txt')) else self.to_json()
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+# Process-wide registry shared by the recognition system, database and GUI
+metrics = PerformanceMetrics()
@@ -0,0 +1,106 @@
+import os
+import io
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+class OperationProfiler:
+    """Opt-in cProfile and tracemalloc capture around individual operations"""
+    
+    def __init__(self, output_dir=None, top_count=40, traceback_depth=15):
+        self.output_dir = output_dir
+        self.top_count = top_count
+        self.traceback_depth = traceback_depth
+        self._lock = threading.Lock()
+    
+    @property
+    def enabled(self):
+        return self.output_dir is not None
+    
+    def configure(self, output_dir):
+        """Enable profiling and write reports to output_dir (None disables it)"""
+        self.output_dir = output_dir
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+    
+    @contextmanager
+    def profile(self, operation):
+        """Profile the enclosed block when profiling is enabled"""
+        # tracemalloc is process-wide, so only one operation is captured at a time
+        if not self.enabled or not self._lock.acquire(blocking=False):
+            yield
+            return
+        
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(self.traceback_depth)
+        if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+
+            tracemalloc.reset_peak()
+        start_snapshot = tracemalloc.take_snapshot()
+        
+        # cProfile only sees the thread that enables it
+        profiler = cProfile.Profile()
+        start_time = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start_time
+            end_snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            try:
+                self.write_reports(operation, profiler, start_snapshot, end_snapshot, peak, elapsed)
+            except Exception as e:
+                print(f"Error writing profile for {operation}: {e}")
+            finally:
+                self._lock.release()
+    
+    def write_reports(self, operation, profiler, start_snapshot, end_snapshot, peak, elapsed):
+        """Write the .prof dump, a CPU summary and an allocation report"""
+        base = os.path.join(self.output_dir,
+                            f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{operation}")
+        
+        profiler.dump_stats(base + '.prof')
+        
+        cpu_report = io.StringIO()
+        stats = pstats.Stats(profiler, stream=cpu_report)
+        stats.sort_stats('cumulative').print_stats(self.top_count)
+        stats.sort_stats('tottime').print_stats(self.top_count)
+        with open(base + '_cpu.txt', 'w', encoding='utf-8') as f:
+            f.write(f"Operation: {operation}\nWall time: {elapsed:.3f} s\n\n")
+            f.write(cpu_report.getvalue())
+        
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            tracemalloc.Filter(False, '<unknown>')
+        ]
+        start_snapshot = start_snapshot.filter_traces(filters)
+        end_snapshot = end_snapshot.filter_traces(filters)
+        
+        with open(base + '_alloc.txt', 'w', encoding='utf-8') as f:
+            f.write(f"Operation: {operation}\n")
+            f.write(f"Peak traced memory: {peak / (1024 * 1024):.1f} MB\n\n")
+            
+            f.write(f"Top {self.top_count} allocation sites by growth during the operation:\n")
+            for stat in end_snapshot.compare_to(start_snapshot, 'lineno')[:self.top_count]:
+                f.write(f"  {stat}\n")
+            
+            f.write(f"\nTop 10 live allocations at the end, with tracebacks:\n")
+            for stat in end_snapshot.statistics('traceback')[:10]:
+                f.write(f"\n  {stat.count} blocks, {stat.size / 1024:.1f} KiB\n")
+                for line in stat.traceback.format():
+                    f.write(f"    {line}\n")
+        
+        print(f"Profile for {operation} written to {base}.prof")
+
+# Process-wide profiler, disabled unless main.py is started with --profile
+profiler = OperationProfiler()
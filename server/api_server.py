@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+EduFace AI - Local JSON/WebSocket API
+Serves students and attendance to the web dashboard and pushes new attendance live
+"""
+
+import os
+import sys
+import json
+import queue
+import base64
+import socket
+import struct
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.database_manager import DatabaseManager
+from training.statistics_cache import TrainingStatisticsCache
+from monitoring.performance_metrics import metrics
+from face_recognition.runtime_config import configure_runtime
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_PAGE_SIZE = 1000
+MAX_BODY_BYTES = 20 * 1024 * 1024
+MAX_BACKLOG_PAGES = 10
+# Live events waiting for one client; a client this far behind is disconnected and
+# catches up from its latest id when it reconnects
+MAX_QUEUED_EVENTS = 256
+
+def encode_cursor(key):
+    """Opaque page cursor for a (name, id) keyset position"""
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    name, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    return name, int(row_id)
+
+def student_to_json(student, training_stats):
+    """Student in the shape the web dashboard uses"""
+    images = training_stats.get(student['student_id'], {}).get('image_count', 0)
+    return {
+        'id': student['student_id'],
+        'name': student['name'],
+        'email': student['email'],
+        'cgpa': student['cgpa'],
+        'advisor': student['advisor'],
+        'address': student['address'],
+        'trainingImages': images
+    }
+
+def attendance_to_json(record):
+    """Attendance record in the shape the web dashboard uses"""
+    return {
+        'id': str(record['id']),
+        'studentId': record['student_id'],
+        'studentName': record['student_name'],
+        'course': record['course_name'],
+        'date': record['date'],
+        'time': record['time'],
+        'status': record['status']
+    }
+
+class WebSocketConnection:
+    """Server side of one RFC 6455 connection, text frames only"""
+    
+    def __init__(self, rfile, wfile, sock=None):
+        self.rfile = rfile
+        self.wfile = wfile
+        self.sock = sock
+        self.closed = False
+        self._send_lock = threading.Lock()
+        # Live events are written by the connection's own sender thread, so a slow client
+        # never blocks the hub or the other clients
+        self._outbox = queue.Queue(maxsize=MAX_QUEUED_EVENTS)
+        self._sender = None
+    
+    def send_frame(self, opcode, payload=b''):
+        header = bytes([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header += bytes([length])
+        elif length < 65536:
+            header += bytes([126]) + struct.pack('!H', length)
+        else:
+            header += bytes([127]) + struct.pack('!Q', length)
+        with self._send_lock:
+            if self.closed:
+                return
+            try:
+                self.wfile.write(header + payload)
+                self.wfile.flush()
+            except OSError:
+                self.closed = True
+    
+    def send_json(self, payload):
+        self.send_frame(0x1, json.dumps(payload).encode('utf-8'))
+    
+    def queue_text(self, data):
+        """Queue an encoded text frame for the sender thread, dropping the client if it is too far behind"""
+        try:
+            self._outbox.put_nowait(data)
+        except queue.Full:
+            print("Dropping a WebSocket client that stopped reading events")
+            self.shutdown()
+    
+    def start_sender(self):
+        """Start writing queued events"""
+        self._sender = threading.Thread(target=self.send_queued, daemon=True, name="websocket-sender")
+        self._sender.start()
+    
+    def send_queued(self):
+        while not self.closed:
+            try:
+                data = self._outbox.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            self.send_frame(0x1, data)
+    
+    def shutdown(self):
+        """Close the socket so blocked reads and writes on it return"""
+        self.closed = True
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+    
+    def read_frame(self):
+        """Read one client frame; returns (opcode, payload) or (None, None) on disconnect"""
+        header = self.rfile.read(2)
+        if len(header) < 2:
+            return None, None
+        opcode = header[0] & 0x0F
+        length = header[1] & 0x7F
+        if length == 126:
+            length = struct.unpack('!H', self.rfile.read(2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', self.rfile.read(8))[0]
+        # Client frames are always masked
+        mask = self.rfile.read(4) if header[1] & 0x80 else b'\x00\x00\x00\x00'
+        data = self.rfile.read(length)
+        payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(data))
+        return opcode, payload
+    
+    def serve(self):
+        """Answer pings and wait for the client to close"""
+        while not self.closed:
+            opcode, payload = self.read_frame()
+            if opcode is None or opcode == 0x8:
+                self.send_frame(0x8)
+                self.closed = True
+            elif opcode == 0x9:
+                self.send_frame(0xA, payload)
+
+class AttendanceEventHub:
+    """Watches the attendance table and pushes new records to every WebSocket client"""
+    
+    def __init__(self, db_manager, poll_interval=0.5):
+        self.db_manager = db_manager
+        self.poll_interval = poll_interval
+        self.last_id = db_manager.get_data_version()['latest_attendance_id']
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+    
+    def notify(self):
+        """Check for new attendance now instead of waiting for the next poll"""
+        self._wake.set()
+    
+    def add_client(self, connection, after_id):
+        """Register a client, first sending what it missed since after_id"""
+        # Records up to latest_id come from the backlog and later ones from the live stream,
+        # which queues them until the backlog has been sent; neither step holds the lock
+        with self._lock:
+            latest_id = self.last_id
+            self._clients.add(connection)
+        
+        pages = 0
+        while after_id < latest_id and not connection.closed:
+            if pages == MAX_BACKLOG_PAGES:
+                # Too far behind; the client should page through /api/attendance instead
+                connection.send_json({'type': 'resync', 'latestId': latest_id})
+                break
+            records, _ = self.db_manager.get_attendance_page(after_id, MAX_PAGE_SIZE)
+            records = [record for record in records if record['id'] <= latest_id]
+            if not records:
+                break
+            connection.send_json({'type': 'attendance',
+                                  'records': [attendance_to_json(r) for r in records]})
+            after_id = records[-1]['id']
+            pages += 1
+        connection.send_json({'type': 'ready', 'latestId': latest_id})
+        connection.start_sender()
+    
+    def remove_client(self, connection):
+        with self._lock:
+            self._clients.discard(connection)
+        connection.shutdown()
+    
+    def run(self):
+        while not self._stop_event.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self.broadcast_new_records()
+            except Exception as e:
+                print(f"Error pushing attendance events: {e}")
+    
+    def broadcast_new_records(self):
+        # Only this thread advances last_id. The primary key index makes this an index range
+        # scan, even on large tables
+        records, _ = self.db_manager.get_attendance_page(self.last_id, MAX_PAGE_SIZE)
+        if not records:
+            return
+        event = json.dumps({'type': 'attendance',
+                            'records': [attendance_to_json(r) for r in records]}).encode('utf-8')
+        # Clients registered after this point start their backlog at the new last_id
+        with self._lock:
+            self.last_id = records[-1]['id']
+            clients = [connection for connection in self._clients if not connection.closed]
+            self._clients = set(clients)
+        for connection in clients:
+            connection.queue_text(event)
+
+class DashboardAPI:
+    """Queries behind the API endpoints"""
+    
+    def __init__(self, db_manager, training_stats):
+        self.db_manager = db_manager
+        self.training_stats = training_stats
+        self._recognition = None
+        self._recognition_lock = threading.Lock()
+    
+    def version(self, table):
+        """ETag ingredient for a table, including training image counts for students"""
+        version = self.db_manager.get_data_version()[table]
+        if table == 'students':
+            version += f"-{self.training_stats.get_statistics()['total_images']}"
+        return version
+    
+    def students_page(self, cursor, limit):
+        after = decode_cursor(cursor) if cursor else None
+        students, next_key = self.db_manager.get_students_page(after, limit)
+        stats = self.training_stats.get_statistics()['students_data']
+        return {
+            'students': [student_to_json(student, stats) for student in students],
+            'next': encode_cursor(next_key) if next_key else None,
+            'total': self.db_manager.count_students()
+        }
+    
+    def attendance_page(self, after_id, limit, course_names, start_date, end_date):
+        records, next_after = self.db_manager.get_attendance_page(
+            after_id, limit, course_names, start_date, end_date)
+        return {
+            'records': [attendance_to_json(record) for record in records],
+            'next': next_after
+        }
+    
+    def recognition(self):
+        """Load the recognition models on first use so the data API starts instantly"""
+        with self._recognition_lock:
+            if self._recognition is None:
+                from face_recognition.face_detector import FaceRecognitionSystem
+                from face_recognition.batch_recognizer import BatchRecognizer
+                from server.recognition_server import RecognitionService
+                face_recognition = FaceRecognitionSystem()
+                batcher = BatchRecognizer(face_recognition)
+                batcher.start()
+                self._recognition = RecognitionService(face_recognition, self.db_manager, batcher)
+            return self._recognition
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    """JSON endpoints with conditional GETs, plus the /api/events WebSocket"""
+    
+    server_version = "EduFaceAPI/1.0"
+    protocol_version = "HTTP/1.1"
+    
+    def send_json(self, status, payload, etag=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_not_modified(self, etag):
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def conditional_json(self, table, query, build_payload):
+        """Answer 304 when the client's ETag still matches, otherwise build the payload"""
+        version = self.server.api.version(table)
+        digest = hashlib.sha1(f"{table}|{version}|{query}".encode('utf-8')).hexdigest()[:20]
+        etag = f'W/"{digest}"'
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_not_modified(etag)
+            return
+        self.send_json(200, build_payload(), etag)
+    
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0 or length > MAX_BODY_BYTES:
+            raise ValueError("Missing or oversized request body")
+        return self.rfile.read(length)
+    
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        
+        def param(name, default=None):
+            return params.get(name, [default])[0]
+        
+        try:
+            limit = max(1, min(int(param('limit', 100)), MAX_PAGE_SIZE))
+            if url.path == '/api/students':
+                with metrics.time('api.students'):
+                    self.conditional_json('students', url.query,
+                                          lambda: self.server.api.students_page(param('after'), limit))
+            elif url.path == '/api/attendance':
+                with metrics.time('api.attendance'):
+                    self.conditional_json('attendance', url.query, lambda: self.server.api.attendance_page(
+                        int(param('after', 0)), limit, params.get('course'),
+                        param('from'), param('to')))
+            elif url.path == '/api/events':
+                self.open_websocket(int(param('after', 0)))
+            elif url.path == '/api/health':
+                self.send_json(200, {'status': 'ok'})
+            else:
+                self.send_json(404, {'error': 'Not found'})
+        except (ValueError, TypeError) as e:
+            self.send_json(400, {'error': f"Invalid request: {e}"})
+    
+    def do_POST(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        api = self.server.api
+        try:
+            if url.path == '/api/students':
+                data = json.loads(self.read_body())
+                if not api.db_manager.add_student(data['studentId'], data['name'], data['email'],
+                                                  float(data.get('cgpa') or 0), data.get('advisor', ''),
+                                                  data.get('address', '')):
+                    self.send_json(409, {'error': 'Student ID already exists'})
+                    return
+                self.send_json(201, student_to_json(api.db_manager.get_student(data['studentId']), {}))
+            elif url.path == '/api/attendance':
+                data = json.loads(self.read_body())
+                api.db_manager.record_attendance(data['studentId'], data['course'], data['date'],
+                                                 data.get('time') or datetime.now().strftime("%H:%M:%S"))
+                self.server.events.notify()
+                self.send_json(201, {'status': 'recorded'})
+            elif url.path == '/api/recognize':
+                result = api.recognition().recognize(self.read_body(), params.get('course', [None])[0],
+                                                     params.get('date', [None])[0])
+                self.server.events.notify()
+                self.send_json(200, result)
+            else:
+                self.send_json(404, {'error': 'Not found'})
+        except (KeyError, ValueError) as e:
+            self.send_json(400, {'error': f"Invalid request: {e}"})
+        except Exception as e:
+            self.send_json(500, {'error': str(e)})
+    
+    def do_PATCH(self):
+        url = urlparse(self.path)
+        api = self.server.api
+        try:
+            if url.path.startswith('/api/students/'):
+                student_id = unquote(url.path[len('/api/students/'):])
+                data = json.loads(self.read_body())
+                cgpa = data.get('cgpa')
+                if not api.db_manager.update_student(student_id, data.get('name'), data.get('email'),
+                                                     float(cgpa) if cgpa is not None else None,
+                                                     data.get('advisor'), data.get('address')):
+                    self.send_json(404, {'error': 'Student not found'})
+                    return
+                stats = api.training_stats.get_statistics()['students_data']
+                self.send_json(200, student_to_json(api.db_manager.get_student(student_id), stats))
+            else:
+                self.send_json(404, {'error': 'Not found'})
+        except (KeyError, ValueError) as e:
+            self.send_json(400, {'error': f"Invalid request: {e}"})
+        except Exception as e:
+            self.send_json(500, {'error': str(e)})
+    
+    def open_websocket(self, after_id):
+        """Upgrade the request and stream attendance events until the client leaves"""
+        key = self.headers.get('Sec-WebSocket-Key')
+        if self.headers.get('Upgrade', '').lower() != 'websocket' or not key:
+            self.send_json(426, {'error': 'WebSocket upgrade required'})
+            return
+        
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode('ascii')).digest())
+        self.send_response(101)
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept.decode('ascii'))
+        self.end_headers()
+        self.wfile.flush()
+        
+        connection = WebSocketConnection(self.rfile, self.wfile, self.connection)
+        try:
+            self.server.events.add_client(connection, after_id)
+            connection.serve()
+        except OSError:
+            pass
+        finally:
+            self.server.events.remove_client(connection)
+            self.close_connection = True
+    
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def create_server(host='127.0.0.1', port=8766, db_manager=None, training_data_path='training_data',
+                  verbose=False):
+    """Create the dashboard API server; call serve_forever() to run it"""
+    db_manager = db_manager or DatabaseManager()
+    training_stats = TrainingStatisticsCache(training_data_path)
+    training_stats.refresh_async()
+    
+    server = ThreadingHTTPServer((host, port), APIRequestHandler)
+    server.daemon_threads = True
+    server.api = DashboardAPI(db_manager, training_stats)
+    server.events = AttendanceEventHub(db_manager)
+    server.events.start()
+    server.verbose = verbose
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="EduFace dashboard API (localhost only by default)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--training-data', default='training_data')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    
+    configure_runtime('server')
+    server = create_server(args.host, args.port, training_data_path=args.training_data,
+                           verbose=args.verbose)
+    print(f"Dashboard API listening on http://{args.host}:{args.port}/api")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.events.stop()
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+EduFace AI - Headless recognition server
+Keeps one warm FaceRecognitionSystem and serves recognition over local HTTP
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2 # type: ignore
+import numpy as np
+
+from database.database_manager import DatabaseManager
+from database.attendance_journal import AttendanceJournal
+from face_recognition.batch_recognizer import BatchRecognizer
+from face_recognition.worker_pool import RecognitionWorkerPool
+from face_recognition.runtime_config import configure_runtime
+from monitoring.performance_metrics import metrics
+
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
+class RecognitionService:
+    """Recognizes uploaded images and records attendance"""
+    
+    def __init__(self, face_recognition, db_manager, batcher, pool=None, journal=None):
+        # With a worker pool, face_recognition and batcher are None and workers do the work
+        self.face_recognition = face_recognition
+        self.db_manager = db_manager
+        self.batcher = batcher
+        self.pool = pool
+        # With a journal, requests only append to it and never wait for an SQLite commit
+        self.journal = journal
+    
+    def status(self):
+        """Model state reported by /health"""
+        if self.pool is not None:
+            version = self.pool.model_version()
+            return {'classifier_loaded': version is not None, 'model_version': version,
+                    'workers': self.pool.num_workers}
+        return {'classifier_loaded': self.face_recognition.classifier is not None,
+                'model_version': self.face_recognition.model_version}
+    
+    def stop(self):
+        if self.pool is not None:
+            self.pool.stop()
+        else:
+            self.batcher.stop()
+        if self.journal is not None:
+            self.journal.close()
+    
+    def decode_image(self, image_bytes):
+        """Decode JPEG/PNG bytes into a BGR image"""
+        buffer = np.frombuffer(image_bytes, dtype=np.uint8)
+        with metrics.time('server.decode_image'):
+            return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    
+    def recognize(self, image_bytes, course_name=None, date=None, record=True):
+        """Recognize faces in an uploaded image, recording attendance when a course is given"""
+        # Enrolled students of the course are tried before the whole gallery
+        roster = self.db_manager.get_course_roster(course_name) if course_name else None
+        roster = frozenset(roster) if roster else None
+        if self.pool is not None:
+            recognized_faces = self.pool.recognize_encoded(image_bytes, roster=roster)
+        else:
+            image = self.decode_image(image_bytes)
+            if image is None:
+                raise ValueError("Could not decode image")
+            recognized_faces = self.batcher.recognize(image, roster=roster)
+        
+        date = date or datetime.now().strftime("%Y-%m-%d")
+        current_time = datetime.now().strftime("%H:%M:%S")
+        faces = []
+        records = []
+        for face_data in recognized_faces:
+            student_id = face_data['student_id']
+            student = self.db_manager.get_student(student_id)
+            if student and record and course_name:
+                records.append((student_id, course_name, date, current_time, 'present', None))
+            faces.append({
+                'student_id': student_id,
+                'name': student['name'] if student else None,
+                'confidence': float(face_data['confidence']),
+                'box': [int(v) for v in face_data['box']]
+            })
+        
+        if records:
+            if self.journal is not None:
+                self.journal.append(records)
+            else:
+                self.db_manager.record_attendance_batch(records)
+        
+        return {
+            'faces': faces,
+            'recorded': len(records),
+            'course_name': course_name,
+            'date': date,
+            'time': current_time
+        }
+
+class RecognitionRequestHandler(BaseHTTPRequestHandler):
+    """HTTP endpoints for the recognition service"""
+    
+    server_version = "EduFaceRecognition/1.0"
+    
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/health':
+            self.send_json(200, dict({'status': 'ok'}, **self.server.service.status()))
+        elif path == '/metrics':
+            body = metrics.to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_json(404, {'error': 'Not found'})
+    
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/recognize':
+            self.send_json(404, {'error': 'Not found'})
+            return
+        
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0 or length > MAX_IMAGE_BYTES:
+            self.send_json(400, {'error': 'Request body must be an image of at most 20 MB'})
+            return
+        
+        params = parse_qs(url.query)
+        course_name = params.get('course', [None])[0]
+        date = params.get('date', [None])[0]
+        record = params.get('record', ['1'])[0] not in ('0', 'false', 'no')
+        
+        try:
+            image_bytes = self.rfile.read(length)
+            with metrics.time('server.recognize_request'):
+                result = self.server.service.recognize(image_bytes, course_name, date, record)
+            self.send_json(200, result)
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+        except Exception as e:
+            self.send_json(500, {'error': f"Recognition failed: {str(e)}"})
+    
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def create_server(host='127.0.0.1', port=8765, max_batch_size=8, max_wait_ms=20,
+                  face_recognition=None, db_manager=None, verbose=False, workers=0, journal_path=None):
+    """Create a recognition server around one warm FaceRecognitionSystem or a worker pool"""
+    db_manager = db_manager or DatabaseManager()
+    journal = AttendanceJournal(db_manager, journal_path) if journal_path else None
+    if workers > 0:
+        # Workers are forked before any other thread of this process starts
+        pool = RecognitionWorkerPool(workers)
+        pool.start()
+        service = RecognitionService(None, db_manager, None, pool, journal)
+    else:
+        # Imported here so TensorFlow never loads in a parent that forks workers
+        from face_recognition.face_detector import FaceRecognitionSystem
+        face_recognition = face_recognition or FaceRecognitionSystem()
+        batcher = BatchRecognizer(face_recognition, max_batch_size, max_wait_ms)
+        batcher.start()
+        service = RecognitionService(face_recognition, db_manager, batcher, journal=journal)
+    
+    if journal is not None:
+        journal.start()
+    
+    # Bound after the workers start so they do not inherit the listening socket; a port in
+    # use must not leave the batcher, the workers or the journal running
+    try:
+        server = ThreadingHTTPServer((host, port), RecognitionRequestHandler)
+    except Exception:
+        service.stop()
+        raise
+    server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="EduFace headless recognition server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=20)
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Recognize in this many worker processes instead of one batching thread')
+    parser.add_argument('--journal', metavar='PATH',
+                        help='Append attendance to this journal and write it to the database in the background')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    
+    # Pool workers configure their own threads after the fork
+    if args.workers <= 0:
+        configure_runtime('server')
+    print("Loading recognition models...")
+    server = create_server(args.host, args.port, args.max_batch_size, args.max_wait_ms,
+                           verbose=args.verbose, workers=args.workers, journal_path=args.journal)
+    print(f"Recognition server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.stop()
+
+if __name__ == "__main__":
+    main()
@@ -90,7 +90,7 @@ export default function Dashboard() {
                   <div key={record.id} className="flex items-center justify-between p-4 bg-gray-50 rounded-lg">
                     <div className="flex items-center space-x-3">
                       <div className="flex-shrink-0">
-                        {record.status === 'present' ? (
+                        {record.status !== 'absent' ? (
                           <CheckCircle className="h-5 w-5 text-green-500" />
                         ) : (
                           <AlertTriangle className="h-5 w-5 text-red-500" />
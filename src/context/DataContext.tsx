@@ -1,4 +1,4 @@
-import React, { createContext, useContext, useState, useEffect } from 'react';
+import React, { createContext, useContext, useState, useEffect, useRef } from 'react';
 
 interface Student {
   id: string;
@@ -18,12 +18,28 @@ interface AttendanceRecord {
   course: string;
   date: string;
   time: string;
-  status: 'present' | 'absent';
+  status: 'present' | 'late' | 'absent';
 }
 
+interface StudentsPage {
+  students: Student[];
+  next: string | null;
+  total: number;
+}
+
+interface AttendancePage {
+  records: AttendanceRecord[];
+  next: number | null;
+}
+
+type AttendanceEvent =
+  | { type: 'attendance'; records: AttendanceRecord[] }
+  | { type: 'ready' | 'resync'; latestId: number };
+
 interface DataContextType {
   students: Student[];
   attendanceRecords: AttendanceRecord[];
+  dataSource: 'api' | 'local';
   addStudent: (student: Omit<Student, 'id'>) => void;
   updateStudent: (id: string, student: Partial<Student>) => void;
   addAttendanceRecord: (record: Omit<AttendanceRecord, 'id'>) => void;
@@ -31,79 +47,310 @@ interface DataContextType {
   exportAttendanceCSV: (course: string, date: string) => void;
 }
 
+// Served by server/api_server.py; the Vite dev server proxies /api to it
+const API_BASE = '/api';
+const PAGE_SIZE = 500;
+const RECONNECT_DELAY_MS = 3000;
+const PERSIST_DELAY_MS = 2000;
+
+// Offline mode keys, plus a separate cache of what the API served
+const STUDENTS_KEY = 'eduface_students';
+const ATTENDANCE_KEY = 'eduface_attendance';
+const API_STUDENTS_KEY = 'eduface_api_students';
+const API_STUDENTS_ETAG_KEY = 'eduface_api_students_etag';
+// Written by earlier versions as one array of the whole history; removed on load
+const LEGACY_API_ATTENDANCE_KEY = 'eduface_api_attendance';
+// API attendance is cached one day per key, so a new record rewrites only its own day
+const API_ATTENDANCE_DAYS_KEY = 'eduface_api_attendance_days';
+const API_ATTENDANCE_DAY_PREFIX = 'eduface_api_attendance:';
+// Only recent attendance is loaded and cached in API mode; older days stay on the server
+const ATTENDANCE_WINDOW_DAYS = 30;
+
+const demoStudents: Student[] = [
+  {
+    id: '1',
+    name: 'John Smith',
+    email: 'john.smith@university.edu',
+    cgpa: 3.8,
+    advisor: 'Dr. Johnson',
+    address: '123 Campus Drive',
+    trainingImages: 25,
+  },
+  {
+    id: '2',
+    name: 'Emma Wilson',
+    email: 'emma.wilson@university.edu',
+    cgpa: 3.9,
+    advisor: 'Dr. Brown',
+    address: '456 College Street',
+    trainingImages: 30,
+  },
+  {
+    id: '3',
+    name: 'Michael Chen',
+    email: 'michael.chen@university.edu',
+    cgpa: 3.7,
+    advisor: 'Dr. Davis',
+    address: '789 University Avenue',
+    trainingImages: 28,
+  },
+];
+
+function loadSaved<T>(key: string, fallback: T): T {
+  const saved = localStorage.getItem(key);
+  if (!saved) {
+    return fallback;
+  }
+  try {
+    return JSON.parse(saved) as T;
+  } catch {
+    return fallback;
+  }
+}
+
+// Returns null when the cached students are still current (HTTP 304)
+async function fetchStudents(): Promise<Student[] | null> {
+  const etag = localStorage.getItem(API_STUDENTS_ETAG_KEY);
+  const headers: HeadersInit = etag && localStorage.getItem(API_STUDENTS_KEY) ? { 'If-None-Match': etag } : {};
+  const first = await fetch(`${API_BASE}/students?limit=${PAGE_SIZE}`, { headers });
+  if (first.status === 304) {
+    return null;
+  }
+  if (!first.ok) {
+    throw new Error(`Students request failed: ${first.status}`);
+  }
+
+  let page: StudentsPage = await first.json();
+  const students = [...page.students];
+  while (page.next) {
+    const response = await fetch(`${API_BASE}/students?limit=${PAGE_SIZE}&after=${encodeURIComponent(page.next)}`);
+    if (!response.ok) {
+      throw new Error(`Students request failed: ${response.status}`);
+    }
+    page = await response.json();
+    students.push(...page.students);
+  }
+
+  const newEtag = first.headers.get('ETag');
+  if (newEtag) {
+    localStorage.setItem(API_STUDENTS_ETAG_KEY, newEtag);
+  }
+  return students;
+}
+
+function attendanceWindowStart(): string {
+  const start = new Date();
+  start.setDate(start.getDate() - ATTENDANCE_WINDOW_DAYS);
+  return start.toISOString().split('T')[0];
+}
+
+// Cached days inside the window, oldest record first; days that fell out of it are removed
+function loadCachedAttendance(windowStart: string): AttendanceRecord[] {
+  localStorage.removeItem(LEGACY_API_ATTENDANCE_KEY);
+  const days = loadSaved<string[]>(API_ATTENDANCE_DAYS_KEY, []);
+  const records: AttendanceRecord[] = [];
+  for (const day of days) {
+    if (day < windowStart) {
+      localStorage.removeItem(API_ATTENDANCE_DAY_PREFIX + day);
+    } else {
+      records.push(...loadSaved<AttendanceRecord[]>(API_ATTENDANCE_DAY_PREFIX + day, []));
+    }
+  }
+  localStorage.setItem(API_ATTENDANCE_DAYS_KEY, JSON.stringify(days.filter(day => day >= windowStart)));
+  return records.sort((a, b) => Number(a.id) - Number(b.id));
+}
+
+async function fetchAttendanceSince(afterId: number, windowStart: string): Promise<AttendanceRecord[]> {
+  const records: AttendanceRecord[] = [];
+  let after: number | null = afterId;
+  while (after !== null) {
+    const response = await fetch(`${API_BASE}/attendance?limit=${PAGE_SIZE}&after=${after}&from=${windowStart}`);
+    if (!response.ok) {
+      throw new Error(`Attendance request failed: ${response.status}`);
+    }
+    const page: AttendancePage = await response.json();
+    records.push(...page.records);
+    after = page.next;
+  }
+  return records;
+}
+
 const DataContext = createContext<DataContextType | undefined>(undefined);
 
 export function DataProvider({ children }: { children: React.ReactNode }) {
   const [students, setStudents] = useState<Student[]>([]);
   const [attendanceRecords, setAttendanceRecords] = useState<AttendanceRecord[]>([]);
+  const [dataSource, setDataSource] = useState<'api' | 'local'>('local');
+  const [loaded, setLoaded] = useState(false);
+  // Highest attendance id received from the API; deltas only ever move it forward
+  const latestIdRef = useRef(0);
+  // Days with records not yet written to the API attendance cache
+  const dirtyDaysRef = useRef(new Set<string>());
+
+  const appendRecords = (incoming: AttendanceRecord[]) => {
+    const fresh = incoming.filter(record => Number(record.id) > latestIdRef.current);
+    if (fresh.length === 0) {
+      return;
+    }
+    latestIdRef.current = Number(fresh[fresh.length - 1].id);
+    fresh.forEach(record => dirtyDaysRef.current.add(record.date));
+    setAttendanceRecords(previous => [...previous, ...fresh]);
+  };
 
   useEffect(() => {
-    // Load initial demo data
-    const demoStudents: Student[] = [
-      {
-        id: '1',
-        name: 'John Smith',
-        email: 'john.smith@university.edu',
-        cgpa: 3.8,
-        advisor: 'Dr. Johnson',
-        address: '123 Campus Drive',
-        trainingImages: 25,
-      },
-      {
-        id: '2',
-        name: 'Emma Wilson',
-        email: 'emma.wilson@university.edu',
-        cgpa: 3.9,
-        advisor: 'Dr. Brown',
-        address: '456 College Street',
-        trainingImages: 30,
-      },
-      {
-        id: '3',
-        name: 'Michael Chen',
-        email: 'michael.chen@university.edu',
-        cgpa: 3.7,
-        advisor: 'Dr. Davis',
-        address: '789 University Avenue',
-        trainingImages: 28,
-      },
-    ];
-
-    const savedStudents = localStorage.getItem('eduface_students');
-    const savedAttendance = localStorage.getItem('eduface_attendance');
-
-    if (savedStudents) {
-      setStudents(JSON.parse(savedStudents));
-    } else {
-      setStudents(demoStudents);
-      localStorage.setItem('eduface_students', JSON.stringify(demoStudents));
+    let socket: WebSocket | null = null;
+    let reconnectTimer: number | undefined;
+    let cancelled = false;
+
+    const connect = () => {
+      const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+      socket = new WebSocket(`${protocol}://${window.location.host}${API_BASE}/events?after=${latestIdRef.current}`);
+      socket.onmessage = (message) => {
+        const event: AttendanceEvent = JSON.parse(message.data);
+        if (event.type === 'attendance') {
+          appendRecords(event.records);
+        } else if (event.type === 'resync') {
+          // Too far behind for the push backlog; page through the gap instead
+          fetchAttendanceSince(latestIdRef.current, attendanceWindowStart()).then(appendRecords).catch(console.error);
+        }
+      };
+      socket.onclose = () => {
+        if (!cancelled) {
+          reconnectTimer = window.setTimeout(connect, RECONNECT_DELAY_MS);
+        }
+      };
+    };
+
+    const load = async () => {
+      try {
+        const fetchedStudents = await fetchStudents();
+        const windowStart = attendanceWindowStart();
+        const cachedRecords = loadCachedAttendance(windowStart);
+        latestIdRef.current = cachedRecords.length ? Number(cachedRecords[cachedRecords.length - 1].id) : 0;
+        const newRecords = await fetchAttendanceSince(latestIdRef.current, windowStart);
+        if (cancelled) {
+          return;
+        }
+
+        setStudents(fetchedStudents ?? loadSaved<Student[]>(API_STUDENTS_KEY, []));
+        setAttendanceRecords(cachedRecords);
+        appendRecords(newRecords);
+        setDataSource('api');
+        setLoaded(true);
+        connect();
+      } catch {
+        // No local API server running: keep working from browser storage
+        if (cancelled) {
+          return;
+        }
+        setStudents(loadSaved<Student[]>(STUDENTS_KEY, demoStudents));
+        setAttendanceRecords(loadSaved<AttendanceRecord[]>(ATTENDANCE_KEY, []));
+        setDataSource('local');
+        setLoaded(true);
+      }
+    };
+
+    load();
+    return () => {
+      cancelled = true;
+      window.clearTimeout(reconnectTimer);
+      socket?.close();
+    };
+  }, []);
+
+  // Persist at most once per PERSIST_DELAY_MS instead of on every change
+  useEffect(() => {
+    if (!loaded) {
+      return;
     }
+    const timer = window.setTimeout(() => {
+      localStorage.setItem(dataSource === 'api' ? API_STUDENTS_KEY : STUDENTS_KEY, JSON.stringify(students));
+    }, PERSIST_DELAY_MS);
+    return () => window.clearTimeout(timer);
+  }, [students, dataSource, loaded]);
 
-    if (savedAttendance) {
-      setAttendanceRecords(JSON.parse(savedAttendance));
+  useEffect(() => {
+    if (!loaded) {
+      return;
     }
-  }, []);
+    const timer = window.setTimeout(() => {
+      if (dataSource === 'local') {
+        localStorage.setItem(ATTENDANCE_KEY, JSON.stringify(attendanceRecords));
+        return;
+      }
+      const dirtyDays = [...dirtyDaysRef.current];
+      if (dirtyDays.length === 0) {
+        return;
+      }
+      dirtyDaysRef.current.clear();
+      for (const day of dirtyDays) {
+        localStorage.setItem(API_ATTENDANCE_DAY_PREFIX + day,
+          JSON.stringify(attendanceRecords.filter(record => record.date === day)));
+      }
+      const days = new Set([...loadSaved<string[]>(API_ATTENDANCE_DAYS_KEY, []), ...dirtyDays]);
+      localStorage.setItem(API_ATTENDANCE_DAYS_KEY, JSON.stringify([...days].sort()));
+    }, PERSIST_DELAY_MS);
+    return () => window.clearTimeout(timer);
+  }, [attendanceRecords, dataSource, loaded]);
 
   const addStudent = (student: Omit<Student, 'id'>) => {
     const newStudent = { ...student, id: Date.now().toString() };
-    const updatedStudents = [...students, newStudent];
-    setStudents(updatedStudents);
-    localStorage.setItem('eduface_students', JSON.stringify(updatedStudents));
+    if (dataSource === 'local') {
+      setStudents(previous => [...previous, newStudent]);
+      return;
+    }
+
+    fetch(`${API_BASE}/students`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ ...student, studentId: newStudent.id }),
+    })
+      .then(response => (response.ok ? response.json() : Promise.reject(new Error(`HTTP ${response.status}`))))
+      .then((saved: Student) => setStudents(previous => [...previous, { ...saved, trainingImages: student.trainingImages }]))
+      .catch(error => console.error('Failed to add student:', error));
   };
 
   const updateStudent = (id: string, updates: Partial<Student>) => {
-    const updatedStudents = students.map(student =>
-      student.id === id ? { ...student, ...updates } : student
+    if (dataSource === 'local') {
+      setStudents(previous => previous.map(student =>
+        student.id === id ? { ...student, ...updates } : student
+      ));
+      return;
+    }
+
+    // The server counts training images from its training folders, so only stored fields are sent
+    const { name, email, cgpa, advisor, address } = updates;
+    const fields = Object.fromEntries(
+      Object.entries({ name, email, cgpa, advisor, address }).filter(([, value]) => value !== undefined)
     );
-    setStudents(updatedStudents);
-    localStorage.setItem('eduface_students', JSON.stringify(updatedStudents));
+    if (Object.keys(fields).length === 0) {
+      return;
+    }
+
+    fetch(`${API_BASE}/students/${encodeURIComponent(id)}`, {
+      method: 'PATCH',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(fields),
+    })
+      .then(response => (response.ok ? response.json() : Promise.reject(new Error(`HTTP ${response.status}`))))
+      .then((saved: Student) => setStudents(previous => previous.map(student =>
+        student.id === saved.id ? saved : student
+      )))
+      .catch(error => console.error('Failed to update student:', error));
   };
 
   const addAttendanceRecord = (record: Omit<AttendanceRecord, 'id'>) => {
-    const newRecord = { ...record, id: Date.now().toString() };
-    const updatedRecords = [...attendanceRecords, newRecord];
-    setAttendanceRecords(updatedRecords);
-    localStorage.setItem('eduface_attendance', JSON.stringify(updatedRecords));
+    if (dataSource === 'local') {
+      setAttendanceRecords(previous => [...previous, { ...record, id: Date.now().toString() }]);
+      return;
+    }
+
+    // The stored record comes back through the WebSocket with its database id
+    fetch(`${API_BASE}/attendance`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(record),
+    }).catch(error => console.error('Failed to record attendance:', error));
   };
 
   const getAttendanceByClass = (course: string, date: string) => {
@@ -138,6 +385,7 @@ export function DataProvider({ children }: { children: React.ReactNode }) {
     <DataContext.Provider value={{
       students,
       attendanceRecords,
+      dataSource,
       addStudent,
       updateStudent,
       addAttendanceRecord,
@@ -0,0 +1,149 @@
+import os
+import json
+import threading
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+CACHE_FILENAME = '.statistics_cache.json'
+
+class TrainingStatisticsCache:
+    """Cache of per-student training image counts, validated by folder mtime"""
+    
+    def __init__(self, training_data_path="training_data"):
+        self.training_data_path = training_data_path
+        self.cache_file = os.path.join(training_data_path, CACHE_FILENAME)
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._students = {}
+        self.load_cache_file()
+    
+    def load_cache_file(self):
+        """Load the last persisted statistics so the first read is instant"""
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                with self._lock:
+                    self._students = data.get('students', {})
+        except Exception as e:
+            print(f"Error loading statistics cache: {e}")
+    
+    def save_cache_file(self):
+        """Persist the current statistics next to the training data"""
+        try:
+            with self._lock:
+                data = {'students': dict(self._students)}
+            temp_file = self.cache_file + '.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp_file, self.cache_file)
+        except Exception as e:
+            print(f"Error saving statistics cache: {e}")
+    
+    def get_statistics(self):
+        """Return cached statistics without touching the filesystem"""
+        stats = {
+            'total_students': 0,
+            'total_images': 0,
+            'students_data': {}
+        }
+        
+        with self._lock:
+            for student_id in sorted(self._students):
+                entry = self._students[student_id]
+                stats['total_images'] += entry['image_count']
+                stats['students_data'][student_id] = {
+                    'image_count': entry['image_count'],
+                    'folder_path': os.path.join(self.training_data_path, student_id)
+                }
+            stats['total_students'] = len(self._students)
+        
+        return stats
+    
+    def scan_student_folder(self, student_id, mtime=None):
+        """Count the images in one student folder"""
+        student_folder = os.path.join(self.training_data_path, student_id)
+        if mtime is None:
+            mtime = os.stat(student_folder).st_mtime
+        
+        image_count = 0
+        with os.scandir(student_folder) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    image_count += 1
+        
+        return {'image_count': image_count, 'mtime': mtime}
+    
+    def update_student(self, student_id):
+        """Rescan a single student after images were captured or added"""
+        try:
+            entry = self.scan_student_folder(student_id)
+        except FileNotFoundError:
+            self.remove_student(student_id)
+            return
+        with self._lock:
+            self._students[student_id] = entry
+        self.save_cache_file()
+    
+    def remove_student(self, student_id):
+        """Drop a student whose training data was deleted"""
+        with self._lock:
+            removed = self._students.pop(student_id, None)
+        if removed is not None:
+            self.save_cache_file()
+    
+    def refresh(self):
+        """Revalidate the cache, rescanning only folders whose mtime changed"""
+        if not self._refresh_lock.acquire(blocking=False):
+            # Another refresh is already running; wait for it and reuse its result
+            with self._refresh_lock:
+                return self.get_statistics()
+        
+        try:
+            if not os.path.exists(self.training_data_path):
+                with self._lock:
+                    self._students = {}
+                return self.get_statistics()
+            
+            with self._lock:
+                previous = dict(self._students)
+            
+            students = {}
+            with os.scandir(self.training_data_path) as entries:
+                for entry in entries:
+                    if not entry.is_dir():
+                        continue
+                    try:
+                        mtime = entry.stat().st_mtime
+                        cached = previous.get(entry.name)
+                        # Adding or removing a file updates the folder mtime
+                        if cached is not None and cached['mtime'] == mtime:
+                            students[entry.name] = cached
+                        else:
+                            students[entry.name] = self.scan_student_folder(entry.name, mtime)
+                    except FileNotFoundError:
+                        continue
+            
+            with self._lock:
+                changed = students != self._students
+                self._students = students
+            
+            if changed:
+                self.save_cache_file()
+            
+            return self.get_statistics()
+        except Exception as e:
+            print(f"Error refreshing training statistics: {e}")
+            return self.get_statistics()
+        finally:
+            self._refresh_lock.release()
+    
+    def refresh_async(self, callback=None):
+        """Refresh in a background thread and pass the new statistics to callback"""
+        def refresh_thread():
+            stats = self.refresh()
+            if callback:
+                callback(stats)
+        
+        thread = threading.Thread(target=refresh_thread, daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+EduFace AI - Threshold tuning
+Cross-validates the detection and recognition thresholds on the training set
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2 # type: ignore
+import numpy as np
+
+from face_recognition.face_detector import FaceRecognitionSystem, THRESHOLDS_PATH
+from face_recognition.image_decoder import decode_image, TRAINING_FACE_FRACTION, TRAINING_FACE_SIZE
+from face_recognition.recognizer_format import LinearRecognizer
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+EMBEDDING_CACHE_PATH = 'models/embedding_cache.npz'
+
+class EmbeddingCache:
+    """Training-set embeddings and detection confidences, reused while the images are unchanged"""
+    
+    def __init__(self, face_recognition, cache_path=EMBEDDING_CACHE_PATH, batch_size=64):
+        self.face_recognition = face_recognition
+        self.cache_path = cache_path
+        self.batch_size = batch_size
+        self.fingerprint = face_recognition.encoder_fingerprint()
+    
+    def load(self):
+        """Cached entries keyed by image path, or {} if the cache belongs to other encoder weights"""
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            data = np.load(self.cache_path, allow_pickle=False)
+            if str(data['fingerprint']) != self.fingerprint:
+                print("Encoder weights changed, re-embedding the training set")
+                return {}
+            return {
+                path: (float(mtime), int(size), label, float(det), float(extra),
+                       encoding if has_encoding else None)
+                for path, mtime, size, label, det, extra, encoding, has_encoding in zip(
+                    data['paths'].tolist(), data['mtimes'], data['sizes'], data['labels'].tolist(),
+                    data['detection_confidence'], data['extra_confidence'],
+                    data['encodings'], data['has_encoding'])
+            }
+        except Exception as e:
+            print(f"Error loading embedding cache: {e}")
+            return {}
+    
+    def save(self, entries):
+        """Write all entries to the .npz cache"""
+        paths = sorted(entries)
+        dimension = next((len(entry[5]) for entry in entries.values() if entry[5] is not None), 128)
+        encodings = np.zeros((len(paths), dimension), dtype=np.float32)
+        for i, path in enumerate(paths):
+            if entries[path][5] is not None:
+                encodings[i] = entries[path][5]
+        
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        temp_path = self.cache_path + '.tmp.npz'
+        np.savez(temp_path,
+                 fingerprint=np.asarray(self.fingerprint),
+                 paths=np.asarray(paths, dtype=str),
+                 mtimes=np.asarray([entries[p][0] for p in paths], dtype=np.float64),
+                 sizes=np.asarray([entries[p][1] for p in paths], dtype=np.int64),
+                 labels=np.asarray([entries[p][2] for p in paths], dtype=str),
+                 detection_confidence=np.asarray([entries[p][3] for p in paths], dtype=np.float32),
+                 extra_confidence=np.asarray([entries[p][4] for p in paths], dtype=np.float32),
+                 encodings=encodings,
+                 has_encoding=np.asarray([entries[p][5] is not None for p in paths], dtype=bool))
+        os.replace(temp_path, self.cache_path)
+    
+    def detect_best_face(self, image):
+        """Most confident face crop plus its confidence and the best confidence among the others"""
+        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        # Raw MTCNN output so every detection threshold can be evaluated later
+        results = sorted(self.face_recognition.detector.detect_faces(rgb_image),
+                         key=lambda result: result['confidence'], reverse=True)
+        if not results:
+            return None, 0.0, 0.0
+        
+        x, y, w, h = results[0]['box']
+        x, y = max(0, x), max(0, y)
+        face = rgb_image[y:y+h, x:x+w]
+        extra = results[1]['confidence'] if len(results) > 1 else 0.0
+        return (face if face.size else None), results[0]['confidence'], extra
+    
+    def build(self, training_data_path):
+        """Embed new or changed training images and return the full cache contents"""
+        cached = self.load()
+        entries = {}
+        pending = []
+        stats = {'cached': 0, 'embedded': 0, 'embedding_seconds': 0.0}
+        
+        for student_id in sorted(os.listdir(training_data_path)):
+            student_folder = os.path.join(training_data_path, student_id)
+            if not os.path.isdir(student_folder):
+                continue
+            with os.scandir(student_folder) as it:
+                for entry in it:
+                    if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    info = entry.stat()
+                    previous = cached.get(entry.path)
+                    if (previous is not None and previous[0] == info.st_mtime and
+                            previous[1] == info.st_size and previous[2] == student_id):
+                        entries[entry.path] = previous
+                        stats['cached'] += 1
+                    else:
+                        pending.append((entry.path, info.st_mtime, info.st_size, student_id))
+        
+        start = time.perf_counter()
+        for batch_start in range(0, len(pending), self.batch_size):
+            batch = pending[batch_start:batch_start + self.batch_size]
+            faces = []
+            for path, mtime, size, student_id in batch:
+                # Decoded like training images so the tuned thresholds match the trained encodings
+                image, scale = decode_image(path, TRAINING_FACE_FRACTION, TRAINING_FACE_SIZE)
+                face, confidence, extra = self.detect_best_face(image) if image is not None else (None, 0.0, 0.0)
+                if face is None and scale > 1:
+                    image, _ = decode_image(path)
+                    face, confidence, extra = self.detect_best_face(image) if image is not None else (None, 0.0, 0.0)
+                entries[path] = (mtime, size, student_id, confidence, extra, None)
+                if face is not None:
+                    faces.append((path, face))
+            
+            encodings = self.face_recognition.extract_face_encodings([face for _, face in faces])
+            for (path, _), encoding in zip(faces, encodings):
+                if encoding is not None:
+                    entries[path] = entries[path][:5] + (np.asarray(encoding, dtype=np.float32),)
+            stats['embedded'] += len(batch)
+            print(f"Embedded {stats['embedded']}/{len(pending)} new or changed images")
+        stats['embedding_seconds'] = time.perf_counter() - start
+        
+        if pending or len(entries) != len(cached):
+            self.save(entries)
+        return entries, stats
+
+def assign_folds(labels, folds, seed):
+    """Stratified sample folds, plus a fold per identity used to simulate unenrolled visitors"""
+    rng = np.random.default_rng(seed)
+    sample_folds = np.zeros(len(labels), dtype=int)
+    classes = np.unique(labels)
+    for label in classes:
+        members = np.flatnonzero(labels == label)
+        rng.shuffle(members)
+        sample_folds[members] = np.arange(len(members)) % folds
+    
+    shuffled = rng.permutation(classes)
+    class_folds = {label: i % folds for i, label in enumerate(shuffled)}
+    return sample_folds, np.asarray([class_folds[label] for label in labels])
+
+def fit_recognizer(encodings, labels):
+    """Fit the same recognizer that FaceRecognitionSystem.train_classifier fits"""
+    return LinearRecognizer.fit(encodings, labels.tolist())
+
+def score_probes(recognizer, encodings):
+    """Predicted labels and open-set confidences, computed for all probes at once"""
+    predicted = recognizer.predict(encodings)
+    return np.asarray(predicted), recognizer.open_set.verify(encodings, predicted)
+
+def rates_at(scores, grid):
+    """Fraction of scores at or above each threshold, via one sort and a binary search"""
+    if len(scores) == 0:
+        return np.zeros(len(grid))
+    ordered = np.sort(scores)
+    return (len(ordered) - np.searchsorted(ordered, grid, side='left')) / len(ordered)
+
+def evaluate_recognition(encodings, labels, folds, grid, seed):
+    """k-fold evaluation with one identity group held out per fold as strangers"""
+    sample_folds, class_folds = assign_folds(labels, folds, seed)
+    genuine_scores = []     # correctly identified enrolled students
+    impostor_scores = []    # strangers and misidentified students
+    known_probes = 0
+    fit_seconds = 0.0
+    score_seconds = 0.0
+    scored = 0
+    
+    for fold in range(folds):
+        stranger = class_folds == fold
+        train = ~stranger & (sample_folds != fold)
+        if len(np.unique(labels[train])) == 0:
+            continue
+        probes = (sample_folds == fold) | stranger
+        
+        start = time.perf_counter()
+        recognizer = fit_recognizer(encodings[train], labels[train])
+        fit_seconds += time.perf_counter() - start
+        
+        start = time.perf_counter()
+        predicted, confidences = score_probes(recognizer, encodings[probes])
+        score_seconds += time.perf_counter() - start
+        scored += int(probes.sum())
+        
+        correct = (predicted == labels[probes]) & ~stranger[probes]
+        genuine_scores.append(confidences[correct])
+        impostor_scores.append(confidences[~correct])
+        known_probes += int((~stranger[probes]).sum())
+    
+    genuine = np.concatenate(genuine_scores) if genuine_scores else np.zeros(0)
+    impostor = np.concatenate(impostor_scores) if impostor_scores else np.zeros(0)
+    # TAR counts against every enrolled probe, so misidentifications lower it too
+    tar = rates_at(genuine, grid) * (len(genuine) / known_probes if known_probes else 0.0)
+    far = rates_at(impostor, grid)
+    return {
+        'tar': tar,
+        'far': far,
+        'genuine_trials': len(genuine),
+        'impostor_trials': len(impostor),
+        'known_probes': known_probes,
+        'fit_seconds': fit_seconds,
+        'probes_per_second': scored / score_seconds if score_seconds > 0 else None
+    }
+
+def evaluate_detection(detection_confidence, extra_confidence, grid):
+    """Detection recall and extra detections per image at each threshold"""
+    # Every training image shows one student, so a second confident face is a false detection
+    return {
+        'recall': rates_at(detection_confidence, grid),
+        'false_detections': rates_at(extra_confidence, grid)
+    }
+
+def recommend(grid, recognition, detection, target_far, min_detection_recall):
+    """Pick operating points from the evaluated curves"""
+    tar, far = recognition['tar'], recognition['far']
+    frr = 1.0 - tar
+    eer_index = int(np.argmin(np.abs(far - frr)))
+    
+    # Lowest threshold meeting the FAR target accepts the most genuine faces
+    meeting = np.flatnonzero(far <= target_far)
+    recognition_index = int(meeting[0]) if len(meeting) else len(grid) - 1
+    
+    # Highest detection threshold that still finds the required share of faces
+    detecting = np.flatnonzero(detection['recall'] >= min_detection_recall)
+    detection_index = int(detecting[-1]) if len(detecting) else 0
+    
+    return {
+        'recognition_threshold': float(grid[recognition_index]),
+        'recognition_tar': float(tar[recognition_index]),
+        'recognition_far': float(far[recognition_index]),
+        'eer': float((far[eer_index] + frr[eer_index]) / 2),
+        'eer_threshold': float(grid[eer_index]),
+        'detection_threshold': float(grid[detection_index]),
+        'detection_recall': float(detection['recall'][detection_index]),
+        'false_detections_per_image': float(detection['false_detections'][detection_index])
+    }
+
+def write_curves(output_dir, grid, recognition, detection):
+    """Write ROC/DET points as CSV and, when matplotlib is available, as PNG plots"""
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'recognition_curve.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['threshold', 'tar', 'far', 'frr'])
+        for row in zip(grid, recognition['tar'], recognition['far'], 1.0 - recognition['tar']):
+            writer.writerow([f"{value:.4f}" for value in row])
+    with open(os.path.join(output_dir, 'detection_curve.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['threshold', 'recall', 'false_detections_per_image'])
+        for row in zip(grid, detection['recall'], detection['false_detections']):
+            writer.writerow([f"{value:.4f}" for value in row])
+    
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib not available, skipping plots")
+        return
+    
+    fig, (roc_axis, det_axis) = plt.subplots(1, 2, figsize=(11, 4.5))
+    roc_axis.plot(recognition['far'], recognition['tar'], marker='.')
+    roc_axis.set_xlabel('False accept rate')
+    roc_axis.set_ylabel('True accept rate')
+    roc_axis.set_title('ROC')
+    roc_axis.grid(True)
+    
+    # DET curves are read on log axes; clip zeros so they stay plottable
+    det_axis.loglog(np.clip(recognition['far'], 1e-4, 1), np.clip(1.0 - recognition['tar'], 1e-4, 1), marker='.')
+    det_axis.set_xlabel('False accept rate')
+    det_axis.set_ylabel('False reject rate')
+    det_axis.set_title('DET')
+    det_axis.grid(True, which='both')
+    fig.tight_layout()
+    fig.savefig(os.path.join(output_dir, 'recognition_roc_det.png'), dpi=120)
+    plt.close(fig)
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-validate detection and recognition thresholds")
+    parser.add_argument('--training-data', default='training_data')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--target-far', type=float, default=0.01,
+                        help="Highest acceptable false accept rate (default: 0.01)")
+    parser.add_argument('--min-detection-recall', type=float, default=0.98)
+    parser.add_argument('--output-dir', default='threshold_tuning')
+    parser.add_argument('--apply', action='store_true',
+                        help=f"Write the recommended thresholds to {THRESHOLDS_PATH}")
+    args = parser.parse_args()
+    
+    face_recognition = FaceRecognitionSystem()
+    entries, cache_stats = EmbeddingCache(face_recognition).build(args.training_data)
+    print(f"{cache_stats['cached']} images from cache, {cache_stats['embedded']} embedded "
+          f"in {cache_stats['embedding_seconds']:.1f} s")
+    
+    detected = [entry for entry in entries.values() if entry[5] is not None]
+    labels = np.asarray([entry[2] for entry in detected])
+    if len(np.unique(labels)) < 2:
+        print("At least two students with detectable faces are needed")
+        sys.exit(1)
+    encodings = np.stack([entry[5] for entry in detected])
+    detection_confidence = np.asarray([entry[3] for entry in entries.values()], dtype=np.float32)
+    extra_confidence = np.asarray([entry[4] for entry in entries.values()], dtype=np.float32)
+    
+    folds = max(2, min(args.folds, len(np.unique(labels))))
+    grid = np.round(np.linspace(0.5, 0.99, 50), 2)
+    
+    start = time.perf_counter()
+    recognition = evaluate_recognition(encodings, labels, folds, grid, args.seed)
+    detection = evaluate_detection(detection_confidence, extra_confidence, grid)
+    evaluation_seconds = time.perf_counter() - start
+    recommended = recommend(grid, recognition, detection, args.target_far, args.min_detection_recall)
+    
+    write_curves(args.output_dir, grid, recognition, detection)
+    summary = {
+        'images': len(entries),
+        'faces': len(detected),
+        'students': int(len(np.unique(labels))),
+        'folds': folds,
+        'genuine_trials': recognition['genuine_trials'],
+        'impostor_trials': recognition['impostor_trials'],
+        'embedding_seconds': cache_stats['embedding_seconds'],
+        'evaluation_seconds': evaluation_seconds,
+        'probes_per_second': recognition['probes_per_second'],
+        'current': {
+            'detection_threshold': face_recognition.detection_threshold,
+            'recognition_threshold': face_recognition.recognition_threshold
+        },
+        'recommended': recommended
+    }
+    with open(os.path.join(args.output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    
+    print(f"\n{summary['faces']} faces of {summary['students']} students, {folds}-fold, "
+          f"evaluated in {evaluation_seconds:.2f} s")
+    if recognition['probes_per_second']:
+        print(f"Scoring throughput: {recognition['probes_per_second']:.0f} faces/s")
+    print(f"Recognition threshold {recommended['recognition_threshold']:.2f}: "
+          f"TAR {recommended['recognition_tar']:.1%}, FAR {recommended['recognition_far']:.2%} "
+          f"(EER {recommended['eer']:.2%} at {recommended['eer_threshold']:.2f})")
+    print(f"Detection threshold {recommended['detection_threshold']:.2f}: "
+          f"recall {recommended['detection_recall']:.1%}, "
+          f"{recommended['false_detections_per_image']:.3f} extra faces per image")
+    print(f"Curves written to {os.path.abspath(args.output_dir)}")
+    
+    if args.apply:
+        os.makedirs(os.path.dirname(THRESHOLDS_PATH), exist_ok=True)
+        with open(THRESHOLDS_PATH, 'w', encoding='utf-8') as f:
+            json.dump({
+                'detection_threshold': recommended['detection_threshold'],
+                'recognition_threshold': recommended['recognition_threshold']
+            }, f, indent=2)
+        print(f"Thresholds written to {THRESHOLDS_PATH}")
+
+if __name__ == "__main__":
+    main()
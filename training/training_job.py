@@ -0,0 +1,265 @@
+import os
+import json
+import queue
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from monitoring.profiler import profiler
+
+JOB_STATE_PATH = 'models/training_job.json'
+CHECKPOINT_DIR = 'models/training_checkpoints'
+
+class TrainingCancelled(Exception):
+    """Raised inside a training run when its job is cancelled"""
+
+class EncodingCheckpoints:
+    """Per-student face encodings saved during training, valid while the folder and encoder are unchanged"""
+    
+    def __init__(self, checkpoint_dir, fingerprint):
+        self.checkpoint_dir = checkpoint_dir
+        self.fingerprint = fingerprint
+        self.index_path = os.path.join(checkpoint_dir, 'index.json')
+        self._lock = threading.Lock()
+        self._students = {}
+        self.load_index()
+    
+    def load_index(self):
+        try:
+            if os.path.exists(self.index_path):
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                # Encodings from other encoder weights cannot be mixed with new ones
+                if data.get('fingerprint') == self.fingerprint:
+                    self._students = data.get('students', {})
+        except Exception as e:
+            print(f"Error loading training checkpoints: {e}")
+    
+    def save_index(self):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': self.fingerprint, 'students': self._students}, f)
+        os.replace(temp_path, self.index_path)
+    
+    def encodings_path(self, student_id):
+        return os.path.join(self.checkpoint_dir, f"{student_id}.npy")
+    
+    def load(self, student_id, student_folder):
+        """Saved encodings for a student, or None if missing or out of date"""
+        with self._lock:
+            entry = self._students.get(student_id)
+        if entry is None or entry['mtime'] != os.stat(student_folder).st_mtime:
+            return None
+        try:
+            return list(np.load(self.encodings_path(student_id), allow_pickle=False))
+        except (OSError, ValueError):
+            return None
+    
+    def save(self, student_id, student_folder, encodings):
+        """Save one student's encodings and mark them valid for the folder's current mtime"""
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        path = self.encodings_path(student_id)
+        temp_path = path + '.tmp.npy'
+        np.save(temp_path, np.asarray(encodings, dtype=np.float32))
+        os.replace(temp_path, path)
+        with self._lock:
+            self._students[student_id] = {'mtime': os.stat(student_folder).st_mtime,
+                                          'count': len(encodings)}
+            self.save_index()
+    
+    def prune(self, student_ids):
+        """Drop checkpoints of students that no longer have training data"""
+        with self._lock:
+            for student_id in set(self._students) - set(student_ids):
+                del self._students[student_id]
+                try:
+                    os.remove(self.encodings_path(student_id))
+                except OSError:
+                    pass
+            self.save_index()
+
+class TrainingJob:
+    """One queued or running training run with pause and cancel controls"""
+    
+    def __init__(self, job_id, progress_callback=None, completion_callback=None, resumed=False):
+        self.job_id = job_id
+        self.progress_callback = progress_callback
+        self.completion_callback = completion_callback
+        self.resumed = resumed
+        self.status = 'queued'
+        self.message = ''
+        self.progress = 0.0
+        self.completed_students = []
+        self._running = threading.Event()
+        self._running.set()
+        self._cancelled = threading.Event()
+        self.on_change = None
+    
+    @property
+    def is_paused(self):
+        return not self._running.is_set()
+    
+    @property
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+    
+    def pause(self):
+        """Pause before the next student"""
+        self._running.clear()
+        if self.status == 'running':
+            self.set_status('paused')
+    
+    def resume(self):
+        self._running.set()
+        if self.status == 'paused':
+            self.set_status('running')
+    
+    def cancel(self):
+        """Stop before the next student; finished students stay checkpointed"""
+        self._cancelled.set()
+        self._running.set()
+    
+    def set_status(self, status, message=None):
+        self.status = status
+        if message is not None:
+            self.message = message
+        if self.on_change:
+            self.on_change(self)
+    
+    def report(self, message, percentage):
+        """Progress hook passed to TrainingManager.train_system"""
+        self.message = message
+        self.progress = percentage
+        if self.progress_callback:
+            self.progress_callback(message, percentage)
+    
+    def checkpoint(self, student_id=None):
+        """Called between students: blocks while paused and raises once cancelled"""
+        if student_id is not None:
+            self.completed_students.append(student_id)
+            if self.on_change:
+                self.on_change(self)
+        self._running.wait()
+        if self._cancelled.is_set():
+            raise TrainingCancelled()
+
+class TrainingJobManager:
+    """Runs training jobs one at a time on a background worker; later requests wait in a queue"""
+    
+    def __init__(self, training_manager, state_path=JOB_STATE_PATH, checkpoint_dir=CHECKPOINT_DIR):
+        self.training_manager = training_manager
+        self.state_path = state_path
+        self.checkpoint_dir = checkpoint_dir
+        self.current_job = None
+        self._queue = queue.Queue()
+        self._pending = []
+        self._lock = threading.Lock()
+        self._worker = None
+        self._next_id = 1
+    
+    def submit(self, progress_callback=None, completion_callback=None, resumed=False):
+        """Queue a training job and return it"""
+        with self._lock:
+            job = TrainingJob(f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self._next_id}",
+                              progress_callback, completion_callback, resumed)
+            self._next_id += 1
+            job.on_change = self.save_state
+            self._pending.append(job)
+            self._queue.put(job)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self.worker, daemon=True)
+                self._worker.start()
+        return job
+    
+    def queue_position(self, job):
+        """Number of jobs that run before this one"""
+        with self._lock:
+            ahead = self._pending.index(job) if job in self._pending else 0
+            running = 1 if self.current_job is not None and self.current_job is not job else 0
+            return ahead + running
+    
+    def checkpoints(self):
+        return EncodingCheckpoints(self.checkpoint_dir,
+                                   self.training_manager.face_recognition.encoder_fingerprint())
+    
+    def worker(self):
+        while True:
+            try:
+                job = self._queue.get(timeout=1)
+            except queue.Empty:
+                with self._lock:
+                    if self._queue.empty():
+                        self._worker = None
+                        return
+                continue
+            
+            with self._lock:
+                self._pending.remove(job)
+                if not job.is_cancelled:
+                    self.current_job = job
+            if job.is_cancelled:
+                job.status = 'cancelled'
+                if job.completion_callback:
+                    job.completion_callback(False, "Training cancelled before it started")
+                continue
+            
+            job.set_status('paused' if job.is_paused else 'running')
+            try:
+                with profiler.profile('training'):
+                    success, message = self.training_manager.train_system(
+                        job.report, job=job, checkpoints=self.checkpoints())
+                if job.is_cancelled:
+                    status = 'cancelled'
+                else:
+                    status = 'completed' if success else 'failed'
+            except Exception as e:
+                success, message, status = False, f"Training failed: {str(e)}", 'failed'
+            
+            with self._lock:
+                self.current_job = None
+            job.set_status(status, message)
+            if job.completion_callback:
+                job.completion_callback(success, message)
+    
+    def save_state(self, job):
+        """Persist the running job so an interrupted run can be offered for resume"""
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+            temp_path = self.state_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'job_id': job.job_id,
+                    'status': job.status,
+                    'message': job.message,
+                    'completed_students': job.completed_students,
+                    'updated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                }, f, indent=2)
+            os.replace(temp_path, self.state_path)
+        except Exception as e:
+            print(f"Error saving training job state: {e}")
+    
+    def find_interrupted_job(self):
+        """State of a job that was running or paused when the application last stopped"""
+        if self.current_job is not None or not os.path.exists(self.state_path):
+            return None
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except Exception as e:
+            print(f"Error reading training job state: {e}")
+            return None
+        return state if state.get('status') in ('running', 'paused') else None
+    
+    def resume_interrupted(self, progress_callback=None, completion_callback=None):
+        """Rerun an interrupted job; students with valid checkpoints are not re-encoded"""
+        return self.submit(progress_callback, completion_callback, resumed=True)
+    
+    def discard_interrupted(self):
+        """Forget an interrupted job (its checkpoints stay valid for the next run)"""
+        try:
+            if os.path.exists(self.state_path):
+                os.remove(self.state_path)
+        except OSError as e:
+            print(f"Error removing training job state: {e}")
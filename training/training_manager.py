@@ -2,14 +2,19 @@ import os
 import cv2
 import numpy as np
 from face_recognition.face_detector import FaceRecognitionSystem
+from face_recognition.image_decoder import decode_image, TRAINING_FACE_FRACTION, TRAINING_FACE_SIZE
+from training.statistics_cache import TrainingStatisticsCache
+from training.training_job import TrainingCancelled
 import shutil
 from datetime import datetime
 
 class TrainingManager:
-    def __init__(self, training_data_path="training_data"):
+    def __init__(self, training_data_path="training_data", face_recognition=None):
         self.training_data_path = training_data_path
-        self.face_recognition = FaceRecognitionSystem()
+        self.face_recognition = face_recognition or FaceRecognitionSystem()
         self.ensure_directories()
+        self.statistics_cache = TrainingStatisticsCache(training_data_path)
+        self.statistics_cache.refresh_async()
     
     def ensure_directories(self):
         """Ensure training directories exist"""
@@ -22,12 +27,12 @@ class TrainingManager:
         os.makedirs(student_folder, exist_ok=True)
         return student_folder
     
-    def capture_training_images(self, student_id, num_images=30):
-        """Capture training images for a student using webcam"""
+    def capture_training_images(self, student_id, num_images=30, camera_source=0):
+        """Capture training images for a student using a webcam, RTSP URL or video file"""
         student_folder = self.create_student_folder(student_id)
         
         # Initialize webcam
-        cap = cv2.VideoCapture(0)
+        cap = cv2.VideoCapture(camera_source)
         if not cap.isOpened():
             return False, "Could not open webcam"
         
@@ -73,31 +78,36 @@ class TrainingManager:
         cap.release()
         cv2.destroyAllWindows()
         
+        self.statistics_cache.update_student(student_id)
+        
         return captured_images > 0, f"Captured {captured_images} images"
     
-    def load_training_images(self, student_id):
-        """Load training images for a specific student"""
+    def training_image_paths(self, student_id):
+        """Paths of a student's training images"""
         student_folder = os.path.join(self.training_data_path, student_id)
         if not os.path.exists(student_folder):
             return []
         
-        images = []
-        for filename in os.listdir(student_folder):
-            if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-                filepath = os.path.join(student_folder, filename)
-                image = cv2.imread(filepath)
-                if image is not None:
-                    images.append(image)
-        
-        return images
+        return [os.path.join(student_folder, filename) for filename in os.listdir(student_folder)
+                if filename.lower().endswith(('.jpg', '.jpeg', '.png'))]
     
     def extract_face_encodings_for_student(self, student_id):
         """Extract face encodings for all images of a student"""
-        images = self.load_training_images(student_id)
         encodings = []
         
-        for image in images:
+        # One decoded image at a time instead of the whole folder; only the face has to keep
+        # encoder resolution, so large photos decode at reduced size
+        for filepath in self.training_image_paths(student_id):
+            image, scale = decode_image(filepath, TRAINING_FACE_FRACTION, TRAINING_FACE_SIZE)
+            if image is None:
+                continue
             faces = self.face_recognition.detect_faces(image)
+            # No face, or one below encoder resolution, means the face is smaller than an
+            # enrollment photo's usually is; encoding it from the reduced image would upscale it
+            if scale > 1 and (not faces or
+                              min(face_data['box'][2] for face_data in faces) < TRAINING_FACE_SIZE):
+                image, _ = decode_image(filepath)
+                faces = self.face_recognition.detect_faces(image) if image is not None else []
             for face_data in faces:
                 encoding = self.face_recognition.extract_face_encoding(face_data['face'])
                 if encoding is not None:
@@ -105,8 +115,10 @@ class TrainingManager:
         
         return encodings
     
-    def train_system(self, progress_callback=None):
+    def train_system(self, progress_callback=None, job=None, checkpoints=None):
         """Train the face recognition system with all available data"""
+        # job (a TrainingJob) can pause or cancel between students; checkpoints
+        # (EncodingCheckpoints) skip students whose encodings are already saved
         try:
             all_encodings = []
             all_labels = []
@@ -118,18 +130,34 @@ class TrainingManager:
             total_students = len(student_folders)
             
             for i, student_id in enumerate(student_folders):
-                if progress_callback:
-                    progress_callback(f"Processing {student_id}...", (i / total_students) * 100)
+                if job is not None:
+                    job.checkpoint()
                 
-                encodings = self.extract_face_encodings_for_student(student_id)
+                student_folder = os.path.join(self.training_data_path, student_id)
+                encodings = checkpoints.load(student_id, student_folder) if checkpoints else None
+                if encodings is not None:
+                    if progress_callback:
+                        progress_callback(f"Using saved encodings for {student_id}...", (i / total_students) * 100)
+                else:
+                    if progress_callback:
+                        progress_callback(f"Processing {student_id}...", (i / total_students) * 100)
+                    encodings = self.extract_face_encodings_for_student(student_id)
+                    if checkpoints:
+                        checkpoints.save(student_id, student_folder, encodings)
                 
                 for encoding in encodings:
                     all_encodings.append(encoding)
                     all_labels.append(student_id)
+                
+                if job is not None:
+                    job.checkpoint(student_id)
             
             if len(all_encodings) == 0:
                 return False, "No training data found"
             
+            if checkpoints:
+                checkpoints.prune(student_folders)
+            
             # Train the classifier
             if progress_callback:
                 progress_callback("Training classifier...", 90)
@@ -139,48 +167,40 @@ class TrainingManager:
             if progress_callback:
                 progress_callback("Training completed!", 100)
             
+            # Training already walked every folder, so revalidation is cheap
+            self.statistics_cache.refresh()
+            
             if success:
                 return True, f"Training completed successfully with {len(all_encodings)} face encodings from {total_students} students"
             else:
                 return False, "Failed to train classifier"
                 
+        except TrainingCancelled:
+            return False, "Training cancelled; finished students are saved and will be skipped next time"
         except Exception as e:
             return False, f"Training failed: {str(e)}"
     
     def get_training_statistics(self):
-        """Get statistics about training data"""
-        stats = {
-            'total_students': 0,
-            'total_images': 0,
-            'students_data': {}
-        }
-        
-        if not os.path.exists(self.training_data_path):
-            return stats
-        
-        student_folders = [d for d in os.listdir(self.training_data_path) 
-                         if os.path.isdir(os.path.join(self.training_data_path, d))]
-        
-        stats['total_students'] = len(student_folders)
-        
-        for student_id in student_folders:
-            student_folder = os.path.join(self.training_data_path, student_id)
-            image_files = [f for f in os.listdir(student_folder) 
-                          if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
-            
-            image_count = len(image_files)
-            stats['total_images'] += image_count
-            stats['students_data'][student_id] = {
-                'image_count': image_count,
-                'folder_path': student_folder
-            }
-        
-        return stats
+        """Get cached statistics about training data (no filesystem access)"""
+        return self.statistics_cache.get_statistics()
+    
+    def refresh_training_statistics(self, callback=None):
+        """Revalidate training statistics in the background"""
+        return self.statistics_cache.refresh_async(callback)
+    
+    def enroll_unknown_cluster(self, cluster_id, student_id, unknown_faces):
+        """Use the face images collected for an unknown visitor as a student's training images"""
+        student_folder = self.create_student_folder(student_id)
+        success, message = unknown_faces.enroll_cluster(cluster_id, student_folder)
+        if success:
+            self.statistics_cache.update_student(student_id)
+        return success, message
     
     def delete_student_data(self, student_id):
         """Delete all training data for a student"""
         student_folder = os.path.join(self.training_data_path, student_id)
         if os.path.exists(student_folder):
             shutil.rmtree(student_folder)
+            self.statistics_cache.remove_student(student_id)
             return True
         return False
\ No newline at end of file
@@ -7,4 +7,13 @@ export default defineConfig({
   optimizeDeps: {
     exclude: ['lucide-react'],
   },
+  server: {
+    proxy: {
+      // Local dashboard API from server/api_server.py, including the /api/events WebSocket
+      '/api': {
+        target: 'http://127.0.0.1:8766',
+        ws: true,
+      },
+    },
+  },
 });